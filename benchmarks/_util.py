@@ -0,0 +1,58 @@
+"""Shared helpers for the benchmark scripts.
+
+Each service is a standalone directory with its own `main.py`, so services are
+loaded by path under a unique module name instead of being imported as
+packages. Modules every service uses live in `shared/`.
+"""
+import importlib.util
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_DIR = os.path.join(ROOT, "shared")
+
+
+def load_service(service: str, module: str = "main"):
+    """Import `<service>/<module>.py`, or `shared/<module>.py`, with the service directory on sys.path"""
+    service_dir = os.path.join(ROOT, service)
+    # Sibling modules share names across services (e.g. user_client), so drop
+    # any copy imported from another service before loading this one
+    for name, mod in list(sys.modules.items()):
+        path = getattr(mod, "__file__", None) or ""
+        if path.startswith(ROOT) and os.path.dirname(path) != service_dir and "benchmarks" not in path:
+            del sys.modules[name]
+    if service_dir in sys.path:
+        sys.path.remove(service_dir)
+    sys.path.insert(0, service_dir)
+    if SHARED_DIR not in sys.path:
+        sys.path.append(SHARED_DIR)
+
+    unique_name = f"{service.replace('-', '_')}_{module}"
+    if unique_name in sys.modules:
+        return sys.modules[unique_name]
+    path = os.path.join(service_dir, f"{module}.py")
+    if not os.path.exists(path):
+        path = os.path.join(SHARED_DIR, f"{module}.py")
+    spec = importlib.util.spec_from_file_location(unique_name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[unique_name] = mod
+    spec.loader.exec_module(mod)
+    logging.getLogger().setLevel(logging.WARNING)
+    return mod
+
+
+def timed(fn, repeat: int) -> float:
+    """Mean wall time of `fn()` in microseconds over `repeat` calls"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def print_table(headers: list[str], rows: list[list]):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,127 @@
+"""game-service's bot opponent: model cost, memory, strength and solo games at scale.
+
+The first table times `MarkovBot.choose()` and `observe()` for the classic
+and lizard-Spock rule sets and measures bytes per bot (traced separately).
+The second plays the bot for ROUNDS rounds against simple strategies that
+people fall into. The third runs thousands of solo rooms at once through the
+service's own `submit_move`: the human's move, the bot's reply,
+`process_game_result` (stats, history, broadcast) and the reset. It reports
+rounds per second as the number of rooms grows. Round deadlines are turned
+off there, since the benchmark drives every room itself.
+
+    python benchmarks/bench_bot.py
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+
+from _util import load_service, print_table
+
+MODEL_CALLS = 200_000
+BOTS_FOR_MEMORY = 50_000
+ROUNDS = 1_000
+SOLO_ROOMS = [1_000, 10_000, 50_000]
+SOLO_ROUNDS = 4  # rounds per room
+
+
+def model_costs(bot_module, rules_module) -> list[list]:
+    rows = []
+    for rules in (rules_module.CLASSIC, rules_module.LIZARD_SPOCK):
+        bot = bot_module.MarkovBot(rules)
+        moves = [random.randrange(len(rules.moves)) for _ in range(MODEL_CALLS)]
+        start = time.perf_counter()
+        for move in moves:
+            bot.choose()
+            bot.observe(move)
+        per_move = (time.perf_counter() - start) / MODEL_CALLS
+
+        tracemalloc.start()
+        bots = [bot_module.MarkovBot(rules) for _ in range(BOTS_FOR_MEMORY)]
+        for bot in bots:
+            bot.observe(0)
+            bot.observe(1)
+        memory = tracemalloc.get_traced_memory()[0] / BOTS_FOR_MEMORY
+        tracemalloc.stop()
+        rows.append([rules.name, len(rules.moves), f"{per_move * 1e6:.2f}", f"{memory:.0f}"])
+    return rows
+
+
+def strategies(rules_module, rules) -> dict:
+    """Opponents as functions of (their last move, the bot's last move, round number)"""
+    beats = {move: next(m for m in range(3) if rules.table[m][move] == rules_module.FIRST_WINS) for move in range(3)}
+
+    def win_stay_lose_shift(mine, theirs, i):
+        if mine is None:
+            return random.randrange(3)
+        return mine if rules.table[mine][theirs] == rules_module.FIRST_WINS else beats[mine]
+
+    return {
+        "random": lambda mine, theirs, i: random.randrange(3),
+        "always rock": lambda mine, theirs, i: 0,
+        "cycle R-P-S": lambda mine, theirs, i: i % 3,
+        "rock, rock, paper": lambda mine, theirs, i: (0, 0, 1)[i % 3],
+        "beat the bot's last": lambda mine, theirs, i: beats[theirs] if theirs is not None else 0,
+        "win-stay lose-shift": win_stay_lose_shift,
+    }
+
+
+def strength(bot_module, rules_module) -> list[list]:
+    rules = rules_module.CLASSIC
+    rows = []
+    for name, strategy in strategies(rules_module, rules).items():
+        bot = bot_module.MarkovBot(rules)
+        mine = theirs = None
+        score = dict.fromkeys((rules_module.FIRST_WINS, rules_module.DRAW, rules_module.SECOND_WINS), 0)
+        for i in range(ROUNDS):
+            bot_move = bot.choose()
+            move = strategy(mine, theirs, i)
+            score[rules.resolve(bot_move, move)] += 1  # from the bot's side
+            bot.observe(move)
+            mine, theirs = move, bot_move
+        rows.append([name, *(f"{count / ROUNDS:.0%}" for count in score.values())])
+    return rows
+
+
+async def solo_games(game_service, rooms: int) -> list:
+    game_service.GAME_MOVE_TIMEOUT = game_service.GAME_READY_TIMEOUT = 0
+    room_ids = [f"solo{rooms}-{i}" for i in range(rooms)]
+    for room_id in room_ids:
+        await game_service.add_bot(room_id, f"{room_id}h")
+    start = time.perf_counter()
+    for round_number in range(SOLO_ROUNDS):
+        for i, room_id in enumerate(room_ids):
+            user_id = f"{room_id}h"
+            await game_service.submit_move(room_id, user_id, user_id, game_service.Move((i + round_number) % 3))
+            game = game_service.rooms[room_id]
+            if game.mark_seen(user_id) == 2:
+                game.reset()
+    elapsed = time.perf_counter() - start
+    played = rooms * SOLO_ROUNDS
+    bot = game_service.stats.get(game_service.BOT_USER_ID)
+    for room_id in room_ids:
+        game_service.expire_game(room_id)
+    game_service.history._pending.clear()  # never flushed here
+    return [
+        f"{rooms:,}", f"{played:,}", f"{played / elapsed:,.0f}", f"{elapsed / played * 1e6:.1f}",
+        f"{bot['wins'] / bot['games']:.0%}", len(asyncio.all_tasks()),
+    ]
+
+
+async def main():
+    random.seed(1)
+    game_service = load_service("game-service")
+    bot_module = load_service("game-service", "bot")
+    rules_module = load_service("game-service", "rules")
+    print_table(["rules", "moves", "choose + observe (us)", "bytes per bot"], model_costs(bot_module, rules_module))
+    print(f"\nBot against fixed strategies over {ROUNDS:,} rounds")
+    print_table(["opponent", "bot wins", "draws", "bot losses"], strength(bot_module, rules_module))
+    print(f"\nSolo rooms, {SOLO_ROUNDS} rounds each, through submit_move")
+    print_table(
+        ["rooms", "rounds", "rounds/s", "us per round", "bot win rate", "asyncio tasks"],
+        [await solo_games(game_service, rooms) for rooms in SOLO_ROOMS],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""Broadcast fan-out latency in game-service's ConnectionManager.
+
+Compares `broadcast_to_game` (encode once, hand the frame to each
+connection's outbound queue) with the original sequential loop that
+re-encoded and awaited the payload per recipient. Sockets are in-memory
+fakes; one optional slow socket models a client that reads late. "fast done"
+is when the last healthy socket received the frame, "call" is how long the
+broadcast call itself held the producing handler.
+
+    python benchmarks/bench_broadcast.py
+"""
+import asyncio
+import json
+import time
+
+from _util import load_service, print_table
+
+SUBSCRIBERS = [2, 100, 10_000]
+ROUNDS = 20
+SLOW_SOCKET_DELAY = 0.05  # seconds
+
+MESSAGE = {
+    "type": "move_received",
+    "message": "alice has made their move",
+    "userId": "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e",
+    "username": "alice",
+    "roomId": "AB12C",
+    "moves_count": 1,
+}
+
+
+class FakeWebSocket:
+    def __init__(self, delivered: "Delivery", delay: float = 0.0):
+        self.delivered = delivered
+        self.delay = delay
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        else:
+            self.delivered.add()
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+class Delivery:
+    """Counts frames delivered to healthy sockets and wakes the waiter"""
+
+    def __init__(self):
+        self.count = 0
+        self.target = 0
+        self.done = asyncio.Event()
+
+    def expect(self, target: int):
+        self.count = 0
+        self.target = target
+        self.done.clear()
+
+    def add(self):
+        self.count += 1
+        if self.count >= self.target:
+            self.done.set()
+
+
+async def sequential_broadcast(sockets: list, message: dict):
+    """The original per-recipient encode-and-await loop, kept as the baseline"""
+    for websocket in sockets:
+        await websocket.send_text(json.dumps(message))
+
+
+async def measure(broadcast, delivery: Delivery, healthy: int, rounds: int) -> tuple[float, float]:
+    fast_total = call_total = 0.0
+    for _ in range(rounds):
+        delivery.expect(healthy)
+        start = time.perf_counter()
+        await broadcast()
+        call_total += time.perf_counter() - start
+        await delivery.done.wait()
+        fast_total += time.perf_counter() - start
+    return fast_total / rounds * 1e3, call_total / rounds * 1e3
+
+
+async def run():
+    game_service = load_service("game-service")
+    rows = []
+    for count in SUBSCRIBERS:
+        for slow in (False, True):
+            delivery = Delivery()
+            sockets = [FakeWebSocket(delivery) for _ in range(count)]
+            if slow:
+                sockets[0].delay = SLOW_SOCKET_DELAY
+            healthy = count - slow
+
+            manager = game_service.ConnectionManager()
+            manager.game_connections["AB12C"] = {
+                f"user{i}": game_service.OutboundQueue(
+                    websocket, manager.outbound_stats, on_close=lambda: None, max_frames=ROUNDS + 1
+                )
+                for i, websocket in enumerate(sockets)
+            }
+
+            old = await measure(lambda: sequential_broadcast(sockets, MESSAGE), delivery, healthy, ROUNDS)
+            new = await measure(lambda: manager.broadcast_to_game(MESSAGE, "AB12C"), delivery, healthy, ROUNDS)
+            for connection in manager.game_connections["AB12C"].values():
+                connection.close()
+            rows.append([f"{count:,}", "yes" if slow else "no", *(f"{ms:.3f}" for ms in (*old, *new))])
+
+    print_table(
+        ["subscribers", "slow socket", "seq fast done ms", "seq call ms", "queued fast done ms", "queued call ms"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,153 @@
+"""Size and CPU cost of the WebSocket codecs.
+
+The first table is the size of representative frames as the services sent
+them before (stdlib `json.dumps`), as the JSON codec sends them now (orjson
+when installed) and in the binary protocol, both as plain MessagePack and in
+the compact form actually sent (short keys, numeric types, usual texts left
+out).
+
+The second times encoding and decoding each frame, and the third times
+game-service's `broadcast_to_game` to connections that all speak JSON, all
+speak the binary protocol, or half and half, where each frame is encoded
+once per codec.
+
+    python benchmarks/bench_codec.py
+"""
+import asyncio
+import json
+import time
+
+from _util import load_service, print_table, timed
+
+REPEAT = 100_000
+CONNECTIONS = [2, 100]
+BROADCASTS = 20_000
+ROOM_ID = "AB12C"
+
+FRAMES = {
+    "move_received": {
+        "type": "move_received",
+        "message": "alice has made their move",
+        "userId": "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e",
+        "username": "alice",
+        "roomId": ROOM_ID,
+        "moves_count": 1,
+    },
+    "game_result": {
+        "type": "game_result",
+        "message": "Game finished!",
+        "result": {
+            "moves": {"alice": "rock", "bob": "scissors"},
+            "winner": "alice",
+            "series": {"bestOf": 3, "rounds": 1, "players": [
+                {"username": "alice", "wins": 1}, {"username": "bob", "wins": 0},
+            ], "winner": None},
+        },
+        "roomId": ROOM_ID,
+    },
+    "game_reset": {"type": "game_reset", "message": "Game reset - ready for next round!", "roomId": ROOM_ID},
+    "game_connected": {
+        "type": "game_connected",
+        "message": f"Connected to game in room {ROOM_ID}",
+        "userId": "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e",
+        "username": "alice",
+        "roomId": ROOM_ID,
+        "game_status": {"moves_submitted": 0, "waiting_for_moves": 2, "has_result": False},
+        "series": None,
+        "bot": False,
+    },
+    "room_status": {
+        "type": "room_status",
+        "roomId": ROOM_ID,
+        "roomName": "Friday night",
+        "players": ["3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e", "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d"],
+        "usernames": {
+            "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e": "alice",
+            "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d": "bob",
+        },
+        "player_count": 2,
+    },
+    "chat_message": {
+        "type": "chat_message",
+        "message": "good game!",
+        "userId": "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e",
+        "username": "alice",
+        "roomId": ROOM_ID,
+    },
+}
+
+
+class StubConnection:
+    def __init__(self, codec):
+        self.codec = codec
+
+    def put(self, frame, kind: str):
+        pass
+
+
+def frame_sizes(codec) -> list[list]:
+    rows = []
+    for name, message in FRAMES.items():
+        stdlib = len(json.dumps(message).encode())
+        row = [name, stdlib, len(codec.JSON.encode(message).encode())]
+        if codec.MSGPACK is not None:
+            plain = len(codec.msgpack.packb(message))
+            binary = len(codec.MSGPACK.encode(message))
+            row += [plain, binary, f"{binary / stdlib:.0%}"]
+        rows.append(row)
+    return rows
+
+
+def codec_costs(codec) -> list[list]:
+    codecs = [("json (stdlib)", json.dumps, json.loads)]
+    if codec.orjson is not None:
+        codecs.append(("json (orjson)", codec.JSON.encode, codec.JSON.decode))
+    if codec.MSGPACK is not None:
+        codecs.append(("msgpack compact", codec.MSGPACK.encode, codec.MSGPACK.decode))
+    rows = []
+    for name, message in FRAMES.items():
+        for label, encode, decode in codecs:
+            frame = encode(message)
+            assert decode(frame) == message
+            rows.append([name, label, f"{timed(lambda: encode(message), REPEAT):.3f}",
+                         f"{timed(lambda: decode(frame), REPEAT):.3f}"])
+    return rows
+
+
+async def broadcast_cost(game_service, codecs: list, connections: int) -> float:
+    manager = game_service.ConnectionManager()
+    manager.game_connections[ROOM_ID] = {
+        f"user{i}": StubConnection(codecs[i % len(codecs)]) for i in range(connections)
+    }
+    message = FRAMES["move_received"]
+    start = time.perf_counter()
+    for _ in range(BROADCASTS):
+        await manager.broadcast_to_game(message, ROOM_ID)
+    return (time.perf_counter() - start) / BROADCASTS * 1e6
+
+
+async def main():
+    codec = load_service("game-service", "codec")
+    headers = ["frame", "json (stdlib)", "json (codec)"]
+    if codec.MSGPACK is not None:
+        headers += ["msgpack", "msgpack compact", "compact/stdlib"]
+    print(f"Bytes per frame (JSON codec uses {'orjson' if codec.orjson else 'the standard library'})")
+    print_table(headers, frame_sizes(codec))
+
+    print("\nEncode and decode one frame (us)")
+    print_table(["frame", "codec", "encode", "decode"], codec_costs(codec))
+
+    game_service = load_service("game-service")
+    mixes = [("all json", [game_service.JSON])]
+    if codec.MSGPACK is not None:
+        mixes += [("all msgpack", [codec.MSGPACK]), ("half and half", [game_service.JSON, codec.MSGPACK])]
+    rows = []
+    for connections in CONNECTIONS:
+        for label, codecs in mixes:
+            rows.append([f"{connections:,}", label, f"{await broadcast_cost(game_service, codecs, connections):.2f}"])
+    print("\nbroadcast_to_game of move_received (us per call, excluding socket writes)")
+    print_table(["connections", "codecs", "us"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
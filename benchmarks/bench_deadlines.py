@@ -0,0 +1,114 @@
+"""Cost of game-service's round deadlines as the number of live rooms grows.
+
+Every room gets one first move through `GameState.submit` and `arm_deadline`,
+so each has a pending move deadline in the shared timer heap. With that many
+rooms live, the script measures four costs:
+
+- re-arming a deadline (a player changes their move);
+- cancelling one (the round is reset);
+- an idle tick of the timer task, with nothing due;
+- forfeiting a room once its deadline has passed.
+
+Forfeiting runs the whole `forfeit_round` path, including the stats, history
+and result broadcast. Per-room costs should stay flat from 1k to 100k rooms,
+and the task count stays at two (the benchmark's own and the timer task).
+Memory per deadline is measured in a separate pass that traces only the
+arming of rooms that already exist.
+
+    python benchmarks/bench_deadlines.py
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+
+from _util import load_service, print_table
+
+LIVE_ROOMS = [1_000, 10_000, 100_000]
+SAMPLE = 10_000  # re-arms and cancels timed per size
+IDLE_TICKS = 1_000
+
+
+def open_rooms(game_service, count: int, prefix: str, arm: bool = True) -> list[str]:
+    """`count` rooms whose first player has moved, each with its move deadline armed"""
+    room_ids = []
+    for i in range(count):
+        room_id = f"{prefix}{i}"
+        game_service.membership._apply("joined", room_id, [f"{room_id}a", f"{room_id}b"])
+        game = game_service.rooms[room_id] = game_service.GameState()
+        game.submit(f"{room_id}a", f"{room_id}a", game_service.Move(i % 3))
+        if arm:
+            game_service.arm_deadline(room_id)
+        room_ids.append(room_id)
+    return room_ids
+
+
+def clear(game_service):
+    for room_id in list(game_service.rooms):
+        game_service.expire_game(room_id)
+    game_service.membership._members.clear()
+
+
+async def measure(game_service, count: int) -> list:
+    timers = game_service.timers
+    start = time.perf_counter()
+    room_ids = open_rooms(game_service, count, f"R{count}-")
+    arm = (time.perf_counter() - start) / count
+
+    sample = random.sample(room_ids, min(SAMPLE, count))
+    start = time.perf_counter()
+    for room_id in sample:
+        game_service.arm_deadline(room_id)
+    rearm = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    for room_id in sample:
+        timers.cancel(f"deadline:{room_id}")
+    cancel = (time.perf_counter() - start) / len(sample)
+    for room_id in sample:
+        game_service.arm_deadline(room_id)
+
+    await timers.fire()  # the first tick may compact the replaced entries away
+    start = time.perf_counter()
+    for _ in range(IDLE_TICKS):
+        await timers.fire()
+    tick = (time.perf_counter() - start) / IDLE_TICKS
+    heap_entries = len(timers._heap)
+    tasks = len(asyncio.all_tasks())
+
+    # Skip past every move deadline instead of waiting it out
+    start = time.perf_counter()
+    forfeits = await timers.fire(time.monotonic() + game_service.GAME_MOVE_TIMEOUT + 1)
+    forfeit = (time.perf_counter() - start) / forfeits
+    ready = len(timers)  # each forfeited room now has its ready deadline
+    clear(game_service)
+
+    room_ids = open_rooms(game_service, count, f"M{count}-", arm=False)
+    tracemalloc.start()
+    for room_id in room_ids:
+        game_service.arm_deadline(room_id)
+    memory = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+    clear(game_service)
+
+    return [
+        f"{count:,}", f"{arm * 1e6:.2f}", f"{rearm * 1e6:.2f}", f"{cancel * 1e6:.2f}", f"{tick * 1e6:.2f}",
+        f"{forfeit * 1e6:.1f}", f"{forfeits:,}", f"{ready:,}", f"{heap_entries:,}", f"{memory:.0f}", tasks,
+    ]
+
+
+async def main():
+    random.seed(1)
+    game_service = load_service("game-service")
+    game_service.timers.start()
+    rows = [await measure(game_service, count) for count in LIVE_ROOMS]
+    await game_service.timers.stop()
+    print_table(
+        ["live rooms", "arm (us)", "re-arm (us)", "cancel (us)", "idle tick (us)", "forfeit (us)",
+         "forfeits", "ready deadlines", "heap entries", "bytes/room", "asyncio tasks"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""Match history: batched insert throughput, cost under live game load, and query/export speed.
+
+First part: rows per second written to a fresh on-disk SQLite (WAL) store
+for different batch sizes, one transaction per batch.
+
+Second part: rounds played through game-service's real result path
+(`GameState.submit` and `process_game_result`) as fast as one event loop
+allows, with the match history writer flushing every 50 ms in the
+background, compared with the same loop with history switched off.
+
+Third part: paginated queries and streaming exports against the store
+after it has been filled to HISTORY_ROWS matches.
+
+    python benchmarks/bench_history.py
+"""
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from _util import load_service, print_table
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+INSERT_ROWS = 100_000
+LIVE_ROUNDS = 200_000
+LIVE_ROOMS = 10_000
+HISTORY_ROWS = 1_000_000
+USERS = 50_000
+QUERIES = 2_000
+
+
+def random_row(now: float) -> tuple:
+    a = int(random.random() * USERS)
+    b = (a + 1 + int(random.random() * (USERS - 1))) % USERS
+    move1, move2 = int(random.random() * 3), int(random.random() * 3)
+    return (now, f"R{int(random.random() * LIVE_ROOMS)}", f"user{a}", f"Player{a}", move1,
+            f"user{b}", f"Player{b}", move2, (0, 2, 1)[(move1 - move2) % 3])
+
+
+def insert_throughput(history_module, directory: str, batch: int) -> float:
+    path = os.path.join(directory, f"insert-{batch}.db")
+    history = history_module.MatchHistory(path, ["rock", "paper", "scissors"])
+    history.open()
+    rows = [random_row(i) for i in range(INSERT_ROWS)]
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        history.write_batch(rows[i:i + batch])
+    elapsed = time.perf_counter() - start
+    asyncio.run(history.close())
+    return len(rows) / elapsed
+
+
+async def live_load(game_service, enabled: bool) -> dict:
+    history = game_service.history
+    add = history.add
+    if not enabled:
+        history.add = lambda *row: None
+    history.start()
+    peak_pending = 0
+    start = time.perf_counter()
+    for i in range(LIVE_ROUNDS):
+        room_id = f"R{i % LIVE_ROOMS}"
+        game = game_service.rooms.setdefault(room_id, game_service.GameState())
+        game.reset()
+        a = random.randrange(USERS)
+        b = (a + 1 + random.randrange(USERS - 1)) % USERS  # never the same player twice
+        game.submit(f"user{a}", f"Player{a}", game_service.Move(random.randrange(3)))
+        game.submit(f"user{b}", f"Player{b}", game_service.Move(random.randrange(3)))
+        await game_service.process_game_result(room_id)
+        if i % 100 == 99:
+            peak_pending = max(peak_pending, len(history._pending))
+            await asyncio.sleep(0)  # between requests, as under a real server
+    elapsed = time.perf_counter() - start
+    await history.close()
+    history.add = add
+    return {
+        "rounds_per_second": LIVE_ROUNDS / elapsed,
+        "rows": history.rows_written,
+        "flushes": history.flushes,
+        "peak_pending": peak_pending,
+    }
+
+
+def run():
+    random.seed(1)
+    directory = tempfile.mkdtemp(prefix="bench-history-")
+    try:
+        history_module = load_service("game-service", "history")
+        rows = [[f"{batch:,}", f"{insert_throughput(history_module, directory, batch):,.0f}"] for batch in BATCH_SIZES]
+        print_table(["rows per transaction", "rows/s"], rows)
+
+        game_service = load_service("game-service")
+        results = []
+        for enabled in (False, True):
+            path = os.path.join(directory, f"live-{enabled}.db")
+            game_service.history = history_module.MatchHistory(path, game_service.CLASSIC.moves)
+            game_service.history.open()
+            game_service.rooms.clear()
+            results.append(asyncio.run(live_load(game_service, enabled)))
+        off, on = results
+        print(f"\n{LIVE_ROUNDS:,} rounds in {LIVE_ROOMS:,} rooms through process_game_result")
+        print_table(
+            ["history", "rounds/s", "rows written", "transactions", "rows/transaction", "peak rows pending"],
+            [
+                ["off", f"{off['rounds_per_second']:,.0f}", "-", "-", "-", "-"],
+                [
+                    "on",
+                    f"{on['rounds_per_second']:,.0f}",
+                    f"{on['rows']:,}",
+                    f"{on['flushes']:,}",
+                    f"{on['rows'] / max(on['flushes'], 1):,.0f}",
+                    f"{on['peak_pending']:,}",
+                ],
+            ],
+        )
+
+        history = history_module.MatchHistory(os.path.join(directory, "queries.db"), ["rock", "paper", "scissors"])
+        history.open()
+        start = time.perf_counter()
+        for i in range(0, HISTORY_ROWS, 10_000):
+            history.write_batch([random_row(1_700_000_000 + (i + j) / 100) for j in range(10_000)])
+        fill_seconds = time.perf_counter() - start
+
+        users = [f"user{random.randrange(USERS)}" for _ in range(QUERIES)]
+        rooms = [f"R{random.randrange(LIVE_ROOMS)}" for _ in range(QUERIES)]
+
+        def timed(fn) -> str:
+            start = time.perf_counter()
+            for i in range(QUERIES):
+                fn(i)
+            return f"{(time.perf_counter() - start) / QUERIES * 1e6:,.0f}"
+
+        middle = 1_700_000_000 + HISTORY_ROWS / 200
+        query_rows = [
+            ["last 20 games of a user", timed(lambda i: history.for_user(users[i], 20))],
+            ["last 20 games of a room", timed(lambda i: history.for_room(rooms[i], 20))],
+            ["20 games of a room, from the middle", timed(lambda i: history.for_room(rooms[i], 20, HISTORY_ROWS // 2))],
+            ["20 games in a time range", timed(lambda i: history.between(middle, middle + 60, 20))],
+        ]
+        print(f"\nQueries against {HISTORY_ROWS:,} matches (filled in {fill_seconds:.1f} s)")
+        print_table(["query", "us/query"], query_rows)
+
+        export_rows = []
+        for fmt in ("ndjson", "csv"):
+            start = time.perf_counter()
+            size = sum(len(chunk) for chunk in history.export(fmt))
+            elapsed = time.perf_counter() - start
+            # A second pass under tracemalloc, which is too slow to time
+            tracemalloc.start()
+            for _ in history.export(fmt):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            export_rows.append([fmt, f"{HISTORY_ROWS / elapsed:,.0f}", f"{size / 1e6:,.0f}", f"{peak / 1e6:.2f}"])
+        print()
+        print_table(["export", "rows/s", "MB", "peak Python memory (MB)"], export_rows)
+        asyncio.run(history.close())
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
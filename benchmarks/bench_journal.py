@@ -0,0 +1,132 @@
+"""Durable-mode cost: event write throughput and restart time at 1M rooms.
+
+Uses room-service's journal in a temporary directory. The history is 1M
+live rooms that were created and joined plus 500k rooms that were created
+and later expired (3M events):
+  * appends that history with the batched fsync the service uses, and a
+    short run that fsyncs after every event for comparison;
+  * restarts by replaying the whole log with no snapshot;
+  * restarts from a snapshot of the 1M live rooms plus a 10k-event log tail.
+
+    python benchmarks/bench_journal.py
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from _util import load_service, print_table
+
+ROOMS = 1_000_000
+EXPIRED = 500_000
+TAIL = 10_000
+PER_EVENT_FSYNC = 2_000
+
+
+def reset_state(room_service):
+    room_service.rooms.clear()
+    room_service.room_ids = room_service.RoomIdAllocator()
+    room_service.room_reaper = room_service.IdleReaper(
+        "rooms", room_service.ROOM_IDLE_TTL, room_service.expire_room
+    )
+
+
+def new_journal(room_service, directory: str):
+    journal = room_service.Journal(
+        directory,
+        room_service.apply_room_event,
+        room_service.snapshot_rooms,
+        room_service.restore_rooms,
+        snapshot_every=10 ** 12,
+    )
+    room_service.journal = journal
+    return journal
+
+
+def history(live: list[str], expired: list[str]):
+    for i, code in enumerate(live):
+        yield ["create", code, "Room", f"user{i}"]
+        yield ["join", code, f"guest{i}"]
+    for code in expired:
+        yield ["create", code, "Room", "user"]
+        yield ["expire", code]
+
+
+async def write_events(journal, events) -> tuple[int, float]:
+    journal.start()
+    count = 0
+    start = time.perf_counter()
+    for count, event in enumerate(events, 1):
+        journal.append(event)
+        if count % 1000 == 0:
+            await asyncio.sleep(0)  # let the flusher run, as request handling would
+    await journal.sync()
+    elapsed = time.perf_counter() - start
+    journal._task.cancel()
+    journal._task = None
+    return count, elapsed
+
+
+async def run():
+    room_service = load_service("room-service")
+    allocator = room_service.RoomIdAllocator()
+    codes = [allocator.allocate() for _ in range(ROOMS + EXPIRED + TAIL)]
+    live, expired, tail = codes[:ROOMS], codes[ROOMS:ROOMS + EXPIRED], codes[ROOMS + EXPIRED:]
+    workdir = tempfile.mkdtemp(prefix="rsp-journal-")
+    rows = []
+    try:
+        # Batched fsync
+        log_dir = os.path.join(workdir, "log")
+        journal = new_journal(room_service, log_dir)
+        journal.open()
+        events, batched = await write_events(journal, history(live, expired))
+        journal._file.close()
+        log_mb = sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir)) / 1e6
+        rows.append(["append, batched fsync", f"{events / batched:,.0f} events/s", f"{log_mb:.1f} MB log"])
+
+        # fsync after every event
+        journal = new_journal(room_service, os.path.join(workdir, "sync"))
+        journal.open()
+        start = time.perf_counter()
+        for i, code in enumerate(live[:PER_EVENT_FSYNC]):
+            journal.append(["create", code, "Room", f"user{i}"])
+            journal._file.flush()
+            os.fsync(journal._file.fileno())
+        per_event = time.perf_counter() - start
+        journal._file.close()
+        rows.append(["append, fsync per event", f"{PER_EVENT_FSYNC / per_event:,.0f} events/s", ""])
+
+        # Restart by replaying the full log
+        reset_state(room_service)
+        journal = new_journal(room_service, log_dir)
+        journal.open()
+        assert len(room_service.rooms) == ROOMS
+        rows.append(["restart, full log replay", f"{journal.restore_seconds:.2f} s", f"{journal.restored_events:,} events"])
+
+        # Snapshot, then a short tail, then restart
+        await journal.write_snapshot()
+        await write_events(journal, (["create", code, "Room", "user"] for code in tail))
+        snapshot_mb = sum(
+            os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir) if f.startswith("snapshot")
+        ) / 1e6
+        journal._file.close()
+        reset_state(room_service)
+        journal = new_journal(room_service, log_dir)
+        journal.open()
+        assert len(room_service.rooms) == ROOMS + TAIL
+        rows.append([
+            "restart, snapshot + tail",
+            f"{journal.restore_seconds:.2f} s",
+            f"{snapshot_mb:.1f} MB snapshot, {journal.restored_events:,} events replayed",
+        ])
+        journal._file.close()
+    finally:
+        shutil.rmtree(workdir)
+
+    print_table(["operation", "rate / time", "notes"], rows)
+    print(f"\n{ROOMS:,} live rooms, {EXPIRED:,} expired")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+"""Matchmaking cost and time-to-match with 10k+ players waiting.
+
+First part: cost of one enqueue + cancel against queues of increasing depth
+in which nobody can be paired, to show it stays O(log n).
+
+Second part: a simulated arrival stream fed through room-service's
+matchmaker and `create_match` (so every pair really gets a room). Time is
+simulated: players arrive at ARRIVALS_PER_SECOND with random skill and
+region, and the background sweep runs once per simulated second. Skill is
+fine-grained and the window narrow so that more than 10k players are queued
+at once. The report gives pairs per second of real CPU time, the peak queue
+depth, and time-to-match percentiles in simulated seconds.
+
+    python benchmarks/bench_matchmaking.py
+"""
+import asyncio
+import random
+import time
+
+from _util import load_service, print_table
+
+DEPTHS = [1_000, 10_000, 100_000]
+OPS = 20_000
+ARRIVALS_PER_SECOND = 20_000
+SIMULATED_SECONDS = 20
+REGIONS = ["eu", "us", "asia", "sa"]
+
+
+def enqueue_cost(room_service, depth: int, ranked: bool) -> float:
+    matchmaker = room_service.Matchmaker(lambda a, b: None, skill_window=0, widen_per_second=0)
+    for i in range(depth):
+        # Distinct ratings and a zero window: nobody can be paired
+        matchmaker.enqueue(f"q{i}", skill=i * 10 if ranked else None, region=None if ranked else f"r{i}", now=0)
+    skills = [random.randrange(depth) * 10 + 5 for _ in range(OPS)]
+    start = time.perf_counter()
+    for i, skill in enumerate(skills):
+        matchmaker.enqueue("probe", skill=skill if ranked else None, region=None if ranked else "probe-region", now=0)
+        matchmaker.cancel("probe")
+    return (time.perf_counter() - start) / OPS * 1e6
+
+
+async def simulate(room_service):
+    random.seed(1)
+    enqueued_at = {}
+    waits = []
+
+    def on_match(first, second):
+        room_service.create_match(first, second)
+        for ticket in (first, second):
+            waits.append(now - enqueued_at.pop(ticket.user_id))
+            room_service.matches.pop(ticket.user_id, None)
+
+    matchmaker = room_service.Matchmaker(on_match, skill_window=2, widen_per_second=200)
+    room_service.matchmaker = matchmaker
+    peak = 0
+    total = ARRIVALS_PER_SECOND * SIMULATED_SECONDS
+    start = time.perf_counter()
+    for i in range(total):
+        now = i / ARRIVALS_PER_SECOND
+        user_id = f"u{i}"
+        enqueued_at[user_id] = now
+        matchmaker.enqueue(user_id, skill=random.uniform(0, 1_000_000), region=random.choice(REGIONS), now=now)
+        if (i + 1) % ARRIVALS_PER_SECOND == 0:
+            peak = max(peak, len(matchmaker))
+            matchmaker.sweep(now)
+            await asyncio.sleep(0)  # let room events go out, as between requests
+    elapsed = time.perf_counter() - start
+    waits.sort()
+    return {
+        "players": total,
+        "pairs": matchmaker.pairs_total,
+        "pairs_per_second": matchmaker.pairs_total / elapsed,
+        "peak_queued": peak,
+        "p50": waits[len(waits) // 2],
+        "p99": waits[int(len(waits) * 0.99)],
+        "still_queued": len(matchmaker),
+    }
+
+
+def run():
+    room_service = load_service("room-service")
+
+    rows = []
+    for depth in DEPTHS:
+        rows.append([
+            f"{depth:,}",
+            f"{enqueue_cost(room_service, depth, ranked=True):.2f}",
+            f"{enqueue_cost(room_service, depth, ranked=False):.2f}",
+        ])
+    print_table(["queued players", "skill-ranked enqueue+cancel (us)", "FIFO enqueue+cancel (us)"], rows)
+
+    result = asyncio.run(simulate(room_service))
+    print(
+        f"\nSimulated {result['players']:,} arrivals at {ARRIVALS_PER_SECOND:,}/s over {SIMULATED_SECONDS} s "
+        f"in {len(REGIONS)} regions"
+    )
+    print_table(
+        ["pairs", "pairs/s (CPU)", "peak queued", "still queued", "time-to-match p50", "p99"],
+        [[
+            f"{result['pairs']:,}",
+            f"{result['pairs_per_second']:,.0f}",
+            f"{result['peak_queued']:,}",
+            f"{result['still_queued']:,}",
+            f"{result['p50']:.2f} s",
+            f"{result['p99']:.2f} s",
+        ]],
+    )
+
+
+if __name__ == "__main__":
+    run()
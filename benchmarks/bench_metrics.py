@@ -0,0 +1,127 @@
+"""What the /metrics instrumentation costs in game-service.
+
+The first table is the cost of one update to each kind of metric. The
+second times the instrumented paths with their metrics, and again with them
+replaced by no-ops:
+
+- `broadcast_to_game` to a room of two players (connections are stubs that
+  only take the frame, so the fan-out itself is all that is timed);
+- the `RequestMetrics` middleware around an ASGI app that answers at once.
+
+The third fills game-service with N games, a third of them mid-round. It
+compares the scan `/health` used to do for `games_in_progress` with the
+counter it reads now, and times a full `/metrics` scrape, which reads only
+counters and does not grow with N.
+
+    python benchmarks/bench_metrics.py
+"""
+import asyncio
+import time
+
+from _util import load_service, print_table, timed
+
+REPEAT = 200_000
+GAMES = [10_000, 100_000, 500_000]
+MESSAGE = {"type": "move_received", "message": "alice has made their move", "roomId": "AB12C", "moves_count": 1}
+
+
+class StubConnection:
+    codec = load_service("game-service", "codec").JSON
+
+    def put(self, frame, kind: str):
+        pass
+
+
+class NoOpMetric:
+    def observe(self, *args):
+        pass
+
+
+def update_costs(metrics_module) -> list[list]:
+    registry = metrics_module.MetricsRegistry()
+    counter = registry.counter("c_total", "c", ("result",))
+    gauge = registry.gauge("g", "g")
+    plain = registry.histogram("h_seconds", "h")
+    labelled = registry.histogram("l_seconds", "l", ("type",))
+    return [
+        ["Counter.inc, one label", f"{timed(lambda: counter.inc('decided'), REPEAT):.3f}"],
+        ["Gauge.set", f"{timed(lambda: gauge.set(3.0), REPEAT):.3f}"],
+        ["Histogram.observe", f"{timed(lambda: plain.observe(0.0012), REPEAT):.3f}"],
+        ["Histogram.observe, one label", f"{timed(lambda: labelled.observe(0.0012, 'submit_move'), REPEAT):.3f}"],
+    ]
+
+
+async def broadcast_cost(game_service) -> float:
+    manager = game_service.ConnectionManager()
+    manager.game_connections["AB12C"] = {"alice": StubConnection(), "bob": StubConnection()}
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        await manager.broadcast_to_game(MESSAGE, "AB12C")
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+async def middleware_cost(app) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/health"}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+async def instrumented_paths(game_service, metrics_module) -> list[list]:
+    async def answer(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    histogram = metrics_module.MetricsRegistry().histogram("h_seconds", "h", ("method", "route", "status"))
+    measured = game_service.broadcast_seconds
+    with_metrics = await broadcast_cost(game_service)
+    game_service.broadcast_seconds = NoOpMetric()
+    without = await broadcast_cost(game_service)
+    game_service.broadcast_seconds = measured
+    rows = [["broadcast_to_game, 2 players", f"{without:.2f}", f"{with_metrics:.2f}"]]
+    without = await middleware_cost(answer)
+    with_metrics = await middleware_cost(metrics_module.RequestMetrics(answer, histogram))
+    rows.append(["HTTP request, bare ASGI app", f"{without:.2f}", f"{with_metrics:.2f}"])
+    return rows
+
+
+def scrape_at_scale(game_service) -> list[list]:
+    rows = []
+    for count in GAMES:
+        game_service.rooms.clear()
+        game_service.GameState.in_progress = 0
+        for i in range(count):
+            game = game_service.rooms[f"G{i}"] = game_service.GameState()
+            if i % 3 == 0:
+                game.submit(f"u{i}", f"user{i}", game_service.Move.ROCK)
+        rooms = game_service.rooms
+        repeat = max(1, 2_000_000 // count)
+        scan = timed(lambda: sum(1 for game in rooms.values() if game.moves_count > 0), repeat)
+        counter = timed(lambda: game_service.GameState.in_progress, 100_000)
+        scrape = timed(game_service.metrics.render, 200)
+        rows.append([f"{count:,}", f"{scan:,.1f}", f"{counter:.3f}", f"{scrape:.1f}"])
+    game_service.rooms.clear()
+    return rows
+
+
+async def main():
+    game_service = load_service("game-service")
+    metrics_module = load_service("game-service", "metrics")
+    print("One update (us)")
+    print_table(["metric", "us"], update_costs(metrics_module))
+    print("\nInstrumented paths (us per call)")
+    print_table(["path", "no metrics", "with metrics"], await instrumented_paths(game_service, metrics_module))
+    print("\ngames_in_progress and a full /metrics scrape (us)")
+    print_table(["games", "scan (before)", "counter (now)", "/metrics render"], scrape_at_scale(game_service))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
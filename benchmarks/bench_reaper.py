@@ -0,0 +1,60 @@
+"""Idle game reaper cost at large room counts.
+
+Tracks N games in game-service's IdleReaper and keeps 99% of them active.
+A sweep with nothing due is O(1) whatever N is. The sweep at the TTL
+boundary pops every heap entry that came due: it reclaims the idle 1% and
+lazily reschedules each game that was touched since, so its cost follows
+the number of due entries (here all N) rather than a scan of the rooms.
+
+    python benchmarks/bench_reaper.py
+"""
+import time
+
+from _util import load_service, print_table
+
+SIZES = [10_000, 100_000, 1_000_000]
+EXPIRED_FRACTION = 0.01
+
+
+def main():
+    game_service = load_service("game-service")
+    rows = []
+    for size in SIZES:
+        rooms = {}
+        reaper = game_service.IdleReaper("games", 60.0, lambda room_id: rooms.pop(room_id, None) is not None)
+        keys = [f"R{i:07d}" for i in range(size)]
+        for key in keys:
+            rooms[key] = {}
+
+        start = time.perf_counter()
+        for key in keys:
+            reaper.touch(key, now=0.0)
+        touch_us = (time.perf_counter() - start) / size * 1e6
+
+        # Everyone but the first 1% is active again later on
+        expired = int(size * EXPIRED_FRACTION)
+        for key in keys[expired:]:
+            reaper.touch(key, now=30.0)
+
+        idle_ms = _timed_sweep(reaper, now=10.0)
+        reclaim_ms = _timed_sweep(reaper, now=61.0)
+        rows.append([
+            f"{size:,}",
+            f"{touch_us:.2f}",
+            f"{idle_ms:.3f}",
+            f"{reaper.last_sweep_reclaimed:,}",
+            f"{reclaim_ms:.2f}",
+            f"{len(rooms):,}",
+        ])
+
+    print_table(["rooms", "touch us", "idle sweep ms", "reclaimed", "reclaim sweep ms", "left"], rows)
+
+
+def _timed_sweep(reaper, now: float) -> float:
+    start = time.perf_counter()
+    reaper.sweep(now=now)
+    return (time.perf_counter() - start) * 1e3
+
+
+if __name__ == "__main__":
+    main()
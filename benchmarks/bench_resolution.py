@@ -0,0 +1,82 @@
+"""Round resolution cost: string comparisons vs lookup table vs NumPy batch.
+
+    python benchmarks/bench_resolution.py
+"""
+import random
+import time
+
+from _util import load_service, print_table
+
+PAIRS = 1_000_000
+
+
+def string_calculate_winner(move1: str, move2: str, player1: str, player2: str) -> str:
+    """The original chained-comparison version, kept as the baseline"""
+    if move1 == move2:
+        return "draw"
+    elif (
+        (move1 == "rock" and move2 == "scissors")
+        or (move1 == "scissors" and move2 == "paper")
+        or (move1 == "paper" and move2 == "rock")
+    ):
+        return player1
+    else:
+        return player2
+
+
+def per_pair_ns(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / PAIRS * 1e9
+
+
+def main():
+    game_service = load_service("game-service")
+    rules = load_service("game-service", "rules")
+    Move = game_service.Move
+
+    first = [random.randrange(3) for _ in range(PAIRS)]
+    second = [random.randrange(3) for _ in range(PAIRS)]
+    names = rules.CLASSIC.moves
+    first_names = [names[m] for m in first]
+    second_names = [names[m] for m in second]
+    first_moves = [Move(m) for m in first]
+    second_moves = [Move(m) for m in second]
+
+    string_ns = per_pair_ns(lambda: [
+        string_calculate_winner(a, b, "alice", "bob") for a, b in zip(first_names, second_names)
+    ])
+    winner_ns = per_pair_ns(lambda: [
+        game_service.calculate_winner(a, b, "alice", "bob") for a, b in zip(first_moves, second_moves)
+    ])
+    resolve = rules.CLASSIC.resolve
+    table_ns = per_pair_ns(lambda: [resolve(a, b) for a, b in zip(first, second)])
+    rows = [
+        ["calculate_winner, strings (old)", f"{string_ns:.1f}"],
+        ["calculate_winner, Move + table", f"{winner_ns:.1f}"],
+        ["RuleSet.resolve, ints", f"{table_ns:.1f}"],
+    ]
+
+    lizard_spock = rules.LIZARD_SPOCK
+    resolve_ls = lizard_spock.resolve
+    first_ls = [random.randrange(5) for _ in range(PAIRS)]
+    second_ls = [random.randrange(5) for _ in range(PAIRS)]
+    rows.append(["RuleSet.resolve, lizard-spock", f"{per_pair_ns(lambda: [resolve_ls(a, b) for a, b in zip(first_ls, second_ls)]):.1f}"])
+
+    if rules.np is not None:
+        np = rules.np
+        first_array = np.array(first, dtype=np.int8)
+        second_array = np.array(second, dtype=np.int8)
+        outcomes = rules.CLASSIC.resolve_batch(first_array, second_array)
+        assert outcomes.tolist() == [resolve(a, b) for a, b in zip(first, second)]
+        rows.append(["resolve_batch, NumPy", f"{per_pair_ns(lambda: rules.CLASSIC.resolve_batch(first_array, second_array)):.2f}"])
+        rows.append(["resolve_batch, NumPy, lizard-spock from lists", f"{per_pair_ns(lambda: lizard_spock.resolve_batch(first_ls, second_ls)):.2f}"])
+    else:
+        rows.append(["resolve_batch, NumPy", "numpy not installed"])
+
+    print_table(["path", "ns/pair"], rows)
+    print(f"\n{PAIRS:,} random move pairs")
+
+
+if __name__ == "__main__":
+    main()
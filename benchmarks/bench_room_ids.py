@@ -0,0 +1,61 @@
+"""Room code allocation speed and uniqueness.
+
+Allocates millions of codes with room-service's RoomIdAllocator and counts
+collisions and single-character typos of a sample of codes that the check
+character lets through (room-service/tests/test_room_ids.py asserts both are
+zero). The old 5-random-character generator is run alongside to show how
+soon it starts handing out duplicates.
+
+    python benchmarks/bench_room_ids.py
+"""
+import random
+import string
+import time
+
+from _util import load_service, print_table
+
+SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+TYPO_SAMPLE = 2_000
+
+
+def random_room_id():
+    """The original generator, kept as the baseline"""
+    return "".join(random.choices(string.ascii_uppercase + string.digits, k=5))
+
+
+def main():
+    room_ids = load_service("room-service", "room_ids")
+    rows = []
+    for size in SIZES:
+        allocator = room_ids.RoomIdAllocator()
+        start = time.perf_counter()
+        codes = [allocator.allocate() for _ in range(size)]
+        allocate_us = (time.perf_counter() - start) / size * 1e6
+        collisions = size - len(set(codes))
+
+        old_codes = [random_room_id() for _ in range(size)]
+        old_collisions = size - len(set(old_codes))
+
+        widths = sorted({len(code) for code in codes})
+        rows.append([
+            f"{size:,}",
+            f"{allocate_us:.2f}",
+            f"{collisions:,}",
+            f"{old_collisions:,}",
+            "/".join(map(str, widths)),
+        ])
+
+    print_table(["rooms", "allocate us", "collisions", "old collisions", "code length"], rows)
+
+    missed = 0
+    for code in random.sample(codes, TYPO_SAMPLE):
+        for position in range(len(code)):
+            for char in room_ids.ALPHABET:
+                if char != code[position]:
+                    typo = code[:position] + char + code[position + 1:]
+                    missed += room_ids.is_valid_room_id(typo)
+    print(f"\nsingle-character typos accepted: {missed} (of {TYPO_SAMPLE:,} codes, every position and character)")
+
+
+if __name__ == "__main__":
+    main()
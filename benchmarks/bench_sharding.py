@@ -0,0 +1,92 @@
+"""Games per second against 1, 2 and 4 game-service shard processes.
+
+Starts real shards with `sharding.spawn_shards` (uvicorn workers plus the
+pub/sub broker) and drives them from several client processes over HTTP.
+Each game is two `/play` calls and two `/state` calls. Clients either route
+each room to its owner themselves ("routed") or send every request to a
+random shard and follow the 307 redirect ("via redirect"), as a plain load
+balancer would.
+
+Scaling is bounded by the cores available: on a single core more shards can
+only add overhead.
+
+    python benchmarks/bench_sharding.py
+"""
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import httpx
+
+from _util import ROOT, SHARED_DIR, print_table
+
+sys.path.insert(0, os.path.join(ROOT, "game-service"))
+sys.path.append(SHARED_DIR)
+from sharding import HashRing, spawn_shards, stop_processes  # noqa: E402
+
+PORT = 19002
+PUBSUB_PORT = 19090
+WORKERS = [1, 2, 4]
+CLIENTS = 8
+GAMES_PER_CLIENT = 250
+
+
+def play_games(client_id: int, urls: list[str], routed: bool, start_at: float) -> int:
+    ring = HashRing(urls)
+    with httpx.Client(follow_redirects=True, timeout=30) as http:
+        while time.time() < start_at:
+            time.sleep(0.001)
+        for game in range(GAMES_PER_CLIENT):
+            room_id = f"bench-{client_id}-{game}"
+            pick = (lambda: ring.owner(room_id)) if routed else (lambda: random.choice(urls))
+            for user in ("a", "b"):
+                http.post(
+                    pick() + "/play",
+                    json={"roomId": room_id, "userId": user, "username": user, "move": "rock"},
+                ).raise_for_status()
+            for user in ("a", "b"):
+                http.get(pick() + f"/state/{room_id}/{user}").raise_for_status()
+    return GAMES_PER_CLIENT
+
+
+def wait_until_ready(urls: list[str], timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if all(len(httpx.get(url + "/health").json()["shards"]["live"]) == len(urls) for url in urls):
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("shards did not come up")
+
+
+def run_case(pool, urls: list[str], routed: bool) -> float:
+    start_at = time.time() + 0.5
+    args = [(client_id + routed * CLIENTS, urls, routed, start_at) for client_id in range(CLIENTS)]
+    games = sum(pool.starmap(play_games, args))
+    return games / (time.time() - start_at)
+
+
+def run():
+    rows = []
+    with multiprocessing.Pool(CLIENTS) as pool:
+        for workers in WORKERS:
+            processes = spawn_shards(workers, PORT, PUBSUB_PORT, extra_env={"GAME_IDLE_TTL": "600"})
+            urls = [f"http://127.0.0.1:{PORT + i}" for i in range(workers)]
+            try:
+                wait_until_ready(urls)
+                routed = run_case(pool, urls, routed=True)
+                redirected = run_case(pool, urls, routed=False)
+            finally:
+                stop_processes(processes)
+            rows.append([workers, f"{routed:,.0f}", f"{redirected:,.0f}"])
+
+    print_table(["shards", "games/s routed", "games/s via redirect"], rows)
+    print(f"\n{CLIENTS} client processes x {GAMES_PER_CLIENT} games, {os.cpu_count()} CPU cores")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,220 @@
+"""A popular game-service room: two players and 10,000 spectators.
+
+Each frame is broadcast with `ConnectionManager.broadcast_to_game`, in one of
+three setups:
+
+- no spectators, as a baseline;
+- spectators on the room's shared `SpectatorFeed`;
+- spectators as ordinary connections with an outbound queue each, as if
+  they had joined as players.
+
+"call" is how long the broadcast held the handler that sent it. "players" is
+when both players' sockets had the frame. "next handler" is how long a
+task started right after the broadcast (the next player message, say) waited
+to run. "spectators done" is when the last spectator had the frame.
+Sockets are in-memory fakes, as in bench_broadcast.py.
+
+The second table sends a burst of frames while a tenth of the spectators
+read slowly: players' latency should not move, and spectators that cannot
+keep up skip frames instead of holding anything up.
+
+    python benchmarks/bench_spectators.py
+"""
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from _util import load_service, print_table
+
+SPECTATORS = 10_000
+ROUNDS = 20
+BURST = 64
+SLOW_SHARE = 10  # one spectator in SLOW_SHARE reads slowly in the burst test
+SLOW_SEND_DELAY = 0.05  # seconds
+BURST_INTERVAL = 0.005
+ROOM_ID = "AB12C"
+
+MESSAGE = {
+    "type": "move_received",
+    "message": "alice has made their move",
+    "userId": "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e",
+    "username": "alice",
+    "roomId": ROOM_ID,
+    "moves_count": 1,
+}
+# One round's worth of frames, repeated through the burst
+ROUND = [
+    MESSAGE,
+    {**MESSAGE, "message": "bob has made their move", "username": "bob", "moves_count": 2},
+    {"type": "game_result", "message": "Game finished!", "roomId": ROOM_ID,
+     "result": {"moves": {"alice": "rock", "bob": "paper"}, "winner": "bob"}},
+    {"type": "game_reset", "message": "Game reset - ready for next round!", "roomId": ROOM_ID},
+]
+
+
+class FakeWebSocket:
+    def __init__(self, tracker: "Tracker", player: bool = False, delay: float = 0.0):
+        self.tracker = tracker
+        self.player = player
+        self.delay = delay
+        self.received = 0
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        self.tracker.delivered(self)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+class Tracker:
+    """Times when the players, and then every fast spectator, have the current frame"""
+
+    def __init__(self):
+        self.start = 0.0
+        self.players_left = self.spectators_left = 0
+        self.players_at = self.spectators_at = 0.0
+        self.done = asyncio.Event()
+
+    def expect(self, players: int, spectators: int):
+        self.start = time.perf_counter()
+        self.players_left, self.spectators_left = players, spectators
+        self.players_at = self.spectators_at = 0.0
+        self.done.clear()
+        if not spectators:
+            self.spectators_at = self.start
+
+    def delivered(self, websocket: FakeWebSocket):
+        if websocket.delay:
+            return
+        now = time.perf_counter()
+        if websocket.player:
+            self.players_left -= 1
+            if self.players_left == 0:
+                self.players_at = now
+        else:
+            self.spectators_left -= 1
+            if self.spectators_left == 0:
+                self.spectators_at = now
+        if self.players_left <= 0 and self.spectators_left <= 0:
+            self.done.set()
+
+
+def setup(game_service, tracker: Tracker, mode: str, slow_every: int = 0, max_frames: int = BURST + 1):
+    manager = game_service.ConnectionManager()
+    manager.game_connections[ROOM_ID] = {
+        f"player{i}": game_service.OutboundQueue(
+            FakeWebSocket(tracker, player=True), manager.outbound_stats, on_close=lambda: None,
+            max_frames=BURST + 1,
+        )
+        for i in range(2)
+    }
+    sockets = [
+        FakeWebSocket(tracker, delay=SLOW_SEND_DELAY if slow_every and i % slow_every == 0 else 0.0)
+        for i in range(SPECTATORS if mode != "none" else 0)
+    ]
+    if mode == "feed":
+        spectators = [manager.spectate(websocket, ROOM_ID) for websocket in sockets]
+    else:
+        spectators = [
+            game_service.OutboundQueue(websocket, manager.outbound_stats, on_close=lambda: None, max_frames=max_frames)
+            for websocket in sockets
+        ]
+        manager.game_connections[ROOM_ID].update((f"spectator{i}", queue) for i, queue in enumerate(spectators))
+    return manager, sockets, spectators
+
+
+def teardown(manager, spectators):
+    for connection in [*manager.game_connections.get(ROOM_ID, {}).values(), *spectators]:
+        connection.close()
+
+
+async def fan_out(game_service, mode: str) -> list:
+    tracker = Tracker()
+    manager, sockets, spectators = setup(game_service, tracker, mode)
+    await asyncio.sleep(0)  # let every writer task reach its first wait
+    calls, players, handlers, everyone = [], [], [], []
+    for _ in range(ROUNDS):
+        tracker.expect(2, len(sockets))
+        handler_at = []
+        start = time.perf_counter()
+        await manager.broadcast_to_game(MESSAGE, ROOM_ID)
+        calls.append(time.perf_counter() - start)
+        asyncio.get_running_loop().call_soon(lambda: handler_at.append(time.perf_counter()))
+        await tracker.done.wait()
+        players.append(tracker.players_at - start)
+        handlers.append(handler_at[0] - start)
+        everyone.append(tracker.spectators_at - start if sockets else None)
+    teardown(manager, spectators)
+
+    tracemalloc.start()
+    manager, sockets, spectators = setup(game_service, Tracker(), mode)
+    await asyncio.sleep(0)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    teardown(manager, spectators)
+
+    label = {"none": "no spectators", "feed": "shared feed", "queues": "queue per spectator"}[mode]
+    return [
+        label, f"{len(sockets):,}", *(f"{statistics.median(v) * 1e3:.3f}" for v in (calls, players, handlers)),
+        f"{statistics.median(everyone) * 1e3:.3f}" if sockets else "-",
+        f"{memory / max(len(sockets), 1):.0f}" if sockets else "-",
+    ]
+
+
+async def burst(game_service, mode: str) -> list:
+    """BURST frames, BURST_INTERVAL apart, while every SLOW_SHARE-th spectator reads slowly
+
+    Only the players are waited for between frames. Spectator queues get
+    the service's default size, so they coalesce, drop and evict as they
+    would in production.
+    """
+    tracker = Tracker()
+    manager, sockets, spectators = setup(game_service, tracker, mode, SLOW_SHARE, max_frames=64)
+    await asyncio.sleep(0)
+    players = []
+    for i in range(BURST):
+        tracker.expect(2, 0)
+        start = time.perf_counter()
+        await manager.broadcast_to_game(ROUND[i % len(ROUND)], ROOM_ID)
+        await tracker.done.wait()
+        players.append(tracker.players_at - start)
+        await asyncio.sleep(BURST_INTERVAL)
+    await asyncio.sleep(BURST * SLOW_SEND_DELAY / 4)  # let the spectators catch up what they still can
+    stats = manager.outbound_stats
+    fast = [websocket.received for websocket in sockets if not websocket.delay]
+    slow = [websocket.received for websocket in sockets if websocket.delay]
+    teardown(manager, spectators)
+    players.sort()
+    return [
+        {"feed": "shared feed", "queues": "queue per spectator"}[mode],
+        f"{statistics.median(players) * 1e3:.3f}", f"{players[int(len(players) * 0.99)] * 1e3:.3f}",
+        f"{statistics.mean(fast):.1f}", f"{statistics.mean(slow):.1f}",
+        f"{stats.spectator_skipped_frames + stats.coalesced_frames + stats.dropped_frames:,}",
+        f"{stats.evicted_connections:,}",
+    ]
+
+
+async def main():
+    game_service = load_service("game-service")
+    print(f"One frame to 2 players and {SPECTATORS:,} spectators (median of {ROUNDS}, ms)")
+    print_table(
+        ["setup", "spectators", "call", "players", "next handler", "spectators done", "bytes/spectator"],
+        [await fan_out(game_service, mode) for mode in ("none", "feed", "queues")],
+    )
+    print(
+        f"\nBurst of {BURST} frames {BURST_INTERVAL * 1e3:g} ms apart; 1 in {SLOW_SHARE} spectators"
+        f" takes {SLOW_SEND_DELAY * 1e3:g} ms per send"
+    )
+    print_table(
+        ["setup", "players p50 ms", "players p99 ms", "frames per fast spectator", "frames per slow spectator",
+         "skipped/dropped frames", "evicted"],
+        [await burst(game_service, mode) for mode in ("feed", "queues")],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""Memory held per idle room, before and after the slotted state classes.
+
+Builds 1M idle games and 1M rooms in both the original dict layout and the
+GameState / Room classes and reports traced bytes per room. Room ids and
+the outer `rooms` dict cost the same in both layouts and are excluded.
+
+    python benchmarks/bench_state_memory.py
+"""
+import gc
+import tracemalloc
+
+from _util import load_service, print_table
+
+ROOMS = 1_000_000
+
+
+def measure(factory) -> float:
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(i) for i in range(ROOMS)]
+    container = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the objects is 8 bytes per slot in either layout
+    per_room = (container - 8 * len(objects)) / ROOMS
+    del objects
+    return per_room
+
+
+def main():
+    game_state = load_service("game-service", "state")
+    old_game = measure(lambda i: {"moves": {}, "usernames": {}, "result": None, "seen": set()})
+    new_game = measure(lambda i: game_state.GameState())
+
+    room_state = load_service("room-service", "state")
+    user_id = "3f1c2e9a-0b7d-4c55-9d0e-6f3a1b2c4d5e"
+    old_room = measure(lambda i: {"roomName": "Room", "players": [user_id], "created_by": user_id})
+    new_room = measure(lambda i: room_state.Room("Room", user_id))
+
+    print_table(
+        ["state", "dict bytes/room", "slotted bytes/room", "saved"],
+        [
+            ["game-service game", f"{old_game:.0f}", f"{new_game:.0f}", f"{1 - new_game / old_game:.0%}"],
+            ["room-service room", f"{old_room:.0f}", f"{new_room:.0f}", f"{1 - new_room / old_room:.0%}"],
+        ],
+    )
+    print(f"\n{ROOMS:,} idle rooms in each layout")
+
+
+if __name__ == "__main__":
+    main()
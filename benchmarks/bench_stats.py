@@ -0,0 +1,79 @@
+"""Stats and leaderboard cost with 1M players.
+
+Seeds game-service's StatsEngine with 1M players (one game each), then
+times further results between random players, rank lookups, player reads
+and leaderboard pages at the top and in the middle of the table. The last
+rows are what the same queries cost when computed by scanning every player,
+for comparison.
+
+    python benchmarks/bench_stats.py
+"""
+import heapq
+import random
+import time
+
+from _util import load_service, print_table
+
+PLAYERS = 1_000_000
+UPDATES = 200_000
+QUERIES = 20_000
+
+
+def per_op_us(fn, ops: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def run():
+    stats_module = load_service("game-service", "stats")
+    rules = load_service("game-service", "rules")
+    random.seed(1)
+    engine = stats_module.StatsEngine(rules.CLASSIC.moves)
+    users = [f"user{i}" for i in range(PLAYERS)]
+
+    start = time.perf_counter()
+    for i in range(0, PLAYERS, 2):
+        a, b = random.randrange(3), random.randrange(3)
+        engine.record(users[i], users[i], a, users[i + 1], users[i + 1], b, rules.CLASSIC.resolve(a, b))
+    seed_seconds = time.perf_counter() - start
+
+    games = [
+        (random.choice(users), random.choice(users), random.randrange(3), random.randrange(3))
+        for _ in range(UPDATES)
+    ]
+
+    def updates():
+        for u1, u2, a, b in games:
+            engine.record(u1, u1, a, u2, u2, b, rules.CLASSIC.resolve(a, b))
+
+    sample = random.sample(users, QUERIES)
+    rows = [
+        ["record a result", f"{per_op_us(updates, UPDATES):.2f}"],
+        ["rank of a player", f"{per_op_us(lambda: [engine.rank(u) for u in sample], QUERIES):.2f}"],
+        ["player stats", f"{per_op_us(lambda: [engine.get(u) for u in sample], QUERIES):.2f}"],
+        ["top 10", f"{per_op_us(lambda: [engine.top(10) for _ in range(QUERIES)], QUERIES):.2f}"],
+        [
+            "100 rows at offset 500k",
+            f"{per_op_us(lambda: [engine.top(100, PLAYERS // 2) for _ in range(1000)], 1000):.2f}",
+        ],
+    ]
+
+    # What the same reads cost without an order-statistics structure
+    players = engine._players
+    rows.append([
+        "top 10 by scanning all players",
+        f"{per_op_us(lambda: heapq.nsmallest(10, players.items(), key=lambda kv: (-kv[1].wins, kv[1].losses)), 1):,.0f}",
+    ])
+    target = players[sample[0]]
+    rows.append([
+        "rank by scanning all players",
+        f"{per_op_us(lambda: sum(1 for p in players.values() if (-p.wins, p.losses) < (-target.wins, target.losses)), 1):,.0f}",
+    ])
+
+    print_table(["operation", "us/op"], rows)
+    print(f"\n{len(engine):,} players, seeded in {seed_seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,154 @@
+"""Simulated tournaments through game-service's series and tournament code.
+
+Runs a single-elimination bracket and a Swiss tournament of best-of-3
+series in-process. Every live match plays one round per step, through the
+real `GameState.submit` and `process_game_result`. Then every due timer
+(series round advances and the next tournament round) is fired from the
+shared timer heap, with the clock skipped forward instead of waited out.
+The report gives game rounds per second, the peak number of concurrent
+matches and pending timers, and the asyncio task count at that peak.
+
+The last table compares the shared heap against one sleeping task per
+timer, for the same number of pending timers.
+
+    python benchmarks/bench_tournament.py
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+
+from _util import load_service, print_table
+
+TOURNAMENTS = [("bracket", 16_384, None), ("swiss", 4_096, 8)]
+BEST_OF = 3
+TIMERS = 20_000
+
+
+async def simulate(game_service, fmt: str, players: int, rounds):
+    tournament_id = game_service.new_local_id("T")
+    tournament = game_service.Tournament(
+        tournament_id, [f"user{i}" for i in range(players)], fmt, BEST_OF, rounds
+    )
+    game_service.tournaments[tournament_id] = tournament
+    skip = 0.0
+    game_rounds = peak_matches = peak_timers = peak_tasks = 0
+    start = time.perf_counter()
+    await game_service.start_tournament_round(tournament_id)
+    while tournament_id in game_service.tournaments and not tournament.finished:
+        live = [
+            (room_id, game_service.series[room_id].players)
+            for room_id, owner in game_service.tournament_rooms.items()
+            if owner == tournament_id and game_service.rooms[room_id].moves_count == 0
+            and not game_service.series[room_id].finished
+        ]
+        peak_matches = max(peak_matches, len(live))
+        for room_id, (player1, player2) in live:
+            game = game_service.rooms[room_id]
+            game.submit(player1, player1, game_service.Move(random.randrange(3)))
+            game.submit(player2, player2, game_service.Move(random.randrange(3)))
+            await game_service.process_game_result(room_id)
+        game_rounds += len(live)
+        peak_timers = max(peak_timers, len(game_service.timers))
+        peak_tasks = max(peak_tasks, len(asyncio.all_tasks()))
+        # Skip ahead instead of sleeping through the advance and round delays
+        skip += game_service.TOURNAMENT_ROUND_DELAY + game_service.SERIES_ADVANCE_DELAY
+        await game_service.timers.fire(time.monotonic() + skip)
+        # Finished matches' rooms are left to the idle reaper in the service
+        for room_id in [r for r, owner in game_service.tournament_rooms.items() if game_service.series[r].finished]:
+            game_service.expire_game(room_id)
+    elapsed = time.perf_counter() - start
+    return {
+        "format": fmt,
+        "players": players,
+        "rounds": tournament.round,
+        "game_rounds": game_rounds,
+        "seconds": elapsed,
+        "peak_matches": peak_matches,
+        "peak_timers": peak_timers,
+        "peak_tasks": peak_tasks,
+        "champion": tournament.champion,
+    }
+
+
+async def timer_costs(game_service) -> list[list]:
+    """Schedule and fire TIMERS timers both ways; memory is measured in a second, traced pass"""
+    fired = []
+
+    def heap_timers():
+        timers = game_service.TimerQueue("bench")
+        for i in range(TIMERS):
+            timers.schedule(f"room{i}", 0.2, fired.append, i)
+        return timers
+
+    async def wait_then(i):
+        await asyncio.sleep(0.2)
+        fired.append(i)
+
+    def task_timers():
+        return [asyncio.create_task(wait_then(i)) for i in range(TIMERS)]
+
+    start = time.perf_counter()
+    timers = heap_timers()
+    heap_schedule = time.perf_counter() - start
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    await timers.fire()
+    heap_fire = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tasks = task_timers()
+    await asyncio.sleep(0)  # let every task reach its sleep
+    task_schedule = time.perf_counter() - start
+    task_count = len(asyncio.all_tasks()) - 1
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    task_fire = time.perf_counter() - start
+
+    tracemalloc.start()
+    timers = heap_timers()
+    heap_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    tasks = task_timers()
+    await asyncio.sleep(0)
+    task_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await asyncio.gather(*tasks)
+
+    return [
+        ["shared heap", f"{heap_schedule / TIMERS * 1e6:.2f}", f"{heap_fire / TIMERS * 1e6:.2f}",
+         f"{heap_memory / TIMERS:.0f}", 1],
+        ["task per timer", f"{task_schedule / TIMERS * 1e6:.2f}", f"{task_fire / TIMERS * 1e6:.2f}",
+         f"{task_memory / TIMERS:.0f}", f"{task_count:,}"],
+    ]
+
+
+async def main():
+    random.seed(1)
+    game_service = load_service("game-service")
+    # The clock is skipped forward, which would otherwise forfeit every match
+    # (round deadlines have their own benchmark, bench_deadlines.py)
+    game_service.GAME_MOVE_TIMEOUT = game_service.GAME_READY_TIMEOUT = 0
+    results = [await simulate(game_service, fmt, players, rounds) for fmt, players, rounds in TOURNAMENTS]
+    print_table(
+        ["format", "players", "rounds", "game rounds", "game rounds/s", "peak matches", "peak timers", "asyncio tasks"],
+        [
+            [
+                r["format"], f"{r['players']:,}", r["rounds"], f"{r['game_rounds']:,}",
+                f"{r['game_rounds'] / r['seconds']:,.0f}", f"{r['peak_matches']:,}", f"{r['peak_timers']:,}",
+                r["peak_tasks"],
+            ]
+            for r in results
+        ],
+    )
+    print(f"\n{TIMERS:,} pending timers")
+    print_table(
+        ["timers", "schedule (us)", "fire (us)", "bytes per timer", "asyncio tasks"],
+        await timer_costs(game_service),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""What tracing costs in game-service, and the breakdown it produces.
+
+The first table times opening and closing a span: a root span that is not
+sampled, a child span of an unsampled trace (the shared no-op), and a
+sampled child span including its export to the buffer.
+
+The second plays solo rounds against the bot through the service's own
+`submit_move`, each inside a root span like the one the WebSocket handler
+opens, at sample rates of 0, 1% and 100%. Spans go to a collector listening
+in the same process, whose per-stage breakdown for the 100% run is printed
+last. Round deadlines are turned off, since the benchmark drives every room
+itself.
+
+    python benchmarks/bench_tracing.py
+"""
+import asyncio
+import time
+
+from _util import load_service, print_table, timed
+
+REPEAT = 200_000
+ROOMS = 2_000
+ROUNDS = 5  # rounds per room
+FLUSH_EVERY = 20  # rounds between flushes
+SAMPLE_RATES = [0.0, 0.01, 1.0]
+
+
+def span_costs(tracing) -> list[list]:
+    unsampled = tracing.Tracer("bench", sample_rate=0.0)
+    sampled = tracing.Tracer("bench", sample_rate=1.0, collector_url="udp://127.0.0.1:9")
+    sampled.flush = lambda: sampled._pending.clear()  # measure the span, not the socket
+
+    def root():
+        with unsampled.start_trace("root"):
+            pass
+
+    def child(tracer):
+        with tracer.span("child"):
+            pass
+
+    rows = [["root span, not sampled", f"{timed(root, REPEAT):.3f}"]]
+    with unsampled.start_trace("root"):
+        rows.append(["child span, trace not sampled", f"{timed(lambda: child(unsampled), REPEAT):.3f}"])
+    with sampled.start_trace("root"):
+        rows.append(["child span, sampled and buffered", f"{timed(lambda: child(sampled), REPEAT):.3f}"])
+    sampled._pending.clear()
+    return rows
+
+
+async def traced_rounds(game_service, rate: float) -> list:
+    tracer = game_service.tracer
+    tracer.sample_rate = rate
+    tracer.traces_sampled = tracer.spans_exported = tracer.spans_dropped = 0
+    room_ids = [f"trace{rate}-{i}" for i in range(ROOMS)]
+    for room_id in room_ids:
+        await game_service.add_bot(room_id, f"{room_id}h")
+    start = time.perf_counter()
+    for round_number in range(ROUNDS):
+        for i, room_id in enumerate(room_ids):
+            user_id = f"{room_id}h"
+            with tracer.start_trace("ws submit_move", room=room_id, user=user_id):
+                await game_service.submit_move(room_id, user_id, user_id, game_service.Move((i + round_number) % 3))
+            game = game_service.rooms[room_id]
+            if game.mark_seen(user_id) == 2:
+                game.reset()
+            if i % FLUSH_EVERY == 0:
+                # Send the buffered spans and let the collector read them, as
+                # the flush timer would between messages
+                tracer.flush()
+                await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    played = ROOMS * ROUNDS
+    for room_id in room_ids:
+        game_service.expire_game(room_id)
+    game_service.history._pending.clear()  # never flushed here
+    return [
+        f"{rate:.0%}", f"{played:,}", f"{elapsed / played * 1e6:.1f}", f"{tracer.traces_sampled:,}",
+        f"{tracer.spans_exported:,}", f"{tracer.spans_dropped:,}",
+    ]
+
+
+async def main():
+    tracing = load_service("game-service", "tracing")
+    print("Open and close one span (us)")
+    print_table(["span", "us"], span_costs(tracing))
+
+    game_service = load_service("game-service")
+    game_service.GAME_MOVE_TIMEOUT = game_service.GAME_READY_TIMEOUT = 0
+    loop = asyncio.get_running_loop()
+    rows = []
+    for rate in SAMPLE_RATES:
+        collector = tracing.SpanCollector(None)
+        transport, _ = await loop.create_datagram_endpoint(lambda: collector, local_addr=("127.0.0.1", 0))
+        host, port = transport.get_extra_info("sockname")
+        game_service.tracer.collector = (host, port)
+        rows.append(await traced_rounds(game_service, rate))
+        await asyncio.sleep(0.2)
+        transport.close()
+    game_service.tracer.close()
+    print(f"\nSolo rounds through submit_move, {ROOMS:,} rooms x {ROUNDS} rounds")
+    print_table(["sampled", "rounds", "us per round", "traces sampled", "spans exported", "spans dropped"], rows)
+    print("\nBreakdown at 100% (in-process collector)")
+    print(collector.report.render())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
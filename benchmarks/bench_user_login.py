@@ -0,0 +1,62 @@
+"""Login latency against registry size.
+
+Compares the indexed `login()` handler in user-service with the previous
+linear scan over all users, from 1k to 1M registered users.
+
+    python benchmarks/bench_user_login.py
+"""
+import asyncio
+import time
+import uuid
+
+from _util import load_service, print_table, timed
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 2_000
+
+
+def linear_login(users: dict, username: str):
+    """The original O(n) lookup, kept as the baseline"""
+    for uid, name in users.items():
+        if name == username:
+            return {"userId": uid, "username": name}
+    return None
+
+
+async def timed_async(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def run():
+    user_service = load_service("user-service")
+    rows = []
+    for size in SIZES:
+        registry = user_service.UserRegistry()
+        baseline = {}
+        for i in range(size):
+            user_id = str(uuid.uuid4())
+            registry.add(user_id, f"player{i}")
+            baseline[user_id] = f"player{i}"
+        user_service.users = registry
+
+        # Worst case for the scan: the most recently registered user
+        existing = user_service.LoginRequest(username=f"player{size - 1}")
+        indexed_us = await timed_async(lambda: user_service.login(existing), LOOKUPS)
+        scan_repeat = max(1, LOOKUPS * 1_000 // size)
+        scan_us = timed(lambda: linear_login(baseline, existing.username), scan_repeat)
+
+        counter = iter(range(LOOKUPS))
+        register_us = await timed_async(
+            lambda: user_service.login(user_service.LoginRequest(username=f"new{next(counter)}")),
+            LOOKUPS,
+        )
+        rows.append([f"{size:,}", f"{indexed_us:.2f}", f"{register_us:.2f}", f"{scan_us:.1f}"])
+
+    print_table(["users", "login us", "register us", "old scan us"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,361 @@
+"""Benchmark suite for the services' hot paths, with regression tracking.
+
+Runs the three services' ASGI apps in-process, with startup and shutdown
+through the lifespan protocol and requests and WebSockets driven straight
+into the apps, so there is no network in the measurement. Calls from Game
+Service to User Service go to User Service's app the same way. The
+services are first filled to realistic sizes (USERS users, ROOMS rooms and
+GAMES games).
+
+Each case runs in BATCHES batches. The result is the median per-operation
+time over the batches, with the 10th and 90th percentiles as a measure of
+noise. Results are written as JSON, and `--compare` lists the cases that
+got slower than a threshold between two runs, exiting with status 1 if
+any did.
+
+    python benchmarks/suite.py --out before.json
+    python benchmarks/suite.py --out after.json --baseline before.json
+    python benchmarks/suite.py --compare before.json after.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from _util import ROOT, load_service, print_table
+
+USERS = 100_000
+ROOMS = 50_000
+GAMES = 50_000
+BATCHES = 15
+THRESHOLD = 0.10  # a case this much slower than the baseline is a regression
+
+CASES = []
+
+
+def case(name: str, repeat: int):
+    """Register an async benchmark; it gets the apps and returns an async `op()` to time"""
+
+    def register(setup):
+        CASES.append((name, repeat, setup))
+        return setup
+
+    return register
+
+
+class AsgiWebSocket:
+    """A WebSocket session driven straight into an ASGI app through two queues"""
+
+    def __init__(self, app, path: str):
+        self.to_app: asyncio.Queue = asyncio.Queue()
+        self.from_app: asyncio.Queue = asyncio.Queue()
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path,
+            "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80), "subprotocols": [],
+        }
+        self.task = asyncio.create_task(app(scope, self.to_app.get, self.from_app.put))
+
+    async def connect(self):
+        await self.to_app.put({"type": "websocket.connect"})
+        message = await self.from_app.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"WebSocket refused: {message}")
+
+    async def send_json(self, data: dict):
+        await self.to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_until(self, kind: str) -> dict:
+        while True:
+            message = await self.from_app.get()
+            if message["type"] == "websocket.close":
+                raise RuntimeError(f"WebSocket closed: {message}")
+            frame = json.loads(message["text"])
+            if frame.get("type") == kind:
+                return frame
+
+    async def close(self):
+        await self.to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+
+
+class AsgiApp:
+    """A service's app, started and stopped through the lifespan protocol"""
+
+    def __init__(self, module):
+        self.module = module
+        self.app = module.app
+        self.http = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://testserver")
+
+    async def _lifespan(self, event: str):
+        await self._lifespan_events.put({"type": f"lifespan.{event}"})
+        message = await self._lifespan_replies.get()
+        if not message["type"].endswith("complete"):
+            raise RuntimeError(f"Lifespan {event} failed: {message}")
+
+    async def start(self):
+        self._lifespan_events: asyncio.Queue = asyncio.Queue()
+        self._lifespan_replies: asyncio.Queue = asyncio.Queue()
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(
+            self.app(scope, self._lifespan_events.get, self._lifespan_replies.put)
+        )
+        await self._lifespan("startup")
+
+    async def stop(self):
+        await self._lifespan("shutdown")
+        await self._lifespan_task
+        await self.http.aclose()
+
+    async def post(self, path: str, body: dict) -> dict:
+        response = await self.http.post(path, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    async def get(self, path: str) -> dict:
+        response = await self.http.get(path)
+        response.raise_for_status()
+        return response.json()
+
+    async def websocket(self, path: str) -> AsgiWebSocket:
+        websocket = AsgiWebSocket(self.app, path)
+        await websocket.connect()
+        return websocket
+
+
+def fill(apps: dict):
+    """Bring each service to its realistic size, straight into its state"""
+    user_service = apps["user"].module
+    for i in range(USERS):
+        user_service.users.add(str(uuid.uuid4()), f"user{i}")
+    room_service = apps["room"].module
+    for i in range(ROOMS):
+        room_id = room_service.generate_room_id()
+        room = room_service.rooms[room_id] = room_service.Room(f"room {i}", f"host{i}")
+        if i % 2:
+            room.add_player(f"guest{i}")
+    game_service = apps["game"].module
+    for i in range(GAMES):
+        game = game_service.rooms[f"G{i}"] = game_service.GameState()
+        if i % 3 == 0:
+            game.submit(f"host{i}", f"host{i}", game_service.Move.ROCK)
+
+
+@case("user POST /login, existing user", repeat=2_000)
+async def login_existing(apps: dict):
+    user = apps["user"]
+    names = (f"user{i % USERS}" for i in itertools.count())
+    return lambda: user.post("/login", {"username": next(names)})
+
+
+@case("user POST /login, new user", repeat=2_000)
+async def login_new(apps: dict):
+    user = apps["user"]
+    names = (f"new-{i}" for i in itertools.count())
+    return lambda: user.post("/login", {"username": next(names)})
+
+
+@case("room POST /create-room", repeat=2_000)
+async def create_room(apps: dict):
+    room = apps["room"]
+    return lambda: room.post("/create-room", {"userId": "bench-host", "roomName": "bench"})
+
+
+@case("room POST /join-room", repeat=2_000)
+async def join_room(apps: dict):
+    room = apps["room"]
+    room_service = room.module
+    room_ids = []
+    for _ in range(2_000 + BATCHES):  # one room per join, warm-up included
+        room_id = room_service.generate_room_id()
+        room_service.rooms[room_id] = room_service.Room("bench", "bench-host")
+        room_ids.append(room_id)
+    pending = iter(room_ids)
+    return lambda: room.post("/join-room", {"roomId": next(pending), "userId": "bench-guest"})
+
+
+@case("game WebSocket submit_move round trip, 2 players", repeat=1_000)
+async def websocket_round(apps: dict):
+    game = apps["game"]
+    game.module.GAME_MOVE_TIMEOUT = game.module.GAME_READY_TIMEOUT = 0
+    user_ids = [(await apps["user"].post("/login", {"username": name}))["userId"] for name in ("alice", "bob")]
+    players = [await game.websocket(f"/ws/BENCH/{user_id}") for user_id in user_ids]
+    moves = ("rock", "paper")
+
+    async def play_round():
+        for player, move in zip(players, moves):
+            await player.send_json({"type": "submit_move", "move": move})
+        for player in players:
+            await player.receive_until("game_result")
+        for player in players:
+            await player.send_json({"type": "ready_for_next_round"})
+        for player in players:
+            await player.receive_until("game_reset")
+
+    return play_round
+
+
+class StubConnection:
+    codec = load_service("game-service", "codec").JSON
+
+    def put(self, frame, kind: str):
+        pass
+
+
+@case("game broadcast_to_game, 2 players", repeat=50_000)
+async def broadcast_two(apps: dict):
+    return broadcast(apps["game"].module, 2)
+
+
+@case("game broadcast_to_game, 100 connections", repeat=10_000)
+async def broadcast_hundred(apps: dict):
+    return broadcast(apps["game"].module, 100)
+
+
+def broadcast(game_service, connections: int):
+    manager = game_service.ConnectionManager()
+    manager.game_connections["FANOUT"] = {f"user{i}": StubConnection() for i in range(connections)}
+    message = {"type": "move_received", "message": "alice has made their move", "roomId": "FANOUT", "moves_count": 1}
+    return lambda: manager.broadcast_to_game(message, "FANOUT")
+
+
+@case("game calculate_winner", repeat=200_000)
+async def calculate_winner(apps: dict):
+    game_service = apps["game"].module
+    pairs = [(a, b) for a in game_service.Move for b in game_service.Move]
+    pending = itertools.cycle(pairs)
+
+    async def resolve():
+        move1, move2 = next(pending)
+        game_service.calculate_winner(move1, move2, "alice", "bob")
+
+    return resolve
+
+
+@case(f"user GET /health, {USERS:,} users", repeat=2_000)
+async def user_health(apps: dict):
+    return lambda: apps["user"].get("/health")
+
+
+@case(f"room GET /health, {ROOMS:,} rooms", repeat=2_000)
+async def room_health(apps: dict):
+    return lambda: apps["room"].get("/health")
+
+
+@case(f"game GET /health, {GAMES:,} games", repeat=2_000)
+async def game_health(apps: dict):
+    return lambda: apps["game"].get("/health")
+
+
+async def measure(op, repeat: int) -> dict:
+    per_op = []
+    for _ in range(BATCHES):
+        start = time.perf_counter()
+        for _ in range(repeat // BATCHES or 1):
+            await op()
+        per_op.append((time.perf_counter() - start) / (repeat // BATCHES or 1) * 1e6)
+    per_op.sort()
+    deciles = statistics.quantiles(per_op, n=10)
+    return {"median_us": statistics.median(per_op), "p10_us": deciles[0], "p90_us": deciles[-1], "ops": repeat}
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {"users": USERS, "rooms": ROOMS, "games": GAMES},
+    }
+
+
+async def run(selected: list) -> dict:
+    apps = {name: AsgiApp(load_service(f"{name}-service")) for name in ("user", "room", "game")}
+    # Game Service's username lookups go to User Service's app, not the network
+    apps["game"].module.username_resolver._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=apps["user"].app), base_url="http://testserver",
+    )
+    for app in apps.values():
+        await app.start()
+    fill(apps)
+    results = {}
+    try:
+        for name, repeat, setup in selected:
+            op = await setup(apps)
+            await measure(op, BATCHES)  # warm up
+            results[name] = await measure(op, repeat)
+            result = results[name]
+            print(f"{name}: {result['median_us']:,.2f} us (p10 {result['p10_us']:,.2f}, p90 {result['p90_us']:,.2f})")
+    finally:
+        for app in apps.values():
+            await app.stop()
+    return {"meta": metadata(), "results": results}
+
+
+def compare(before: dict, after: dict, threshold: float) -> list[str]:
+    """Print both runs side by side; the names of the cases that regressed"""
+    rows, regressions = [], []
+    for name in {**before["results"], **after["results"]}:
+        old, new = before["results"].get(name), after["results"].get(name)
+        if old is None or new is None:
+            rows.append([name, f"{old['median_us']:,.2f}" if old else "-", f"{new['median_us']:,.2f}" if new else "-",
+                         "-", "new" if old is None else "missing"])
+            continue
+        change = new["median_us"] / old["median_us"] - 1
+        if change > threshold:
+            # Overlapping p10-p90 ranges mean the runs differ by less than their noise
+            verdict = "REGRESSION" if new["p10_us"] > old["p90_us"] else "regression (noisy)"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        rows.append([name, f"{old['median_us']:,.2f}", f"{new['median_us']:,.2f}", f"{change:+.1%}", verdict])
+    print(f"Before: {before['meta'].get('commit')} ({before['meta'].get('date')}), "
+          f"after: {after['meta'].get('commit')} ({after['meta'].get('date')}), threshold {threshold:.0%}")
+    print_table(["case", "before us", "after us", "change", "verdict"], rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the services' hot paths in-process")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this earlier JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="slowdown that counts as a regression (default 0.10, i.e. 10%%)")
+    parser.add_argument("--filter", default="", help="run only the cases whose name contains this")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as before, open(args.compare[1], encoding="utf-8") as after:
+            regressions = compare(json.load(before), json.load(after), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = asyncio.run(run([c for c in CASES if args.filter in c[0]]))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            json.dump(results, out, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            regressions = compare(json.load(baseline), results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
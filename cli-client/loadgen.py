@@ -0,0 +1,449 @@
+"""Headless load generator for the RPS services.
+
+Simulates pairs of players speaking the same protocol as the CLI client.
+Each player logs in and one of the pair creates a room that the other
+joins. They play ROUNDS rounds over the game WebSocket (or the HTTP
+long-polling fallback), reconnecting every few rounds, then leave and start
+over. Each stage runs a fixed number of concurrent players for a while and
+reports throughput, p50/p99/p999 latency and error rates per step. With a
+list of player counts, the stages ramp up and the summary shows where each
+service stops scaling.
+
+    python loadgen.py --players 100,200,400,800 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+import websockets
+
+import protocol
+from main import GAME_SERVICE_URL, LONG_POLL_WAIT, ROOM_SERVICE_URL, USER_SERVICE_URL
+
+MOVES = ("rock", "paper", "scissors")
+# Steps timed by the load generator, by the service that serves them
+SERVICE_STEPS = {
+    "user-service": ("login",),
+    "room-service": ("create_room", "join_room", "leave_room"),
+    "game-service": ("ws_connect", "round", "reset", "http_play", "http_round"),
+}
+STEP_SERVICE = {step: service for service, steps in SERVICE_STEPS.items() for step in steps}
+SATURATION_GAIN = 0.10  # a stage that adds less throughput than this has saturated
+SATURATION_ERRORS = 0.01  # ... as has one with more errors than this
+
+
+class LoadError(Exception):
+    """A step that failed; counted by step and kind, then the pair starts a new session"""
+
+    def __init__(self, step: str, kind: str):
+        super().__init__(f"{step}: {kind}")
+        self.step = step
+        self.kind = kind
+
+
+def _percentile(values: list[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Recorder:
+    """Latencies and errors per step for one stage; nothing is recorded after `until`"""
+
+    def __init__(self, until: float):
+        self.until = until
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.slowest_traced: dict[str, tuple[float, str]] = {}
+
+    def ok(self, step: str, seconds: float, trace_id: Optional[str] = None):
+        if time.perf_counter() > self.until:
+            return
+        self.latencies[step].append(seconds)
+        if trace_id is not None and seconds > self.slowest_traced.get(step, (0.0, ""))[0]:
+            self.slowest_traced[step] = (seconds, trace_id)
+
+    def error(self, step: str, kind: str):
+        if time.perf_counter() <= self.until:
+            self.errors[step][kind] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        steps = {}
+        for step in sorted(set(self.latencies) | set(self.errors), key=list(STEP_SERVICE).index):
+            values = sorted(self.latencies.get(step, ()))
+            errors = sum(self.errors[step].values()) if step in self.errors else 0
+            steps[step] = {
+                "service": STEP_SERVICE[step],
+                "count": len(values),
+                "per_second": len(values) / elapsed,
+                "p50_ms": _percentile(values, 0.5) * 1e3 if values else None,
+                "p99_ms": _percentile(values, 0.99) * 1e3 if values else None,
+                "p999_ms": _percentile(values, 0.999) * 1e3 if values else None,
+                "errors": dict(self.errors[step]) if step in self.errors else {},
+                "error_rate": errors / (errors + len(values)) if errors else 0.0,
+            }
+            if step in self.slowest_traced:
+                seconds, trace_id = self.slowest_traced[step]
+                steps[step]["slowest_traced"] = {"ms": seconds * 1e3, "traceId": trace_id}
+        return steps
+
+
+class Player:
+    """One simulated player: a user ID and, while playing over WebSocket, its game socket"""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.user_id: Optional[str] = None
+        self.websocket = None
+
+    async def send(self, message: dict):
+        await self.websocket.send(protocol.encode(self.websocket, message))
+
+    async def expect(self, kind: str, step: str, timeout: float) -> dict:
+        """Read frames until one of type `kind` arrives, skipping the others"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise LoadError(step, "timeout")
+            try:
+                frame = protocol.decode(await asyncio.wait_for(self.websocket.recv(), remaining))
+            except asyncio.TimeoutError:
+                raise LoadError(step, "timeout")
+            except websockets.exceptions.ConnectionClosed as e:
+                raise LoadError(step, f"closed {e.rcvd.code if e.rcvd else 'abnormally'}")
+            if frame.get("type") == kind:
+                return frame
+            if frame.get("type") == "error":
+                raise LoadError(step, f"error frame: {frame.get('message')}")
+
+
+class PlayerPair:
+    """Two players who log in, share a room and play each other until the stage ends"""
+
+    def __init__(self, name: str, http: httpx.AsyncClient, recorder: Recorder, args, use_http: bool):
+        self.players = (Player(f"{name}a"), Player(f"{name}b"))
+        self.http = http
+        self.recorder = recorder
+        self.args = args
+        self.use_http = use_http
+        self.game_ws_url = args.game_url.replace("http", "ws", 1)
+
+    def traceparent(self) -> tuple[Optional[str], Optional[str]]:
+        """A sampled `traceparent` for a share `--trace-rate` of requests and messages"""
+        if not self.args.trace_rate or random.random() >= self.args.trace_rate:
+            return None, None
+        trace_id = f"{random.getrandbits(128):032x}"
+        return f"00-{trace_id}-{random.getrandbits(64):016x}-01", trace_id
+
+    def stopping(self) -> bool:
+        return time.perf_counter() >= self.recorder.until
+
+    async def request(self, step: str, method: str, url: str, record: bool = True, **kwargs) -> dict:
+        traceparent, trace_id = self.traceparent()
+        headers = {"traceparent": traceparent} if traceparent else None
+        kwargs.setdefault("timeout", self.args.timeout)
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            raise LoadError(step, type(e).__name__)
+        if response.status_code != 200:
+            raise LoadError(step, f"HTTP {response.status_code}")
+        if record:
+            self.recorder.ok(step, time.perf_counter() - started, trace_id)
+        return response.json()
+
+    async def message(self, step: str, player: Player, message: dict) -> Optional[str]:
+        """Send a game message, with a `traceparent` when it is traced; the trace ID or None"""
+        traceparent, trace_id = self.traceparent()
+        if traceparent:
+            message["traceparent"] = traceparent
+        try:
+            await player.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            raise LoadError(step, "closed")
+        return trace_id
+
+    async def run(self):
+        """Play sessions until the stage ends; a failed step ends the session"""
+        while not self.stopping():
+            try:
+                await self.session()
+            except LoadError as e:
+                self.recorder.error(e.step, e.kind)
+                await asyncio.sleep(random.uniform(0.5, 1.0))
+
+    async def login(self, player: Player):
+        data = await self.request("login", "POST", f"{self.args.user_url}/login", json={"username": player.username})
+        player.user_id = data["userId"]
+
+    async def session(self):
+        host, guest = self.players
+        await asyncio.gather(self.login(host), self.login(guest))
+        room = await self.request(
+            "create_room", "POST", f"{self.args.room_url}/create-room",
+            json={"userId": host.user_id, "roomName": f"load {host.username}"},
+        )
+        room_id = room["roomId"]
+        try:
+            await self.request(
+                "join_room", "POST", f"{self.args.room_url}/join-room", json={"roomId": room_id, "userId": guest.user_id},
+            )
+            if self.use_http:
+                await self.play_http(room_id)
+            else:
+                await self.play_websocket(room_id)
+        finally:
+            for player in self.players:
+                try:
+                    await self.request(
+                        "leave_room", "POST", f"{self.args.room_url}/leave-room",
+                        json={"roomId": room_id, "userId": player.user_id},
+                    )
+                except LoadError as e:
+                    # The guest may not have joined
+                    if e.kind != "HTTP 404":
+                        self.recorder.error(e.step, e.kind)
+
+    async def connect(self, player: Player, room_id: str):
+        started = time.perf_counter()
+        try:
+            player.websocket = await asyncio.wait_for(
+                websockets.connect(
+                    f"{self.game_ws_url}/ws/{room_id}/{player.user_id}",
+                    subprotocols=protocol.subprotocols(self.args.protocol),
+                ),
+                self.args.timeout,
+            )
+        except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+            raise LoadError("ws_connect", type(e).__name__)
+        await player.expect("game_connected", "ws_connect", self.args.timeout)
+        self.recorder.ok("ws_connect", time.perf_counter() - started)
+
+    async def play_websocket(self, room_id: str):
+        played = 0
+        while played < self.args.rounds and not self.stopping():
+            try:
+                await asyncio.gather(*(self.connect(player, room_id) for player in self.players))
+                for _ in range(self.args.reconnect_every or self.args.rounds):
+                    await self.websocket_round()
+                    played += 1
+                    if played >= self.args.rounds or self.stopping():
+                        break
+            finally:
+                for player in self.players:
+                    if player.websocket is not None:
+                        await player.websocket.close()
+                        player.websocket = None
+
+    async def think(self):
+        if self.args.think:
+            await asyncio.sleep(random.uniform(0, self.args.think))
+
+    async def websocket_round(self):
+        """Both players move; the round is timed from the second move to each player's result"""
+        sent: list[tuple[float, Optional[str]]] = []
+
+        async def send(player: Player, step: str, message: dict, answer: str) -> float:
+            if step == "round":
+                await self.think()
+            trace_id = await self.message(step, player, message)
+            sent.append((time.perf_counter(), trace_id))
+            await player.expect(answer, step, self.args.timeout)
+            return time.perf_counter()
+
+        for step, answer in (("round", "game_result"), ("reset", "game_reset")):
+            sent.clear()
+            answered = await asyncio.gather(*(
+                send(player, step, {"type": "submit_move", "move": random.choice(MOVES)}
+                     if step == "round" else {"type": "ready_for_next_round"}, answer)
+                for player in self.players
+            ))
+            last_sent, trace_id = max(sent, key=lambda s: s[0])
+            for at in answered:
+                self.recorder.ok(step, at - last_sent, trace_id)
+
+    async def play_http(self, room_id: str):
+        for _ in range(self.args.rounds):
+            if self.stopping():
+                return
+            moved: list[float] = []
+
+            async def play(player: Player) -> float:
+                await self.think()
+                await self.request(
+                    "http_play", "POST", f"{self.args.game_url}/play",
+                    json={"roomId": room_id, "userId": player.user_id, "username": player.username,
+                          "move": random.choice(MOVES)},
+                )
+                moved.append(time.perf_counter())
+                while True:
+                    data = await self.request(
+                        "http_round", "GET", f"{self.args.game_url}/state/{room_id}/{player.user_id}", record=False,
+                        params={"wait": LONG_POLL_WAIT}, timeout=self.args.timeout + LONG_POLL_WAIT,
+                    )
+                    if "moves" in data:
+                        return time.perf_counter()
+                    if data.get("status") == "room not found":
+                        raise LoadError("http_round", "room not found")
+
+            answered = await asyncio.gather(*(play(player) for player in self.players))
+            last_moved = max(moved)
+            for at in answered:
+                self.recorder.ok("http_round", at - last_moved)
+
+
+async def run_stage(args, players: int, run_id: str) -> dict:
+    pairs = max(1, players // 2)
+    started = time.perf_counter()
+    recorder = Recorder(float("inf"))
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    cpu_started = time.process_time()
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout + LONG_POLL_WAIT) as http:
+        tasks = []
+        for i in range(pairs):
+            pair = PlayerPair(f"load{run_id}-{i}", http, recorder, args, use_http=random.random() < args.http_share)
+            tasks.append(asyncio.create_task(pair.run()))
+            # Spread the first logins over the ramp-up instead of sending them all at once
+            await asyncio.sleep(args.ramp_up / pairs)
+        # Only steps that finish within the measured window count
+        measure_from = time.perf_counter()
+        recorder.until = measure_from + args.duration
+        recorder.latencies.clear()
+        recorder.errors.clear()
+        recorder.slowest_traced.clear()
+        await asyncio.sleep(args.duration)
+        _, pending = await asyncio.wait(tasks, timeout=args.timeout + LONG_POLL_WAIT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    elapsed = args.duration
+    return {
+        "players": pairs * 2,
+        "seconds": elapsed,
+        "client_cpu": (time.process_time() - cpu_started) / (time.perf_counter() - started),
+        "steps": recorder.summary(elapsed),
+    }
+
+
+def print_table(headers: list[str], rows: list[list]):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) if i == 0 else str(h).rjust(w) for i, (h, w) in enumerate(zip(headers, widths))))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) if i == 0 else str(c).rjust(w) for i, (c, w) in enumerate(zip(row, widths))))
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_stage(stage: dict):
+    steps = stage["steps"]
+    rounds = sum(steps[step]["count"] for step in ("round", "http_round") if step in steps) / 2
+    print(
+        f"\n{stage['players']:,} players, {stage['seconds']:.0f} s: {rounds / stage['seconds']:,.0f} rounds/s, "
+        f"load generator CPU {stage['client_cpu']:.0%}"
+    )
+    if not steps:
+        print("  nothing completed")
+        return
+    print_table(
+        ["step", "service", "count", "per s", "p50 ms", "p99 ms", "p999 ms", "errors", "error %"],
+        [
+            [step, s["service"], f"{s['count']:,}", f"{s['per_second']:,.1f}", _ms(s["p50_ms"]), _ms(s["p99_ms"]),
+             _ms(s["p999_ms"]), f"{sum(s['errors'].values()):,}", f"{s['error_rate']:.2%}"]
+            for step, s in steps.items()
+        ],
+    )
+    for step, s in steps.items():
+        if s["errors"]:
+            kinds = ", ".join(f"{kind} x{count}" for kind, count in sorted(s["errors"].items(), key=lambda kv: -kv[1]))
+            print(f"  {step} errors: {kinds}")
+    for step, s in steps.items():
+        if "slowest_traced" in s:
+            print(f"  slowest traced {step}: {s['slowest_traced']['ms']:.1f} ms, trace {s['slowest_traced']['traceId']}")
+    if stage["client_cpu"] > 0.9:
+        print("  ! The load generator is CPU-bound at this stage; run several instances to push further")
+
+
+def service_load(stage: dict, service: str) -> tuple[float, float, float]:
+    """(operations per second, worst p99 in ms, error rate) of a service's steps in a stage"""
+    steps = [s for s in stage["steps"].values() if s["service"] == service]
+    per_second = sum(s["per_second"] for s in steps)
+    p99 = max((s["p99_ms"] for s in steps if s["p99_ms"] is not None), default=0.0)
+    total = sum(s["count"] for s in steps)
+    errors = sum(sum(s["errors"].values()) for s in steps)
+    return per_second, p99, errors / (errors + total) if errors else 0.0
+
+
+def print_saturation(stages: list[dict]):
+    """Where each service stopped scaling: the first stage that added little throughput or had errors"""
+    print("\nSaturation (operations/s, worst p99 ms, by players)")
+    rows = []
+    for service in SERVICE_STEPS:
+        loads = [service_load(stage, service) for stage in stages]
+        if not any(per_second for per_second, _, _ in loads):
+            continue
+        verdict = f"not saturated up to {stages[-1]['players']:,} players"
+        for i, (per_second, p99, errors) in enumerate(loads):
+            if errors > SATURATION_ERRORS:
+                verdict = f"errors at {stages[i]['players']:,} players ({errors:.1%})"
+                break
+            if i and per_second < loads[i - 1][0] * (1 + SATURATION_GAIN):
+                verdict = (
+                    f"saturates near {stages[i - 1]['players']:,} players "
+                    f"({per_second / loads[i - 1][0] - 1:+.0%} throughput, p99 x{p99 / max(loads[i - 1][1], 1e-9):.1f})"
+                )
+                break
+        rows.append([service, *(f"{per_second:,.0f} / {p99:.1f}" for per_second, p99, _ in loads), verdict])
+    print_table(["service", *(f"{stage['players']:,}" for stage in stages), "verdict"], rows)
+
+
+async def main_async(args):
+    run_id = f"{random.getrandbits(24):06x}"
+    stages = []
+    for players in args.players:
+        stage = await run_stage(args, players, run_id)
+        print_stage(stage)
+        stages.append(stage)
+    if len(stages) > 1:
+        print_saturation(stages)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json"}, "stages": stages}, out, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent players against the RPS services")
+    parser.add_argument("--players", type=lambda value: [int(n) for n in value.split(",")], default=[100],
+                        help="concurrent players, or a comma-separated list to ramp through (default 100)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds each stage is measured")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which a stage's players start")
+    parser.add_argument("--rounds", type=int, default=10, help="rounds per room before the players leave and start over")
+    parser.add_argument("--reconnect-every", type=int, default=5,
+                        help="rounds between WebSocket reconnects (0 never reconnects)")
+    parser.add_argument("--http-share", type=float, default=0.0,
+                        help="share of pairs that play over HTTP long-polling instead of WebSocket")
+    parser.add_argument("--think", type=float, default=0.0, help="up to this many seconds of thinking before a move")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a step counts as timed out")
+    parser.add_argument("--trace-rate", type=float, default=0.0,
+                        help="share of requests and messages sent with a sampled traceparent")
+    parser.add_argument("--protocol", choices=["json", "msgpack"], default=protocol.PROTOCOL,
+                        help="game WebSocket protocol to offer (msgpack needs the msgpack package)")
+    parser.add_argument("--user-url", default=USER_SERVICE_URL)
+    parser.add_argument("--room-url", default=ROOM_SERVICE_URL)
+    parser.add_argument("--game-url", default=GAME_SERVICE_URL)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == "__main__":
+    main()
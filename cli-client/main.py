@@ -1,14 +1,22 @@
 import requests
 import asyncio
 import websockets
-import json
 import threading
-import time
 from typing import Optional
 
+import protocol
+
 USER_SERVICE_URL = "http://localhost:8000"
 ROOM_SERVICE_URL = "http://localhost:8001"
 GAME_SERVICE_URL = "http://localhost:8002"
+LONG_POLL_WAIT = 25  # seconds the game service may hold a /state request
+
+def error_detail(response) -> str:
+    """The `detail` of an error response, or its status and body"""
+    try:
+        return response.json()["detail"]
+    except (ValueError, KeyError, TypeError):
+        return f"HTTP {response.status_code} {response.text}"
 
 class GameClient:
     def __init__(self):
@@ -20,6 +28,9 @@ class GameClient:
         self.game_active = False
         self.waiting_for_result = False
         self.current_result = None
+        self.best_of = 1
+        self.spectating = False
+        self.play_bot = False
 
     def login(self):
         """Login or register a user"""
@@ -41,9 +52,18 @@ class GameClient:
 
     def create_or_join_room(self):
         """Create or join a game room"""
-        choice = input("Create or join room? (c/j): ").lower()
+        choice = input("Create a room, join one, find an opponent, play the bot, or watch a room? (c/j/m/b/w): ").lower()
         
         try:
+            if choice == "m":
+                return self.find_match()
+            if choice == "b":
+                self.play_bot = True
+                choice = "c"
+            if choice == "w":
+                self.room_id = input("Enter room ID to watch: ").strip().upper()
+                self.spectating = True
+                return True
             if choice == "c":
                 room_name = input("Enter a name for the room: ")
                 response = requests.post(
@@ -66,7 +86,7 @@ class GameClient:
                 )
                 if response.status_code == 200:
                     data = response.json()
-                    self.room_id = room_id
+                    self.room_id = data.get("roomId", room_id)
                     room_name = data.get("roomName", room_id)
                     players = data.get("players", [])
                     print(f"✅ Joined room '{room_name}' with {len(players)} players")
@@ -78,12 +98,34 @@ class GameClient:
             print(f"❌ Room operation error: {e}")
             return False
 
+    def find_match(self):
+        """Queue for an automatic opponent and wait until paired into a room"""
+        response = requests.post(f"{ROOM_SERVICE_URL}/matchmaking/enqueue", json={"userId": self.user_id})
+        if response.status_code != 200:
+            print(f"❌ Matchmaking failed: {response.text}")
+            return False
+        data = response.json()
+        print("🔎 Looking for an opponent...")
+        while data.get("status") == "queued":
+            response = requests.get(
+                f"{ROOM_SERVICE_URL}/matchmaking/status/{self.user_id}",
+                params={"wait": LONG_POLL_WAIT},
+                timeout=LONG_POLL_WAIT + 10,
+            )
+            if response.status_code != 200:
+                print(f"❌ Matchmaking failed: {response.text}")
+                return False
+            data = response.json()
+        self.room_id = data["roomId"]
+        print(f"✅ Opponent found! Playing in room {self.room_id}")
+        return True
+
     async def handle_game_messages(self, websocket):
         """Handle incoming WebSocket messages from game service"""
         try:
             async for message in websocket:
                 try:
-                    data = json.loads(message)
+                    data = protocol.decode(message)
                     msg_type = data.get("type", "")
                     
                     if msg_type == "game_connected":
@@ -112,24 +154,38 @@ class GameClient:
                             print("🤝 Result: It's a draw!")
                         else:
                             print(f"🏆 Winner: {winner}")
+                        if result.get("forfeit"):
+                            print(f"⏰ {result['forfeit']} ran out of time")
+                        series = result.get("series")
+                        if series:
+                            self.print_series(series)
                         print("="*50)
                         
                         self.current_result = result
+                        if series and not series.get("winner"):
+                            # The server starts the next round of the series
+                            print("⏭️  Next round starts shortly...")
+                        elif not series:
+                            self.waiting_for_result = False
+                            await self.ask_play_again(websocket)
+
+                    elif msg_type == "bot_joined":
+                        print(f"🤖 {data.get('message', 'The bot joined')}")
+
+                    elif msg_type == "series_started":
+                        print(f"\n🏁 {data.get('message', 'Series started')}")
+
+                    elif msg_type == "series_result":
+                        print(f"\n🏆 {data.get('message', 'Series over')}")
                         self.waiting_for_result = False
-                        
-                        # Ask if user wants to play again
-                        play_again = input("\nPlay another round? (y/n): ").lower()
-                        if play_again == 'y':
-                            await websocket.send(json.dumps({
-                                "type": "ready_for_next_round"
-                            }))
-                        else:
-                            self.game_active = False
-                            print("Thanks for playing! 👋")
+                        await self.ask_play_again(websocket)
                         
                     elif msg_type == "game_reset":
                         print("\n🔄 " + data.get("message", "Game reset"))
+                        if data.get("series"):
+                            self.print_series(data["series"])
                         print("Ready for next round!")
+                        self.waiting_for_result = False
                         
                     elif msg_type == "player_disconnected":
                         print(f"⚠️  {data.get('message', 'Player disconnected')}")
@@ -137,7 +193,7 @@ class GameClient:
                     elif msg_type == "error":
                         print(f"❌ Error: {data.get('message', 'Unknown error')}")
                         
-                except json.JSONDecodeError:
+                except ValueError:
                     print(f"⚠️  Received invalid message: {message}")
                     
         except websockets.exceptions.ConnectionClosed:
@@ -145,18 +201,36 @@ class GameClient:
         except Exception as e:
             print(f"❌ Game message handler error: {e}")
 
+    def print_series(self, series: dict):
+        score = " - ".join(f"{p.get('username') or 'Player'} {p['wins']}" for p in series.get("players", []))
+        print(f"📈 Best of {series['bestOf']}: {score or 'no rounds yet'}")
+
+    async def ask_play_again(self, websocket):
+        play_again = input("\nPlay another round? (y/n): ").lower()
+        if play_again == 'y':
+            await websocket.send(protocol.encode(websocket, {
+                "type": "ready_for_next_round"
+            }))
+        else:
+            self.game_active = False
+            print("Thanks for playing! 👋")
+
     async def connect_to_game(self):
         """Connect to game service via WebSocket"""
         try:
             game_ws_url = f"ws://localhost:8002/ws/{self.room_id}/{self.user_id}"
             print(f"🔌 Connecting to game service...")
             
-            async with websockets.connect(game_ws_url) as websocket:
+            async with websockets.connect(game_ws_url, subprotocols=protocol.subprotocols()) as websocket:
                 self.game_websocket = websocket
-                print("✅ Connected to game service")
+                print(f"✅ Connected to game service ({websocket.subprotocol or 'json'})")
                 
                 # Start message handler
                 message_task = asyncio.create_task(self.handle_game_messages(websocket))
+                if self.play_bot:
+                    await websocket.send(protocol.encode(websocket, {"type": "add_bot"}))
+                if self.best_of > 1:
+                    await websocket.send(protocol.encode(websocket, {"type": "start_series", "bestOf": self.best_of}))
                 
                 # Game loop
                 self.game_active = True
@@ -168,7 +242,7 @@ class GameClient:
                             
                             if move in ["rock", "paper", "scissors"]:
                                 self.waiting_for_result = True
-                                await websocket.send(json.dumps({
+                                await websocket.send(protocol.encode(websocket, {
                                     "type": "submit_move",
                                     "move": move
                                 }))
@@ -193,43 +267,78 @@ class GameClient:
         except Exception as e:
             print(f"❌ Failed to connect to game service: {e}")
 
+    async def spectate(self):
+        """Watch a room's rounds without playing"""
+        spectate_url = f"ws://localhost:8002/spectate/{self.room_id}"
+        async with websockets.connect(spectate_url, subprotocols=protocol.subprotocols()) as websocket:
+            async for message in websocket:
+                data = protocol.decode(message)
+                msg_type = data.get("type", "")
+                if msg_type == "spectating":
+                    print(f"👀 {data['message']} ({data['spectators']} watching) - press Ctrl+C to stop")
+                elif msg_type == "game_result":
+                    result = data["result"]
+                    moves = ", ".join(f"{player}: {move}" for player, move in result.get("moves", {}).items())
+                    winner = result.get("winner")
+                    print(f"🏆 {moves} - {'draw' if winner == 'draw' else f'{winner} wins'}")
+                    if result.get("forfeit"):
+                        print(f"⏰ {result['forfeit']} ran out of time")
+                    if result.get("series"):
+                        self.print_series(result["series"])
+                else:
+                    print(f"• {data.get('message', msg_type)}")
+
     async def play_game_websocket(self):
         """Play the game using WebSocket communication"""
         print("\n🎮 Starting game with WebSocket communication...")
         print("Game Rules: Rock beats Scissors, Scissors beats Paper, Paper beats Rock")
         print("Both players need to make their moves, then results will be revealed!")
+        best_of = input("Play a series? Best of (3/5/7, Enter for single rounds): ").strip()
+        self.best_of = int(best_of) if best_of in ("3", "5", "7") else 1
         
         await self.connect_to_game()
 
     def play_game_http_fallback(self):
-        """Fallback to HTTP polling if WebSocket fails"""
+        """Fallback to HTTP long-polling if WebSocket fails"""
         print("\n🔄 Falling back to HTTP polling...")
         print("Game start! Only 2 players allowed.")
         move = input("Enter your move (rock/paper/scissors): ").lower()
 
         try:
             # Submit the move
-            requests.post(
+            response = requests.post(
                 f"{GAME_SERVICE_URL}/play",
                 json={"roomId": self.room_id, "userId": self.user_id, "username": self.username, "move": move}
             )
+            if response.status_code != 200:
+                print(f"❌ Move rejected: {error_detail(response)}")
+                return
 
-            # Poll for result
+            # Long-poll for result: the server holds each request until the
+            # result is ready or LONG_POLL_WAIT seconds pass
             print("⏳ Waiting for result...")
             while True:
-                response = requests.get(f"{GAME_SERVICE_URL}/state/{self.room_id}/{self.user_id}")
+                response = requests.get(
+                    f"{GAME_SERVICE_URL}/state/{self.room_id}/{self.user_id}",
+                    params={"wait": LONG_POLL_WAIT},
+                    timeout=LONG_POLL_WAIT + 10,
+                )
+                if response.status_code != 200:
+                    print(f"❌ Cannot get the result: {error_detail(response)}")
+                    return
                 data = response.json()
 
-                if "moves" not in data:
-                    print(f"Status: {data.get('status', 'waiting...')}")
-                    time.sleep(2)
-                else:
+                if "moves" in data:
                     print("✅ Round finished!")
                     print("Moves revealed:")
                     for player, m in data["moves"].items():
                         print(f"  {player}: {m}")
                     print(f"🏆 Winner: {data['winner']}")
                     break
+                print(f"Status: {data.get('status', 'unknown')}")
+                # Only a round still waiting for moves is worth asking about again
+                if data.get("status") != "waiting":
+                    return
         except Exception as e:
             print(f"❌ HTTP game error: {e}")
 
@@ -246,6 +355,10 @@ class GameClient:
         if not self.create_or_join_room():
             return
         
+        if self.spectating:
+            await self.spectate()
+            return
+
         # Try WebSocket game first, fallback to HTTP if needed
         try:
             await self.play_game_websocket()
@@ -0,0 +1,103 @@
+"""Encoding of game WebSocket frames.
+
+Frames are JSON text unless the client offers the binary protocol, in which
+case the server may answer with MessagePack frames whose top-level keys are
+shortened and whose type is a small integer. The tables mirror the services'
+`shared/codec.py` and must change with it.
+
+Set RPS_PROTOCOL=msgpack (with the msgpack package installed) to offer it.
+"""
+import json
+import os
+from typing import Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # Only JSON is offered
+    msgpack = None
+
+BINARY_SUBPROTOCOL = "rps.msgpack"
+PROTOCOL = os.environ.get("RPS_PROTOCOL", "json")
+
+KEYS = {
+    "type": "t",
+    "message": "m",
+    "roomId": "r",
+    "userId": "u",
+    "username": "n",
+    "moves_count": "c",
+    "move": "v",
+    "result": "R",
+    "game_status": "g",
+    "series": "s",
+    "players": "p",
+    "spectators": "S",
+    "traceId": "x",
+    "traceparent": "X",
+    "bestOf": "B",
+    "bot": "b",
+}
+LONG_KEYS = {short: key for key, short in KEYS.items()}
+TYPES = (
+    "move_received", "game_result", "game_reset", "submit_move", "ready_for_next_round", "game_status",
+    "get_game_status", "room_status", "chat", "chat_message", "echo", "error", "game_connected",
+    "player_disconnected", "user_connected", "user_disconnected", "user_left", "connection_established",
+    "spectating", "series_started", "series_result", "start_series", "add_bot", "bot_joined", "queued",
+    "match_found", "cancelled", "tournament_status", "match_assigned", "tournament_round",
+    "tournament_round_finished", "tournament_finished",
+)
+TYPE_CODES = {kind: code for code, kind in enumerate(TYPES, 1)}
+TEXTS = {
+    "move_received": "{username} has made their move",
+    "game_reset": "Game reset - ready for next round!",
+}
+
+
+def subprotocols(protocol: str = PROTOCOL) -> Optional[list[str]]:
+    """What to offer in the WebSocket handshake for `protocol` ("json" or "msgpack")"""
+    if protocol == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("The msgpack protocol needs the msgpack package (pip install msgpack)")
+        return [BINARY_SUBPROTOCOL]
+    return None
+
+
+def compact(message: dict) -> dict:
+    compacted = {KEYS.get(key, key): value for key, value in message.items()}
+    if "t" in compacted:
+        compacted["t"] = TYPE_CODES.get(compacted["t"], compacted["t"])
+    return compacted
+
+
+def expand(compacted: dict) -> dict:
+    message = {}
+    for key, value in compacted.items():
+        key = LONG_KEYS.get(key, key)
+        if key == "type" and isinstance(value, int) and 0 < value <= len(TYPES):
+            value = TYPES[value - 1]
+        message[key] = value
+    template = TEXTS.get(message.get("type"))
+    if template is not None and "message" not in message:
+        try:
+            message["message"] = template.format_map(message)
+        except (KeyError, ValueError):
+            pass
+    return message
+
+
+def encode(websocket, message: dict) -> Union[str, bytes]:
+    """`message` in the protocol the server agreed to on `websocket`"""
+    if websocket.subprotocol == BINARY_SUBPROTOCOL:
+        return msgpack.packb(compact(message))
+    return json.dumps(message)
+
+
+def decode(frame: Union[str, bytes]):
+    """A received frame as a message; raises ValueError if it cannot be read"""
+    if isinstance(frame, str):
+        return json.loads(frame)
+    try:
+        message = msgpack.unpackb(frame)
+    except Exception as e:
+        raise ValueError(f"Invalid MessagePack: {e}") from e
+    return expand(message) if isinstance(message, dict) else message
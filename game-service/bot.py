@@ -0,0 +1,71 @@
+import random
+from typing import Optional
+
+from rules import FIRST_WINS, SECOND_WINS, RuleSet
+
+BOT_USER_ID = "bot"
+BOT_USERNAME = "RPS Bot"
+EXPLORE = 0.1  # share of moves played at random, so the bot cannot be read back
+INCREMENT = 8
+CAP = 255  # a row is halved once a count would pass this, so old habits fade
+
+
+class MarkovBot:
+    """A bot opponent that predicts its opponent's next move.
+
+    The model is a table of counts in one bytearray. Row `a` counts what the
+    opponent played right after playing `a`, and a last row counts every
+    move they played. The bot looks up the row for the opponent's previous
+    move (the plain frequencies while that row is still empty) and plays the
+    move with the best expected score against it. A row is halved when it
+    fills up, so recent play outweighs old habits. `choose()` and
+    `observe()` touch one row, which makes both O(1) for a given rule set.
+    A classic-rules bot is one small object and a 12-byte table, so one
+    process can keep tens of thousands of them.
+    """
+
+    __slots__ = ("rules", "counts", "last")
+
+    def __init__(self, rules: RuleSet):
+        self.rules = rules
+        size = len(rules.moves)
+        self.counts = bytearray(size * (size + 1))
+        self.last: Optional[int] = None  # the opponent's previous move
+
+    def _row(self) -> int:
+        size = len(self.rules.moves)
+        if self.last is not None:
+            start = self.last * size
+            if any(self.counts[start:start + size]):
+                return start
+        return size * size
+
+    def choose(self) -> int:
+        """The bot's next move, from what the opponent has played so far"""
+        size = len(self.rules.moves)
+        start = self._row()
+        row = self.counts[start:start + size]
+        if not any(row) or random.random() < EXPLORE:
+            return random.randrange(size)
+        table = self.rules.table
+        scores = [
+            sum(count * ((outcome == FIRST_WINS) - (outcome == SECOND_WINS)) for count, outcome in zip(row, table[move]))
+            for move in range(size)
+        ]
+        best = max(scores)
+        return random.choice([move for move, score in enumerate(scores) if score == best])
+
+    def observe(self, move: int):
+        """Learn the opponent's move in the round just played"""
+        size = len(self.rules.moves)
+        if self.last is not None:
+            self._count(self.last * size, move)
+        self._count(size * size, move)
+        self.last = move
+
+    def _count(self, start: int, move: int):
+        counts = self.counts
+        if counts[start + move] + INCREMENT > CAP:
+            for index in range(start, start + len(self.rules.moves)):
+                counts[index] >>= 1
+        counts[start + move] += INCREMENT
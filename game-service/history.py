@@ -0,0 +1,297 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    room_id TEXT NOT NULL,
+    user1 TEXT NOT NULL,
+    name1 TEXT NOT NULL,
+    move1 INTEGER NOT NULL,
+    user2 TEXT NOT NULL,
+    name2 TEXT NOT NULL,
+    move2 INTEGER NOT NULL,
+    outcome INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_by_room ON matches (room_id, id);
+CREATE INDEX IF NOT EXISTS matches_by_time ON matches (played_at, id);
+CREATE TABLE IF NOT EXISTS participants (
+    user_id TEXT NOT NULL,
+    match_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, match_id)
+) WITHOUT ROWID;
+"""
+
+COLUMNS = "id, played_at, room_id, user1, name1, move1, user2, name2, move2, outcome"
+JOINED_COLUMNS = ", ".join("m." + column for column in COLUMNS.split(", "))
+CSV_HEADER = ["id", "playedAt", "roomId", "user1", "username1", "move1", "user2", "username2", "move2", "winner"]
+EXPORT_BATCH = 1000
+
+
+class MatchHistory:
+    """Every finished round, in a SQLite database in WAL mode.
+
+    `add()` only appends to an in-memory batch, so the game loop never waits
+    on disk. Every `flush_interval` seconds the batch is written in one
+    transaction off the event loop. Rounds are therefore queryable within
+    about one interval of being played, and a crash loses at most that
+    window, as with the journal.
+
+    Matches are indexed by room and by time, and a `participants` table
+    indexes them by player. Queries page backwards from a `before` match ID
+    (keyset pagination), so a page costs the same however deep it is.
+    Readers use their own connection per thread, and WAL lets them run
+    while a batch is being written. `export()` streams rows through a cursor
+    in fixed-size chunks, so memory stays constant for any history size.
+
+    `excluded_users` (the server's bot) are left out of `participants`, so
+    their rounds are listed for their opponents but `for_user()` never has
+    to keep an ever-growing index for them.
+
+    With `path=None` the database is a temporary file removed on `close()`.
+    """
+
+    def __init__(self, path: Optional[str], move_names: Sequence[str], flush_interval: float = 0.05,
+                 excluded_users: Iterable[str] = ()):
+        self.temporary = path is None
+        self.excluded_users = frozenset(excluded_users)
+        self.path = path
+        self.move_names = tuple(move_names)
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.flushes = 0
+        self.last_flush_rows = 0
+        self.last_flush_seconds = 0.0
+        self._pending: list[tuple] = []
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers = threading.local()
+        self._reader_connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def open(self):
+        if self.path is None:
+            fd, self.path = tempfile.mkstemp(prefix="match-history-", suffix=".db")
+            os.close(fd)
+        elif os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._writer = self._connect()
+        # Room and player index inserts land all over their B-trees; a bigger
+        # page cache keeps more of them in memory between batches
+        self._writer.execute("PRAGMA cache_size=-65536")
+        self._writer.executescript(SCHEMA)
+        # One writer thread: batches are written in order, and a batch still
+        # being written when the flush task is cancelled finishes before the next
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match-history")
+        logger.info(f"Match history in {self.path}")
+
+    def add(self, played_at: float, room_id: str, user1: str, name1: str, move1: int,
+            user2: str, name2: str, move2: int, outcome: int):
+        self._pending.append((played_at, room_id, user1, name1, move1, user2, name2, move2, outcome))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Match history error: {e!r}")
+
+    async def flush(self):
+        """Write the pending batch in one transaction, off the event loop"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.write_batch, batch)
+        self.last_flush_seconds = time.perf_counter() - started
+        self.last_flush_rows = len(batch)
+
+    def write_batch(self, batch: list[tuple]):
+        connection = self._writer
+        connection.execute("BEGIN")
+        try:
+            cursor = connection.execute("SELECT COALESCE(MAX(id), 0) FROM matches")
+            first_id = cursor.fetchone()[0] + 1
+            connection.executemany(
+                "INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(first_id + i, *row) for i, row in enumerate(batch)],
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO participants VALUES (?, ?)",
+                [
+                    (user, first_id + i) for i, row in enumerate(batch) for user in (row[2], row[5])
+                    if user not in self.excluded_users
+                ],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.rows_written += len(batch)
+        self.flushes += 1
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._readers.connection = self._connect()
+            with self._lock:
+                self._reader_connections.append(connection)
+        return connection
+
+    def _row(self, row: tuple) -> dict:
+        match_id, played_at, room_id, user1, name1, move1, user2, name2, move2, outcome = row
+        return {
+            "id": match_id,
+            "playedAt": played_at,
+            "roomId": room_id,
+            "user1": user1,
+            "username1": name1,
+            "move1": self.move_names[move1] if move1 >= 0 else None,
+            "user2": user2,
+            "username2": name2,
+            "move2": self.move_names[move2] if move2 >= 0 else None,
+            "winner": (None, user1, user2)[outcome],
+        }
+
+    def _page(self, sql: str, params: tuple, limit: int) -> dict:
+        rows = self._reader().execute(sql, (*params, limit)).fetchall()
+        return {
+            "matches": [self._row(row) for row in rows],
+            "next": rows[-1][0] if len(rows) == limit else None,
+        }
+
+    def for_user(self, user_id: str, limit: int = 20, before: Optional[int] = None) -> dict:
+        """The user's matches, newest first; pass `next` back as `before` for the following page"""
+        return self._page(
+            f"SELECT {JOINED_COLUMNS} FROM participants p "
+            "JOIN matches m ON m.id = p.match_id "
+            "WHERE p.user_id = ? AND p.match_id < ? ORDER BY p.match_id DESC LIMIT ?",
+            (user_id, before or 2**63 - 1),
+            limit,
+        )
+
+    def for_room(self, room_id: str, limit: int = 20, before: Optional[int] = None) -> dict:
+        return self._page(
+            f"SELECT {COLUMNS} FROM matches WHERE room_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (room_id, before or 2**63 - 1),
+            limit,
+        )
+
+    def between(self, since: float = 0, until: Optional[float] = None, limit: int = 20,
+                before: Optional[int] = None) -> dict:
+        """Matches played in [since, until), newest first by time"""
+        # Walk the time index backwards from (until, 0), or from the cursor row
+        bound = (float("inf") if until is None else until, 0)
+        if before is not None:
+            row = self._reader().execute("SELECT played_at FROM matches WHERE id = ?", (before,)).fetchone()
+            if row is not None and row[0] < bound[0]:
+                bound = (row[0], before)
+        return self._page(
+            f"SELECT {COLUMNS} FROM matches WHERE played_at >= ? AND (played_at, id) < (?, ?) "
+            "ORDER BY played_at DESC, id DESC LIMIT ?",
+            (since, *bound),
+            limit,
+        )
+
+    def export(self, fmt: str = "ndjson", user_id: Optional[str] = None,
+               since: float = 0, until: Optional[float] = None) -> Iterator[str]:
+        """Stream matching rows, oldest first, as NDJSON or CSV text chunks.
+
+        Uses its own connection, since a streaming response may resume the
+        generator on a different thread each time.
+        """
+        until = float("inf") if until is None else until
+        if user_id is None:
+            sql = f"SELECT {COLUMNS} FROM matches WHERE played_at >= ? AND played_at < ? ORDER BY id"
+            params = (since, until)
+        else:
+            sql = (
+                f"SELECT {JOINED_COLUMNS} FROM participants p "
+                "JOIN matches m ON m.id = p.match_id "
+                "WHERE p.user_id = ? AND m.played_at >= ? AND m.played_at < ? ORDER BY p.match_id"
+            )
+            params = (user_id, since, until)
+        connection = self._connect()
+        try:
+            cursor = connection.execute(sql, params)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            if fmt == "csv":
+                writer.writerow(CSV_HEADER)
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH)
+                if not rows:
+                    break
+                for row in rows:
+                    match = self._row(row)
+                    if fmt == "csv":
+                        writer.writerow(match.values())
+                    else:
+                        buffer.write(json.dumps(match, separators=(",", ":")) + "\n")
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            connection.close()
+
+    async def close(self):
+        if self._writer is None:
+            return
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for connection in self._reader_connections:
+                connection.close()
+            self._reader_connections.clear()
+        self._readers = threading.local()
+        self._writer.close()
+        self._writer = None
+        if self.temporary:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+            self.path = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "rows_written": self.rows_written,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+        }
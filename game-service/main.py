@@ -1,9 +1,38 @@
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware  # ADD THIS at top
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
-import json
+import argparse
+import asyncio
+import os
+import sys
 import logging
-import requests
+import secrets
+import time
+from typing import Literal, Optional
+
+# Modules shared between the services live in the repository's shared/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+
+from bot import BOT_USER_ID, BOT_USERNAME, MarkovBot
+from codec import JSON, Codec, DecodeError, Frame, accept, receive_frame, send
+from expiry import IdleReaper
+from history import MatchHistory
+from journal import Journal
+from membership import MembershipCache
+from metrics import CONTENT_TYPE, LoopLagMonitor, MetricsRegistry, RequestMetrics
+from outbound import OutboundQueue, OutboundStats, Spectator, SpectatorFeed
+from pubsub import create_pubsub
+from rules import CLASSIC, FIRST_WINS, SECOND_WINS
+from series import SERIES_LENGTHS, Series
+from sharding import SHARD_HOP_HEADER, ShardDirectory, relay_websocket, spawn_shards, stop_processes
+from state import GameState, Move
+from stats import StatsEngine
+from timers import TimerQueue
+from tournament import Tournament
+from tracing import TRACEPARENT, TraceRequests, Tracer
+from user_client import UsernameResolver, fallback_username
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,71 +50,395 @@ app.add_middleware(
 
 USER_SERVICE_URL = "http://localhost:8000"
 ROOM_SERVICE_URL = "http://localhost:8001"
+# Seconds without activity before a game is dropped, and the shorter
+# grace period once its last player has disconnected
+GAME_IDLE_TTL = float(os.environ.get("GAME_IDLE_TTL", 1800))
+GAME_ABANDONED_TTL = float(os.environ.get("GAME_ABANDONED_TTL", 120))
+LONG_POLL_MAX_WAIT = 30.0  # seconds a /state request may be held open
+# Directory for the event log and snapshots; durable mode is off when unset
+GAME_DATA_DIR = os.environ.get("GAME_DATA_DIR")
+# SQLite file for the match history; defaults to history.db in GAME_DATA_DIR,
+# or a temporary file removed on shutdown when neither is set
+GAME_HISTORY_DB = os.environ.get("GAME_HISTORY_DB") or (
+    os.path.join(GAME_DATA_DIR, "history.db") if GAME_DATA_DIR else None
+)
+# Sharding: this shard's base URL and every shard's (comma-separated), plus
+# the pub/sub backend the shards coordinate over. Without GAME_SHARD_URL the
+# service is a single shard that owns every room.
+GAME_SHARD_URL = os.environ.get("GAME_SHARD_URL")
+GAME_SHARDS = [url for url in os.environ.get("GAME_SHARDS", "").split(",") if url]
+GAME_PUBSUB_URL = os.environ.get("GAME_PUBSUB_URL", "memory://")
+# How long a move or connection from an unknown player waits for Room
+# Service's join event before it is rejected
+MEMBERSHIP_GRACE = 1.0
+# Series and tournaments: how long a round's result stays up before the next
+# round of a series starts, the pause between tournament rounds (and before
+# the first, so players can join the lobby), and how long a finished
+# tournament's results are kept
+SERIES_ADVANCE_DELAY = float(os.environ.get("SERIES_ADVANCE_DELAY", 3))
+TOURNAMENT_ROUND_DELAY = float(os.environ.get("TOURNAMENT_ROUND_DELAY", 10))
+TOURNAMENT_RESULT_TTL = 600.0
+# Round deadlines (0 disables each): how long the second player has to move
+# once the first has, before the first wins by forfeit, and how long a
+# result stays up before the round is reset without both players' ready
+GAME_MOVE_TIMEOUT = float(os.environ.get("GAME_MOVE_TIMEOUT", 30))
+GAME_READY_TIMEOUT = float(os.environ.get("GAME_READY_TIMEOUT", 60))
+FORFEIT = -1  # the move recorded for a player who ran out of time
+# Events spectators see; the rest (errors, status replies) are for players only
+SPECTATED_TYPES = frozenset({"move_received", "game_result", "game_reset", "series_started", "series_result"})
+# Tracing: the share of traces recorded, and the span collector they are
+# sent to (start one with `python shared/tracing.py collect`). Without a
+# collector nothing is recorded, but trace IDs are still passed on for
+# correlation.
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL")
+# Client message types timed by name in /metrics; anything else counts as "other"
+GAME_MESSAGE_TYPES = frozenset({"submit_move", "get_game_status", "add_bot", "start_series", "ready_for_next_round"})
+
+
+rooms: dict[str, GameState] = {}
+stats = StatsEngine(CLASSIC.moves, excluded_users=(BOT_USER_ID,))
+history = MatchHistory(GAME_HISTORY_DB, CLASSIC.moves, excluded_users=(BOT_USER_ID,))
+result_waiters: dict[str, asyncio.Event] = {}  # room_id -> set when the round's result is ready
+series: dict[str, Series] = {}  # room_id -> best-of-N series being played there
+tournaments: dict[str, Tournament] = {}
+tournament_rooms: dict[str, str] = {}  # room_id -> tournament_id, for rooms hosting a tournament match
+bots: dict[str, MarkovBot] = {}  # room_id -> the bot in its second seat
+# Round deadlines, series round advances and tournament rounds, for every
+# room in one heap
+timers = TimerQueue("game")
+
+# Served on /metrics. Gauges read counts that are kept up to date as state
+# changes, so a scrape never scans the rooms.
+metrics = MetricsRegistry()
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP requests served, by route", ("method", "route", "status"),
+)
+websocket_message_seconds = metrics.histogram(
+    "websocket_message_duration_seconds", "Time to handle one message from a player's socket, by type", ("type",),
+)
+broadcast_seconds = metrics.histogram(
+    "broadcast_duration_seconds", "Time to fan one event out to a room's sockets and spectators, by type", ("type",),
+)
+user_service_seconds = metrics.histogram(
+    "user_service_request_duration_seconds", "Calls to User Service, by endpoint and outcome", ("endpoint", "outcome"),
+)
+rounds_total = metrics.counter("rounds_total", "Finished rounds, by how they ended", ("result",))
+metrics.gauge("games", "Games held in memory", read=lambda: len(rooms))
+metrics.gauge("games_in_progress", "Rounds with at least one move", read=lambda: GameState.in_progress)
+metrics.gauge("spectated_games", "Games with spectators", read=lambda: len(manager.spectator_feeds))
+metrics.gauge("series", "Best-of-N series held in memory", read=lambda: len(series))
+metrics.gauge("bots", "Games against the bot", read=lambda: len(bots))
+metrics.gauge("tournaments", "Tournaments held in memory", read=lambda: len(tournaments))
+metrics.gauge("timers", "Pending round deadlines, series advances and tournament rounds", read=lambda: len(timers))
+loop_lag = LoopLagMonitor(metrics)
+app.add_middleware(RequestMetrics, histogram=http_request_seconds)
+tracer = Tracer("game-service", TRACE_SAMPLE_RATE, TRACE_COLLECTOR_URL)
+app.add_middleware(TraceRequests, tracer=tracer)
 
+class StartSeriesRequest(BaseModel):
+    roomId: str
+    userId: str
+    bestOf: int
 
-rooms = {}
+class AddBotRequest(BaseModel):
+    roomId: str
+    userId: str
+
+class CreateTournamentRequest(BaseModel):
+    players: list[str]
+    format: str = "bracket"
+    bestOf: int = 3
+    rounds: Optional[int] = None
 
 class ConnectionManager:
     def __init__(self):
-        self.game_connections: dict[str, dict[str, WebSocket]] = {}
+        self.game_connections: dict[str, dict[str, OutboundQueue]] = {}
+        self.spectator_feeds: dict[str, SpectatorFeed] = {}
+        self.outbound_stats = OutboundStats()
 
-    async def connect(self, websocket: WebSocket, room_id: str, user_id: str):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, room_id: str, user_id: str) -> Codec:
+        codec = await accept(websocket)
         if room_id not in self.game_connections:
             self.game_connections[room_id] = {}
-        self.game_connections[room_id][user_id] = websocket
-        logger.info(f"User {user_id} connected to game in room {room_id} via WebSocket")
+        previous = self.game_connections[room_id].get(user_id)
+        self.game_connections[room_id][user_id] = OutboundQueue(
+            websocket,
+            self.outbound_stats,
+            on_close=lambda: self.disconnect(room_id, user_id, websocket),
+            codec=codec,
+        )
+        if previous is not None:
+            previous.close()
+        logger.info(f"User {user_id} connected to game in room {room_id} via WebSocket ({codec.name})")
+        return codec
 
-    def disconnect(self, room_id: str, user_id: str):
+    def disconnect(self, room_id: str, user_id: str, websocket: WebSocket = None):
         if room_id in self.game_connections and user_id in self.game_connections[room_id]:
+            connection = self.game_connections[room_id][user_id]
+            # A stale socket may close after its user reconnected; keep the newer one
+            if websocket is not None and connection.websocket is not websocket:
+                return
             del self.game_connections[room_id][user_id]
             if not self.game_connections[room_id]:  # Remove empty room
                 del self.game_connections[room_id]
+            connection.close()
             logger.info(f"User {user_id} disconnected from game in room {room_id}")
 
+    def spectate(self, websocket: WebSocket, room_id: str, codec: Codec = JSON) -> Spectator:
+        """Follow the room's spectator feed on an accepted socket"""
+        feed = self.spectator_feeds.get(room_id)
+        if feed is None:
+            feed = self.spectator_feeds[room_id] = SpectatorFeed(self.outbound_stats)
+        return Spectator(websocket, feed, on_close=lambda: self.stop_spectating(room_id), codec=codec)
+
+    def stop_spectating(self, room_id: str):
+        feed = self.spectator_feeds.get(room_id)
+        if feed is not None and not feed.spectators:
+            del self.spectator_feeds[room_id]
+            feed.close()
+
     async def broadcast_to_game(self, message: dict, room_id: str, exclude_user: str = None):
-        if room_id in self.game_connections:
-            for user_id, websocket in self.game_connections[room_id].items():
-                if exclude_user and user_id == exclude_user:
-                    continue
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error sending message to user {user_id} in game room {room_id}: {e}")
-                    self.disconnect(room_id, user_id)
+        connections = self.game_connections.get(room_id)
+        feed = self.spectator_feeds.get(room_id)
+        if connections is None and feed is None:
+            return
+        started = time.perf_counter()
+        kind = message.get("type")
+        with tracer.span(f"broadcast {kind}"):
+            trace_id = tracer.trace_id()
+            if trace_id is not None:
+                message = {**message, "traceId": trace_id}
+            # Encode once per codec in use; each connection's writer task does
+            # the actual send, and spectators share the same frame
+            frame = Frame(message)
+            for user_id, connection in list((connections or {}).items()):
+                if user_id != exclude_user:
+                    connection.put(frame.encode(connection.codec), kind)
+            if feed is not None and kind in SPECTATED_TYPES:
+                feed.publish(frame)
+        broadcast_seconds.observe(time.perf_counter() - started, kind)
 
     async def send_to_user_in_game(self, message: dict, room_id: str, user_id: str):
         if room_id in self.game_connections and user_id in self.game_connections[room_id]:
-            try:
-                await self.game_connections[room_id][user_id].send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending message to user {user_id} in game room {room_id}: {e}")
-                self.disconnect(room_id, user_id)
+            trace_id = tracer.trace_id()
+            if trace_id is not None:
+                message = {**message, "traceId": trace_id}
+            connection = self.game_connections[room_id][user_id]
+            connection.put(connection.codec.encode(message), message.get("type"))
 
 manager = ConnectionManager()
+manager.outbound_stats.export(metrics)
+
+username_resolver = UsernameResolver(USER_SERVICE_URL, request_seconds=user_service_seconds, tracer=tracer)
 
-def get_username(user_id: str) -> str:
+async def get_username(user_id: str) -> str:
     """Get username from User Service"""
-    try:
-        response = requests.get(f"{USER_SERVICE_URL}/users/{user_id}")
-        if response.status_code == 200:
-            return response.json()["username"]
-    except Exception as e:
-        logger.error(f"Error fetching username for {user_id}: {e}")
-    return f"User-{user_id[:8]}"
-
-def calculate_winner(move1: str, move2: str, player1: str, player2: str) -> str:
-    """Calculate the winner of rock-paper-scissors"""
-    if move1 == move2:
-        return "draw"
-    elif (
-        (move1 == "rock" and move2 == "scissors")
-        or (move1 == "scissors" and move2 == "paper")
-        or (move1 == "paper" and move2 == "rock")
+    return await username_resolver.get_username(user_id)
+
+def expire_game(room_id: str) -> bool:
+    """Drop an idle game unless players are still connected to it"""
+    if room_id in manager.game_connections:
+        return False
+    game = rooms.pop(room_id, None)
+    if game is not None:
+        game.reset()
+    result_waiters.pop(room_id, None)
+    series.pop(room_id, None)
+    tournament_rooms.pop(room_id, None)
+    bots.pop(room_id, None)
+    timers.cancel(f"advance:{room_id}")
+    timers.cancel(f"deadline:{room_id}")
+    journal.append(["expire", room_id])
+    return True
+
+game_reaper = IdleReaper("games", GAME_IDLE_TTL, expire_game)
+
+def close_game(room_id: str):
+    """Room Service closed the room: free its game now, or when its players disconnect"""
+    if expire_game(room_id):
+        game_reaper.forget(room_id)
+
+def remove_player(room_id: str, user_id: str):
+    """A player left the room in Room Service; drop their game connection"""
+    connection = manager.game_connections.get(room_id, {}).get(user_id)
+    if connection is not None:
+        connection.close(4003, "Left the room")
+
+def is_player(room_id: str, user_id: str) -> Optional[bool]:
+    """Whether the user may play in the room; None when that is not known yet"""
+    if room_id in tournament_rooms:
+        return user_id in series[room_id].players
+    return membership.is_member(room_id, user_id)
+
+def opponent_of(room_id: str, user_id: str) -> Optional[str]:
+    """The room's other player, from its series, Room Service or its connections"""
+    current = series.get(room_id)
+    for candidates in (
+        current.players if current is not None and current.players else (),
+        membership.players(room_id),
+        manager.game_connections.get(room_id, ()),
     ):
+        opponent = next((other for other in candidates if other != user_id), None)
+        if opponent is not None:
+            return opponent
+    return None
+
+def known_name(room_id: str, user_id: str) -> str:
+    """A username without asking User Service, which a timer must not wait on"""
+    current = series.get(room_id)
+    if current is not None and user_id in current.names:
+        return current.names[user_id]
+    return username_resolver.peek(user_id) or stats.name(user_id) or fallback_username(user_id)
+
+@tracer.traced("membership.check")
+async def check_player(room_id: str, user_id: str) -> bool:
+    if room_id in tournament_rooms:
+        return user_id in series[room_id].players
+    return await membership.check(room_id, user_id, MEMBERSHIP_GRACE)
+
+def new_local_id(prefix: str) -> str:
+    """A fresh ID owned by this shard, so a tournament and its rooms all live here"""
+    while True:
+        candidate = prefix + secrets.token_hex(4).upper()
+        if shards.owner_url(candidate) is None and candidate not in rooms and candidate not in tournaments:
+            return candidate
+
+pubsub = create_pubsub(GAME_PUBSUB_URL)
+shards = ShardDirectory(GAME_SHARD_URL, GAME_SHARDS, pubsub)
+membership = MembershipCache(pubsub, on_left=remove_player, on_closed=close_game)
+RESULTS_CHANNEL = "game-results"
+
+def on_shard_result(message: dict):
+    if message["shard"] != shards.self_url:
+        record_result(*message["result"])
+        add_to_history(message["playedAt"], message["roomId"], *message["result"])
+
+def redirect_to_owner(request: Request, room_id: str):
+    """307 to the shard that owns `room_id`, or None when this shard owns it"""
+    owner = shards.owner_url(room_id)
+    if owner is None:
+        return None
+    shards.redirected_requests += 1
+    url = owner + request.url.path
+    if request.url.query:
+        url += "?" + request.url.query
+    return RedirectResponse(url, status_code=307)
+
+@app.on_event("startup")
+async def startup():
+    journal.open()
+    journal.start()
+    # Deadlines are not journaled; restored rounds get a fresh one
+    for room_id in list(rooms):
+        arm_deadline(room_id)
+    history.open()
+    history.start()
+    timers.start()
+    game_reaper.start()
+    loop_lag.start()
+    await pubsub.start()
+    await shards.start()
+    await membership.start()
+    if shards.enabled:
+        pubsub.subscribe(RESULTS_CHANNEL, on_shard_result)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await membership.stop()
+    await shards.stop()
+    await pubsub.close()
+    await game_reaper.stop()
+    await timers.stop()
+    await loop_lag.stop()
+    await journal.close()
+    await history.close()
+    await username_resolver.close()
+    tracer.close()
+
+def calculate_winner(move1: Move, move2: Move, player1: str, player2: str) -> str:
+    """Calculate the winner of rock-paper-scissors"""
+    outcome = CLASSIC.table[move1][move2]
+    if outcome == FIRST_WINS:
         return player1
-    else:
+    if outcome == SECOND_WINS:
         return player2
+    return "draw"
+
+def round_result(game: GameState) -> dict:
+    """Result payload for a round in which both players have moved"""
+    winner = calculate_winner(game.move1, game.move2, game.name1, game.name2)
+    return {
+        "moves": {game.name1: game.move1.label, game.name2: game.move2.label},
+        "winner": winner,
+    }
+
+def outcome(move1: int, move2: int) -> int:
+    """The round's outcome; a player who forfeited loses (the first, if both did)"""
+    if move2 == FORFEIT:
+        return FIRST_WINS
+    if move1 == FORFEIT:
+        return SECOND_WINS
+    return CLASSIC.resolve(move1, move2)
+
+@tracer.traced("stats.record")
+def record_result(user1: str, name1: str, move1: int, user2: str, name2: str, move2: int):
+    """Count a finished round in the players' stats; journaled as its own event"""
+    stats.record(user1, name1, move1, user2, name2, move2, outcome(move1, move2))
+    journal.append(["result", user1, name1, move1, user2, name2, move2])
+
+@tracer.traced("history.add")
+def add_to_history(played_at: float, room_id: str, user1: str, name1: str, move1: int, user2: str, name2: str, move2: int):
+    history.add(played_at, room_id, user1, name1, move1, user2, name2, move2, outcome(move1, move2))
+
+def apply_game_event(event: list):
+    """Replay one journal event: move, seen, reset, forfeit, expire or result"""
+    kind, room_id = event[0], event[1]
+    if kind == "result":
+        stats.record(*event[1:], outcome(event[3], event[6]))
+    elif kind == "move":
+        game = rooms.setdefault(room_id, GameState())
+        game.submit(event[2], event[3], Move(event[4]))
+        if game.moves_count == 2:
+            game.result = round_result(game)
+        game_reaper.touch(room_id)
+    elif kind == "seen" and room_id in rooms:
+        if rooms[room_id].mark_seen(event[2]) == 2:
+            rooms[room_id].reset()
+    elif kind in ("reset", "forfeit") and room_id in rooms:
+        # A forfeited round's result was its own event; only its reset is left
+        rooms[room_id].reset()
+    elif kind == "expire":
+        game = rooms.pop(room_id, None)
+        if game is not None:
+            game.reset()
+        game_reaper.forget(room_id)
+
+def snapshot_games() -> dict:
+    # Rooms with nothing in play are recreated on demand and not stored, and a
+    # forfeited round (a result with one move) is stored reset, as on replay
+    return {
+        "games": [
+            [room_id, game.user1, game.name1, game.move1, game.user2, game.name2, game.move2, list(game.seen)]
+            for room_id, game in rooms.items()
+            if (game.user1 is not None or game.seen) and (game.result is None or game.moves_count == 2)
+        ],
+        "stats": stats.dump(),
+    }
+
+def restore_games(snapshot: dict):
+    stats.restore(snapshot["stats"])
+    for room_id, user1, name1, move1, user2, name2, move2, seen in snapshot["games"]:
+        game = rooms[room_id] = GameState()
+        if user1 is not None:
+            game.submit(user1, name1, Move(move1))
+        if user2 is not None:
+            game.submit(user2, name2, Move(move2))
+            game.result = round_result(game)
+        game.seen = tuple(seen)
+        game_reaper.touch(room_id)
+
+journal = Journal(GAME_DATA_DIR, apply_game_event, snapshot_games, restore_games)
 
 @app.post("/play")
 async def play(request: Request):
@@ -94,16 +447,37 @@ async def play(request: Request):
     room_id = data["roomId"]
     user_id = data["userId"]
     username = data["username"]
-    move = data["move"]
+    redirect = redirect_to_owner(request, room_id)
+    if redirect is not None:
+        return redirect
+    if not await check_player(room_id, user_id):
+        raise HTTPException(status_code=403, detail="User not in room")
+    move = Move.parse(data["move"])
+    if move is None:
+        raise HTTPException(status_code=400, detail="Invalid move. Use: rock, paper, or scissors")
 
     if room_id not in rooms:
-        rooms[room_id] = {"moves": {}, "usernames": {}, "result": None, "seen": set()}
+        rooms[room_id] = GameState()
+    game_reaper.touch(room_id)
 
+    error = await submit_move(room_id, user_id, username, move)
+    if error is not None:
+        raise HTTPException(status_code=409, detail=error)
+    return {"status": "move received"}
+
+@tracer.traced("game.submit_move")
+async def submit_move(room_id: str, user_id: str, username: str, move: Move) -> Optional[str]:
+    """Seat a move in the room's round (HTTP, WebSocket and the bot alike); an error message if it is refused"""
+    game = rooms[room_id]
+    if game.result is not None:
+        return "This round is over - wait for the next one"
     # Save player's move + username
-    rooms[room_id]["moves"][user_id] = move
-    rooms[room_id]["usernames"][user_id] = username
-    
-    logger.info(f"Move received from {username} in room {room_id}: {move}")
+    if not game.submit(user_id, username, move):
+        return "Both players have already moved"
+    journal.append(["move", room_id, user_id, username, move])
+    arm_deadline(room_id)
+
+    logger.info(f"Move received from {username} in room {room_id}: {move.label}")
 
     # Broadcast move received to all players in the game
     await manager.broadcast_to_game({
@@ -112,31 +486,121 @@ async def play(request: Request):
         "userId": user_id,
         "username": username,
         "roomId": room_id,
-        "moves_count": len(rooms[room_id]["moves"])
+        "moves_count": game.moves_count
     }, room_id)
 
     # Check if we have both moves
-    if len(rooms[room_id]["moves"]) == 2:
+    if game.moves_count == 2:
         await process_game_result(room_id)
+    elif room_id in bots and user_id != BOT_USER_ID:
+        await bot_reply(room_id, move)
+    return None
 
-    return {"status": "move received"}
+@tracer.traced("bot.add")
+async def add_bot(room_id: str, user_id: str) -> MarkovBot:
+    """Seat a bot against `user_id`; ValueError if the room has, or is kept for, another player"""
+    if room_id in bots:
+        return bots[room_id]
+    if room_id in tournament_rooms:
+        raise ValueError("Tournament matches are played by their two players")
+    game = rooms.setdefault(room_id, GameState())
+    others = {*membership.players(room_id), game.user1, game.user2} - {user_id, None}
+    if others:
+        raise ValueError("The room already has a second player")
+    bot = bots[room_id] = MarkovBot(CLASSIC)
+    game_reaper.touch(room_id)
+    await manager.broadcast_to_game({
+        "type": "bot_joined",
+        "message": f"{BOT_USERNAME} has taken the second seat",
+        "roomId": room_id,
+        "userId": BOT_USER_ID,
+        "username": BOT_USERNAME
+    }, room_id)
+    if game.moves_count == 1 and game.result is None:
+        await bot_reply(room_id, game.move1)
+    return bot
+
+@tracer.traced("bot.reply")
+async def bot_reply(room_id: str, opponent_move: Move):
+    """The room's bot moves as soon as its opponent has, and only learns that move afterwards"""
+    bot = bots[room_id]
+    await submit_move(room_id, BOT_USER_ID, BOT_USERNAME, Move(bot.choose()))
+    bot.observe(opponent_move)
+    # The bot is always ready, so the next round waits on its opponent alone
+    game = rooms.get(room_id)
+    if game is not None and game.result is not None:
+        journal.append(["seen", room_id, BOT_USER_ID])
+        game.mark_seen(BOT_USER_ID)
 
 async def process_game_result(room_id: str):
     """Process game result when both players have moved"""
-    if room_id not in rooms or len(rooms[room_id]["moves"]) < 2:
+    if room_id not in rooms or rooms[room_id].moves_count < 2:
         return
 
-    moves = rooms[room_id]["moves"]
-    usernames = rooms[room_id]["usernames"]
-    (p1, m1), (p2, m2) = list(moves.items())
+    game = rooms[room_id]
+    game.result = round_result(game)
+    await finish_round(room_id, game.user1, game.name1, game.move1, game.user2, game.name2, game.move2)
 
-    winner = calculate_winner(m1, m2, usernames[p1], usernames[p2])
+@tracer.traced("timer.forfeit", root=True)
+async def forfeit_round(room_id: str):
+    """The move deadline passed: the player who moved wins the round by forfeit
 
-    result = {
-        "moves": {usernames[p1]: m1, usernames[p2]: m2},
-        "winner": winner,
+    In a tournament match where neither player has moved, the higher seed
+    (the match's first player) takes the round so the bracket cannot stall.
+    """
+    game = rooms.get(room_id)
+    if game is None or game.result is not None:
+        return
+    if game.moves_count == 1:
+        winner, winner_name, move = game.user1, game.name1, game.move1
+        loser = opponent_of(room_id, winner)
+    elif game.moves_count == 0 and room_id in tournament_rooms:
+        winner, loser = series[room_id].players
+        winner_name, move = known_name(room_id, winner), FORFEIT
+    else:
+        return
+    loser_name = known_name(room_id, loser) if loser is not None else None
+    game.result = {
+        "moves": {winner_name: move.label} if move != FORFEIT else {},
+        "winner": winner_name,
+        "forfeit": loser_name or "opponent",
     }
-    rooms[room_id]["result"] = result
+    logger.info(f"Move deadline passed in room {room_id}: {winner_name} wins by forfeit")
+    await finish_round(room_id, winner, winner_name, move, loser, loser_name, FORFEIT)
+    journal.append(["forfeit", room_id])
+
+@tracer.traced("game.finish_round")
+async def finish_round(room_id: str, user1: str, name1: str, move1: int, user2: Optional[str], name2: Optional[str], move2: int):
+    """Count, publish and announce the round whose result is in `rooms[room_id].result`
+
+    `user2` is None after a forfeit by a player nobody knows (the room was
+    never synced from Room Service); such a round is shown but not counted.
+    """
+    result = rooms[room_id].result
+    played_at = time.time()
+    current = series.get(room_id)
+    in_series = current is not None and not current.finished and user2 is not None
+    if in_series:
+        winner = {FIRST_WINS: user1, SECOND_WINS: user2}.get(outcome(move1, move2))
+        current.record(user1, name1, user2, name2, winner)
+        result["series"] = current.snapshot()
+    if user2 is not None:
+        rounds_total.inc("forfeit" if "forfeit" in result else "draw" if result["winner"] == "draw" else "decided")
+        record_result(user1, name1, move1, user2, name2, move2)
+        add_to_history(played_at, room_id, user1, name1, move1, user2, name2, move2)
+        if shards.enabled:
+            # Every shard keeps the full leaderboard and match history
+            await pubsub.publish(RESULTS_CHANNEL, {
+                "shard": shards.self_url,
+                "roomId": room_id,
+                "playedAt": played_at,
+                "result": [user1, name1, move1, user2, name2, move2],
+            })
+
+    # Release any long-polling /state requests for this room
+    waiter = result_waiters.pop(room_id, None)
+    if waiter is not None:
+        waiter.set()
 
     # Broadcast result to all players
     await manager.broadcast_to_game({
@@ -148,30 +612,209 @@ async def process_game_result(room_id: str):
 
     logger.info(f"Game result for room {room_id}: {result}")
 
+    if in_series:
+        if current.finished:
+            await finish_series(room_id, current)
+        else:
+            timers.schedule(f"advance:{room_id}", SERIES_ADVANCE_DELAY, advance_series, room_id)
+    arm_deadline(room_id)
+
+def arm_deadline(room_id: str):
+    """(Re)arm the room's deadline for the phase its round is in
+
+    The clock starts with a round's first move (or, for a tournament match,
+    as soon as its room exists) and is replaced by the ready deadline once
+    there is a result, unless a series is about to advance on its own. Both
+    share one key per room, so a room never has more than one.
+    """
+    key = f"deadline:{room_id}"
+    game = rooms.get(room_id)
+    current = series.get(room_id)
+    series_running = current is not None and not current.finished
+    if game is None:
+        timers.cancel(key)
+    elif game.result is not None:
+        if GAME_READY_TIMEOUT and not (series_running and current.rounds):
+            timers.schedule(key, GAME_READY_TIMEOUT, reset_round, room_id)
+        else:
+            timers.cancel(key)
+    elif GAME_MOVE_TIMEOUT and (game.moves_count == 1 or (room_id in tournament_rooms and series_running)):
+        timers.schedule(key, GAME_MOVE_TIMEOUT, forfeit_round, room_id)
+    else:
+        timers.cancel(key)
+
+@tracer.traced("timer.reset", root=True)
+async def reset_round(room_id: str):
+    """The ready deadline passed: start the next round without waiting for both players"""
+    game = rooms.get(room_id)
+    if game is None or game.result is None:
+        return
+    journal.append(["reset", room_id])
+    game.reset()
+    arm_deadline(room_id)
+    await manager.broadcast_to_game({
+        "type": "game_reset",
+        "message": "Game reset - ready for next round!",
+        "roomId": room_id
+    }, room_id)
+
+@tracer.traced("series.start")
+async def start_series(room_id: str, best_of: int) -> Series:
+    """Play the room's next rounds as a best-of-N series; ValueError if one is already under way"""
+    current = series.get(room_id)
+    if room_id in tournament_rooms or (current is not None and current.rounds and not current.finished):
+        raise ValueError("A series is already in progress in this room")
+    current = series[room_id] = Series(best_of)
+    if room_id not in rooms:
+        rooms[room_id] = GameState()
+    game_reaper.touch(room_id)
+    await manager.broadcast_to_game({
+        "type": "series_started",
+        "message": f"Best of {best_of} - first to {current.needed} wins takes the series!",
+        "roomId": room_id,
+        "series": current.snapshot()
+    }, room_id)
+    return current
+
+@tracer.traced("timer.advance_series", root=True)
+async def advance_series(room_id: str):
+    """Start the next round of a series once the last result has been shown"""
+    game = rooms.get(room_id)
+    current = series.get(room_id)
+    if game is None or current is None or game.result is None:
+        return
+    journal.append(["reset", room_id])
+    game.reset()
+    arm_deadline(room_id)
+    await manager.broadcast_to_game({
+        "type": "game_reset",
+        "message": f"Round {current.rounds + 1} of the best of {current.best_of} - make your move!",
+        "roomId": room_id,
+        "series": current.snapshot()
+    }, room_id)
+
+async def finish_series(room_id: str, current: Series):
+    await manager.broadcast_to_game({
+        "type": "series_result",
+        "message": f"{current.names[current.winner]} wins the best of {current.best_of}!",
+        "roomId": room_id,
+        "series": current.snapshot()
+    }, room_id)
+    tournament = tournaments.get(tournament_rooms.get(room_id))
+    if tournament is not None and tournament.report(room_id, current.winner):
+        await finish_tournament_round(tournament)
+
+@tracer.traced("timer.tournament_round", root=True)
+async def start_tournament_round(tournament_id: str):
+    """Pair the next round and give every match its own room and series"""
+    tournament = tournaments.get(tournament_id)
+    if tournament is None or tournament.finished:
+        return
+    matches = tournament.start_round(lambda: new_local_id(f"{tournament_id}-"))
+    for match in matches:
+        if match.room_id is None:
+            await manager.send_to_user_in_game({
+                "type": "match_assigned",
+                "message": f"Round {tournament.round}: you have a bye",
+                "tournamentId": tournament_id,
+                "round": tournament.round,
+                "roomId": None
+            }, tournament_id, match.player1)
+            continue
+        rooms[match.room_id] = GameState()
+        game_reaper.touch(match.room_id)
+        tournament_rooms[match.room_id] = tournament_id
+        series[match.room_id] = Series(tournament.best_of, (match.player1, match.player2))
+        arm_deadline(match.room_id)
+        for player, opponent in ((match.player1, match.player2), (match.player2, match.player1)):
+            await manager.send_to_user_in_game({
+                "type": "match_assigned",
+                "message": f"Round {tournament.round}: best of {tournament.best_of} in room {match.room_id}",
+                "tournamentId": tournament_id,
+                "round": tournament.round,
+                "roomId": match.room_id,
+                "opponent": opponent,
+                "bestOf": tournament.best_of
+            }, tournament_id, player)
+    await manager.broadcast_to_game({
+        "type": "tournament_round",
+        "message": f"Round {tournament.round} of {tournament.total_rounds} has started",
+        "tournamentId": tournament_id,
+        "round": tournament.round,
+        "rounds": tournament.total_rounds,
+        "matches": tournament.pending
+    }, tournament_id)
+    if tournament.round_finished:  # nothing but byes
+        await finish_tournament_round(tournament)
+
+async def finish_tournament_round(tournament: Tournament):
+    if not tournament.finished:
+        timers.schedule(f"tournament:{tournament.id}", TOURNAMENT_ROUND_DELAY, start_tournament_round, tournament.id)
+        await manager.broadcast_to_game({
+            "type": "tournament_round_finished",
+            "message": f"Round {tournament.round} is over - the next one starts in {TOURNAMENT_ROUND_DELAY:g} s",
+            "tournamentId": tournament.id,
+            "round": tournament.round
+        }, tournament.id)
+        return
+    standings = tournament.standings()
+    await manager.broadcast_to_game({
+        "type": "tournament_finished",
+        "message": f"The tournament is over - {tournament.champion} is the champion!",
+        "tournamentId": tournament.id,
+        "champion": tournament.champion,
+        "standings": standings[:10]
+    }, tournament.id)
+    logger.info(f"Tournament {tournament.id} finished after {tournament.round} rounds, won by {tournament.champion}")
+    timers.schedule(f"tournament:{tournament.id}", TOURNAMENT_RESULT_TTL, tournaments.pop, tournament.id, None)
+
 @app.get("/state/{room_id}/{user_id}")
-async def get_state(room_id: str, user_id: str):
-    """Get game state (HTTP endpoint for backward compatibility)"""
+async def get_state(
+    request: Request, room_id: str, user_id: str, wait: float = Query(0, ge=0, le=LONG_POLL_MAX_WAIT)
+):
+    """Get game state (HTTP endpoint for backward compatibility)
+
+    With `wait`, a request made before both moves are in is held for up to
+    that many seconds and answered as soon as the result exists.
+    """
+    redirect = redirect_to_owner(request, room_id)
+    if redirect is not None:
+        return redirect
+    if is_player(room_id, user_id) is False:
+        raise HTTPException(status_code=403, detail="User not in room")
     if room_id not in rooms:
         return {"status": "room not found"}
+    game_reaper.touch(room_id)
 
-    # Not enough players yet
-    if len(rooms[room_id]["moves"]) < 2:
+    game = rooms[room_id]
+    if wait and game.result is None and game.moves_count < 2:
+        waiter = result_waiters.setdefault(room_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+        if room_id not in rooms:
+            return {"status": "room not found"}
+        game = rooms[room_id]
+
+    # Not enough players yet (a forfeited round has a result with one move)
+    if game.result is None and game.moves_count < 2:
         return {"status": "waiting"}
 
     # If winner already calculated → return it
-    if rooms[room_id]["result"]:
-        result = rooms[room_id]["result"]
+    if game.result:
+        result = game.result
     else:
        
         await process_game_result(room_id)
-        result = rooms[room_id]["result"]
-
-    # Mark that this user saw the result
-    rooms[room_id]["seen"].add(user_id)
+        result = game.result
 
-    # Reset when both have seen
-    if len(rooms[room_id]["seen"]) == 2:
-        rooms[room_id] = {"moves": {}, "usernames": {}, "result": None, "seen": set()}
+    # Mark that this user saw the result, reset when both have seen
+    journal.append(["seen", room_id, user_id])
+    if game.mark_seen(user_id) == 2:
+        game.reset()
+        timers.cancel(f"advance:{room_id}")
+        arm_deadline(room_id)
         # Notify players that game is reset
         await manager.broadcast_to_game({
             "type": "game_reset",
@@ -181,99 +824,133 @@ async def get_state(room_id: str, user_id: str):
 
     return result
 
+async def relay_to_owner(websocket: WebSocket, key: str) -> bool:
+    """Relay the socket to the shard that owns `key`; False when this shard owns it"""
+    owner = shards.owner_url(key)
+    if owner is None or SHARD_HOP_HEADER in websocket.headers:
+        return False
+    # Browsers cannot follow redirects on a WebSocket upgrade, so relay
+    shards.relayed_connections += 1
+    url = owner.replace("http", "ws", 1) + websocket.url.path
+    await relay_websocket(websocket, url, shards.self_url)
+    return True
+
 @app.websocket("/ws/{room_id}/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str, user_id: str):
     """WebSocket endpoint for real-time game communication"""
-    await manager.connect(websocket, room_id, user_id)
-    username = get_username(user_id)
-    
-    # Initialize room if it doesn't exist
-    if room_id not in rooms:
-        rooms[room_id] = {"moves": {}, "usernames": {}, "result": None, "seen": set()}
-    
-    # Send game status to connecting user
-    await manager.send_to_user_in_game({
-        "type": "game_connected",
-        "message": f"Connected to game in room {room_id}",
-        "userId": user_id,
-        "username": username,
-        "roomId": room_id,
-        "game_status": {
-            "moves_submitted": len(rooms[room_id]["moves"]),
-            "waiting_for_moves": 2 - len(rooms[room_id]["moves"]),
-            "has_result": rooms[room_id]["result"] is not None
-        }
-    }, room_id, user_id)
+    if await relay_to_owner(websocket, room_id):
+        return
+    with tracer.start_trace("ws connect", websocket.headers.get(TRACEPARENT), room=room_id, user=user_id):
+        if not await check_player(room_id, user_id):
+            await websocket.close(code=4003, reason="User not in room")
+            return
+        codec = await manager.connect(websocket, room_id, user_id)
+        username = await get_username(user_id)
+
+        # Initialize room if it doesn't exist
+        if room_id not in rooms:
+            rooms[room_id] = GameState()
+        game_reaper.touch(room_id)
+
+        # Send game status to connecting user
+        await manager.send_to_user_in_game({
+            "type": "game_connected",
+            "message": f"Connected to game in room {room_id}",
+            "userId": user_id,
+            "username": username,
+            "roomId": room_id,
+            "game_status": {
+                "moves_submitted": rooms[room_id].moves_count,
+                "waiting_for_moves": 2 - rooms[room_id].moves_count,
+                "has_result": rooms[room_id].result is not None
+            },
+            "series": series[room_id].snapshot() if room_id in series else None,
+            "bot": room_id in bots
+        }, room_id, user_id)
     
     try:
         while True:
             # Listen for messages from client
-            data = await websocket.receive_text()
+            data = await receive_frame(websocket)
+            started = time.perf_counter()
+            kind = "invalid"
+            game_reaper.touch(room_id)
             try:
-                message = json.loads(data)
+                message = codec.decode(data)
+                kind = message.get("type") if message.get("type") in GAME_MESSAGE_TYPES else "other"
                 logger.info(f"Received game message from user {user_id} in room {room_id}: {message}")
                 
-                # Handle different message types
-                if message.get("type") == "submit_move":
-                    move = message.get("move", "").lower()
-                    if move in ["rock", "paper", "scissors"]:
-                        # Save player's move
-                        rooms[room_id]["moves"][user_id] = move
-                        rooms[room_id]["usernames"][user_id] = username
-                        
-                        # Broadcast that move was received
-                        await manager.broadcast_to_game({
-                            "type": "move_received",
-                            "message": f"{username} has made their move",
-                            "userId": user_id,
-                            "username": username,
-                            "roomId": room_id,
-                            "moves_count": len(rooms[room_id]["moves"])
-                        }, room_id)
-                        
-                        # Check if we have both moves
-                        if len(rooms[room_id]["moves"]) == 2:
-                            await process_game_result(room_id)
-                    else:
+                with tracer.start_trace(f"ws {kind}", message.get(TRACEPARENT), room=room_id, user=user_id):
+                    # Handle different message types
+                    if message.get("type") == "submit_move":
+                        move = Move.parse(message.get("move", ""))
+                        error = "Invalid move. Use: rock, paper, or scissors" if move is None else (
+                            await submit_move(room_id, user_id, username, move)
+                        )
+                        if error is not None:
+                            await manager.send_to_user_in_game({
+                                "type": "error",
+                                "message": error
+                            }, room_id, user_id)
+
+                    elif message.get("type") == "get_game_status":
+                        # Send current game status
                         await manager.send_to_user_in_game({
-                            "type": "error",
-                            "message": "Invalid move. Use: rock, paper, or scissors"
+                            "type": "game_status",
+                            "roomId": room_id,
+                            "game_status": {
+                                "moves_submitted": rooms[room_id].moves_count,
+                                "waiting_for_moves": 2 - rooms[room_id].moves_count,
+                                "has_result": rooms[room_id].result is not None,
+                                "result": rooms[room_id].result
+                            }
                         }, room_id, user_id)
+
+                    elif message.get("type") == "add_bot":
+                        try:
+                            await add_bot(room_id, user_id)
+                        except ValueError as e:
+                            await manager.send_to_user_in_game({
+                                "type": "error",
+                                "message": str(e)
+                            }, room_id, user_id)
+
+                    elif message.get("type") == "start_series":
+                        try:
+                            await start_series(room_id, message.get("bestOf"))
+                        except ValueError as e:
+                            await manager.send_to_user_in_game({
+                                "type": "error",
+                                "message": str(e)
+                            }, room_id, user_id)
+
+                    elif message.get("type") == "ready_for_next_round":
+                        # Mark user as ready for next round, reset when both have seen
+                        journal.append(["seen", room_id, user_id])
+                        if rooms[room_id].mark_seen(user_id) == 2:
+                            rooms[room_id].reset()
+                            timers.cancel(f"advance:{room_id}")
+                            arm_deadline(room_id)
+                            await manager.broadcast_to_game({
+                                "type": "game_reset",
+                                "message": "Game reset - ready for next round!",
+                                "roomId": room_id
+                            }, room_id)
                 
-                elif message.get("type") == "get_game_status":
-                    # Send current game status
-                    await manager.send_to_user_in_game({
-                        "type": "game_status",
-                        "roomId": room_id,
-                        "game_status": {
-                            "moves_submitted": len(rooms[room_id]["moves"]),
-                            "waiting_for_moves": 2 - len(rooms[room_id]["moves"]),
-                            "has_result": rooms[room_id]["result"] is not None,
-                            "result": rooms[room_id]["result"] if rooms[room_id]["result"] else None
-                        }
-                    }, room_id, user_id)
-                
-                elif message.get("type") == "ready_for_next_round":
-                    # Mark user as ready for next round
-                    rooms[room_id]["seen"].add(user_id)
-                    
-                    # Reset when both have seen
-                    if len(rooms[room_id]["seen"]) == 2:
-                        rooms[room_id] = {"moves": {}, "usernames": {}, "result": None, "seen": set()}
-                        await manager.broadcast_to_game({
-                            "type": "game_reset",
-                            "message": "Game reset - ready for next round!",
-                            "roomId": room_id
-                        }, room_id)
-                
-            except json.JSONDecodeError:
+            except DecodeError:
                 await manager.send_to_user_in_game({
                     "type": "error",
-                    "message": "Invalid JSON format"
+                    "message": codec.invalid_message
                 }, room_id, user_id)
+            websocket_message_seconds.observe(time.perf_counter() - started, kind)
                 
     except WebSocketDisconnect:
-        manager.disconnect(room_id, user_id)
+        manager.disconnect(room_id, user_id, websocket)
+        if room_id not in manager.game_connections:
+            if room_id not in tournament_rooms and membership.room_exists(room_id) is False:
+                close_game(room_id)
+            else:
+                game_reaper.touch(room_id, GAME_ABANDONED_TTL)
         # Notify other players that user disconnected
         await manager.broadcast_to_game({
             "type": "player_disconnected",
@@ -283,6 +960,172 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, user_id: str):
             "roomId": room_id
         }, room_id, exclude_user=user_id)
 
+@app.websocket("/spectate/{room_id}")
+async def spectate_websocket(websocket: WebSocket, room_id: str):
+    """Read-only view of a room's rounds; anything the spectator sends is ignored"""
+    if await relay_to_owner(websocket, room_id):
+        return
+    # Without a synced membership cache every room is accepted, as for players
+    if room_id not in rooms and room_id not in tournament_rooms and membership.room_exists(room_id) is False:
+        await websocket.close(code=4004, reason="Room not found")
+        return
+    codec = await accept(websocket)
+    game = rooms.get(room_id)
+    await send(websocket, codec, {
+        "type": "spectating",
+        "message": f"Watching room {room_id}",
+        "roomId": room_id,
+        "game_status": {
+            "moves_submitted": game.moves_count if game else 0,
+            "has_result": game is not None and game.result is not None,
+            "result": game.result if game else None
+        },
+        "series": series[room_id].snapshot() if room_id in series else None,
+        "spectators": len(manager.spectator_feeds.get(room_id, ())) + 1
+    })
+    spectator = manager.spectate(websocket, room_id, codec)
+    try:
+        while True:
+            await receive_frame(websocket)
+    except WebSocketDisconnect:
+        spectator.close()
+
+@app.post("/bot")
+async def create_bot(request: Request, body: AddBotRequest):
+    """Fill the room's second seat with a bot that learns the player's habits"""
+    redirect = redirect_to_owner(request, body.roomId)
+    if redirect is not None:
+        return redirect
+    if not await check_player(body.roomId, body.userId):
+        raise HTTPException(status_code=403, detail="User not in room")
+    try:
+        await add_bot(body.roomId, body.userId)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"roomId": body.roomId, "userId": BOT_USER_ID, "username": BOT_USERNAME}
+
+@app.post("/series")
+async def create_series(request: Request, body: StartSeriesRequest):
+    """Play the room's next rounds as a best-of-N series that advances on its own"""
+    redirect = redirect_to_owner(request, body.roomId)
+    if redirect is not None:
+        return redirect
+    if body.bestOf not in SERIES_LENGTHS:
+        raise HTTPException(status_code=400, detail=f"bestOf must be one of {', '.join(map(str, SERIES_LENGTHS))}")
+    if not await check_player(body.roomId, body.userId):
+        raise HTTPException(status_code=403, detail="User not in room")
+    try:
+        current = await start_series(body.roomId, body.bestOf)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return current.snapshot()
+
+@app.get("/series/{room_id}")
+def get_series(request: Request, room_id: str):
+    redirect = redirect_to_owner(request, room_id)
+    if redirect is not None:
+        return redirect
+    if room_id not in series:
+        raise HTTPException(status_code=404, detail="No series in this room")
+    return series[room_id].snapshot()
+
+@app.post("/tournaments")
+def create_tournament(body: CreateTournamentRequest):
+    """Create a bracket or Swiss tournament; its first round starts after TOURNAMENT_ROUND_DELAY"""
+    tournament_id = new_local_id("T")
+    try:
+        tournament = Tournament(tournament_id, body.players, body.format, body.bestOf, body.rounds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tournaments[tournament_id] = tournament
+    timers.schedule(f"tournament:{tournament_id}", TOURNAMENT_ROUND_DELAY, start_tournament_round, tournament_id)
+    logger.info(f"Tournament {tournament_id} created: {body.format}, {len(body.players)} players, best of {body.bestOf}")
+    return {**tournament.snapshot(), "startsIn": TOURNAMENT_ROUND_DELAY}
+
+@app.get("/tournaments/{tournament_id}")
+def get_tournament(request: Request, tournament_id: str):
+    """Current round, its matches and the standings"""
+    redirect = redirect_to_owner(request, tournament_id)
+    if redirect is not None:
+        return redirect
+    if tournament_id not in tournaments:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return tournaments[tournament_id].snapshot()
+
+@app.websocket("/tournaments/{tournament_id}/ws/{user_id}")
+async def tournament_websocket(websocket: WebSocket, tournament_id: str, user_id: str):
+    """Tournament lobby: round starts, each player's match assignments and the final standings"""
+    if await relay_to_owner(websocket, tournament_id):
+        return
+    tournament = tournaments.get(tournament_id)
+    if tournament is None or user_id not in tournament.seeds:
+        await websocket.close(code=4003, reason="Not a player in this tournament")
+        return
+    await manager.connect(websocket, tournament_id, user_id)
+    match = next((m for m in tournament.matches if user_id in (m.player1, m.player2)), None)
+    await manager.send_to_user_in_game({
+        "type": "tournament_status",
+        "message": f"Joined tournament {tournament_id} ({tournament.format}, best of {tournament.best_of})",
+        "tournamentId": tournament_id,
+        "round": tournament.round,
+        "rounds": tournament.total_rounds,
+        "finished": tournament.finished,
+        "match": match.snapshot() if match is not None else None
+    }, tournament_id, user_id)
+    try:
+        while True:
+            await receive_frame(websocket)
+    except WebSocketDisconnect:
+        manager.disconnect(tournament_id, user_id, websocket)
+
+@app.get("/stats/{user_id}")
+def get_player_stats(user_id: str):
+    """Wins, losses, draws, streaks, move counts and rank of one player"""
+    player = stats.get(user_id)
+    if player is None:
+        raise HTTPException(status_code=404, detail="No games recorded for this user")
+    return player
+
+@app.get("/leaderboard")
+def get_leaderboard(limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0)):
+    """A page of the global leaderboard, ranked by wins and then fewest losses"""
+    return {"total": len(stats), "players": stats.top(limit, offset)}
+
+@app.get("/history/users/{user_id}")
+def get_user_history(user_id: str, limit: int = Query(20, ge=1, le=100), before: Optional[int] = Query(None, ge=1)):
+    """A user's matches, newest first; pass `next` as `before` to get the following page"""
+    return history.for_user(user_id, limit, before)
+
+@app.get("/history/rooms/{room_id}")
+def get_room_history(room_id: str, limit: int = Query(20, ge=1, le=100), before: Optional[int] = Query(None, ge=1)):
+    """A room's matches, newest first"""
+    return history.for_room(room_id, limit, before)
+
+@app.get("/history/export")
+def export_history(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    user_id: Optional[str] = Query(None, alias="userId"),
+    since: float = 0,
+    until: Optional[float] = None,
+):
+    """Stream the whole history (or one user's), oldest first, in constant memory"""
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        history.export(fmt, user_id, since, until),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=match-history.{fmt}"},
+    )
+
+@app.get("/history")
+def get_history(
+    since: float = 0,
+    until: Optional[float] = None,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = Query(None, ge=1),
+):
+    """Matches played between `since` and `until` (Unix seconds), newest first"""
+    return history.between(since, until, limit, before)
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -290,9 +1133,46 @@ def health_check():
         "status": "healthy",
         "service": "game-service",
         "active_games": len(rooms),
-        "games_in_progress": len([r for r in rooms.values() if len(r["moves"]) > 0])
+        "games_in_progress": GameState.in_progress,
+        "spectated_games": len(manager.spectator_feeds),
+        "outbound": manager.outbound_stats.snapshot(),
+        "reaper": game_reaper.stats(),
+        "journal": journal.stats(),
+        "history": history.stats(),
+        "series": len(series),
+        "bots": len(bots),
+        "tournaments": len(tournaments),
+        "timers": timers.stats(),
+        "shards": shards.stats(),
+        "membership": membership.stats(),
+        "pubsub": pubsub.stats(),
+        "tracing": tracer.stats()
     }
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Counters, gauges and latency histograms in the Prometheus text format"""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
-    logger.info("Starting Game Service on port 8002")
-    uvicorn.run("main:app", host="127.0.0.1", port=8002, reload=True)
+    parser = argparse.ArgumentParser(description="Game Service")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="shard processes on ports PORT..PORT+N-1; 1 runs a single reloading dev server",
+    )
+    parser.add_argument("--pubsub-port", type=int, default=8090)
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        logger.info(f"Starting Game Service on port {args.port}")
+        uvicorn.run("main:app", host="127.0.0.1", port=args.port, reload=True)
+    else:
+        processes = spawn_shards(args.workers, args.port, args.pubsub_port)
+        try:
+            for process in processes:
+                process.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_processes(processes)
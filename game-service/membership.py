@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Callable, Optional
+
+from pubsub import PubSub
+
+logger = logging.getLogger(__name__)
+
+ROOMS_CHANNEL = "rooms"
+ROOMS_SYNC_CHANNEL = "rooms-sync"
+
+
+class MembershipCache:
+    """Local mirror of room-service's rooms and players, fed by its events.
+
+    Room Service publishes `created`/`joined`/`left`/`closed` events with a
+    sequence number (see room-service/room_events.py), so membership checks
+    here are dict lookups with no per-request call to Room Service. When a
+    message is lost (a gap in the sequence, or a heartbeat ahead of what we
+    applied) or Room Service restarts (a new epoch), the cache requests a
+    snapshot; events arriving meanwhile are buffered and replayed on top of
+    it.
+
+    Until the first snapshot arrives the cache is not `synced` and
+    `is_member` returns None, so a Game Service running without a shared
+    pub/sub backend behaves as before and accepts everyone.
+    """
+
+    def __init__(
+        self,
+        pubsub: PubSub,
+        on_left: Optional[Callable[[str, str], None]] = None,
+        on_closed: Optional[Callable[[str], None]] = None,
+        sync_retry: float = 5.0,
+    ):
+        self.pubsub = pubsub
+        self.on_left = on_left
+        self.on_closed = on_closed
+        self.sync_retry = sync_retry
+        self.synced = False
+        self.epoch: Optional[str] = None
+        self.seq = 0
+        self._members: dict[str, tuple[str, ...]] = {}
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._sync_id: Optional[str] = None
+        self._sync_started = 0.0
+        self._parts: dict[int, list] = {}
+        self._buffer: list[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self.applied_events = 0
+        self.resyncs = 0
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def is_member(self, room_id: str, user_id: str) -> Optional[bool]:
+        """Whether `user_id` is a player of `room_id`; None while not synced"""
+        if not self.synced:
+            return None
+        return user_id in self._members.get(room_id, ())
+
+    def players(self, room_id: str) -> tuple[str, ...]:
+        return self._members.get(room_id, ())
+
+    def room_exists(self, room_id: str) -> Optional[bool]:
+        if not self.synced:
+            return None
+        return room_id in self._members
+
+    async def check(self, room_id: str, user_id: str, grace: float = 1.0) -> bool:
+        """`is_member`, but a negative answer waits up to `grace` seconds for
+        an event about the room, covering a join that Room Service has
+        answered but whose event is still in flight"""
+        deadline = time.monotonic() + grace
+        while True:
+            member = self.is_member(room_id, user_id)
+            remaining = deadline - time.monotonic()
+            if member is not False or remaining <= 0:
+                return member is not False
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(room_id, []).append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters = self._waiters.get(room_id)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[room_id]
+
+    def _wake(self, room_id: str):
+        for waiter in self._waiters.pop(room_id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _apply(self, kind: str, room_id: str, players: list):
+        previous = self._members.get(room_id, ())
+        if kind == "closed":
+            self._members.pop(room_id, None)
+            if self.on_closed is not None and previous:
+                self.on_closed(room_id)
+        else:
+            current = self._members[room_id] = tuple(players)
+            if self.on_left is not None:
+                for user_id in previous:
+                    if user_id not in current:
+                        self.on_left(room_id, user_id)
+        self.applied_events += 1
+        self._wake(room_id)
+
+    def _apply_batch(self, message: dict):
+        first = message["seq"] - len(message["events"]) + 1
+        for offset, (kind, room_id, players) in enumerate(message["events"]):
+            if first + offset > self.seq:
+                self._apply(kind, room_id, players)
+        self.seq = max(self.seq, message["seq"])
+
+    def _on_message(self, message: dict):
+        kind = message.get("type")
+        if kind == "snapshot":
+            self._on_snapshot(message)
+        elif self._sync_id is not None:
+            if kind == "events":
+                self._buffer.append(message)
+        elif message.get("epoch") != self.epoch:
+            self._request_sync()
+            if kind == "events":
+                self._buffer.append(message)
+        elif kind == "events":
+            if message["seq"] - len(message["events"]) > self.seq:
+                logger.warning(f"Missed room events after seq {self.seq}; resyncing")
+                self._request_sync()
+                self._buffer.append(message)
+            else:
+                self._apply_batch(message)
+        elif kind == "heartbeat" and message["seq"] > self.seq:
+            logger.warning(f"Room events behind ({self.seq} < {message['seq']}); resyncing")
+            self._request_sync()
+
+    def _request_sync(self):
+        self._sync_id = uuid.uuid4().hex
+        self._sync_started = time.monotonic()
+        self._parts = {}
+        self.resyncs += 1
+        asyncio.create_task(self.pubsub.publish(ROOMS_SYNC_CHANNEL, {"type": "sync", "syncId": self._sync_id}))
+
+    def _on_snapshot(self, message: dict):
+        if message.get("syncId") != self._sync_id:
+            return  # another subscriber's snapshot
+        self._parts[message["part"]] = message["rooms"]
+        if len(self._parts) < message["parts"]:
+            return
+        previous = self._members
+        self._members = {room_id: tuple(players) for part in self._parts.values() for room_id, players in part}
+        self.epoch, self.seq = message["epoch"], message["seq"]
+        self._sync_id = None
+        self._parts = {}
+        self.synced = True
+        buffered, self._buffer = self._buffer, []
+        for batch in buffered:
+            if batch["epoch"] == self.epoch:
+                self._on_message(batch)
+        if self.on_closed is not None:
+            for room_id in previous:
+                if room_id not in self._members:
+                    self.on_closed(room_id)
+        for room_id in list(self._waiters):
+            self._wake(room_id)
+        logger.info(f"Membership synced: {len(self._members)} rooms at seq {self.seq}")
+
+    async def start(self):
+        if self._task is None:
+            self.pubsub.subscribe(ROOMS_CHANNEL, self._on_message)
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        # Ask until a snapshot arrives (Room Service may start later), and
+        # again if a requested snapshot never completes
+        while True:
+            stalled = self._sync_id is not None and time.monotonic() - self._sync_started > self.sync_retry
+            if stalled or (not self.synced and self._sync_id is None):
+                self._request_sync()
+            await asyncio.sleep(self.sync_retry)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "synced": self.synced,
+            "rooms": len(self._members),
+            "seq": self.seq,
+            "applied_events": self.applied_events,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,75 @@
+from typing import Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # The batched path falls back to plain Python
+    np = None
+
+DRAW = 0
+FIRST_WINS = 1
+SECOND_WINS = 2
+
+
+class RuleSet:
+    """Outcome table for a rock-paper-scissors style game.
+
+    Moves are small ints (their index in `moves`). `resolve()` is a single
+    lookup in a precomputed table, so adding moves or variants does not add
+    comparisons to the per-round path. `resolve_batch()` resolves whole
+    arrays of move pairs at once with NumPy when it is installed.
+    """
+
+    def __init__(self, name: str, moves: Sequence[str], beats: dict[str, Sequence[str]]):
+        self.name = name
+        self.moves = tuple(moves)
+        self._indexes = {move: index for index, move in enumerate(self.moves)}
+        size = len(self.moves)
+        table = [[DRAW] * size for _ in range(size)]
+        for winner, losers in beats.items():
+            for loser in losers:
+                a, b = self._indexes[winner], self._indexes[loser]
+                if table[b][a] == FIRST_WINS:
+                    raise ValueError(f"{winner} and {loser} cannot beat each other")
+                table[a][b] = FIRST_WINS
+                table[b][a] = SECOND_WINS
+        for a in range(size):
+            for b in range(size):
+                if a != b and table[a][b] == DRAW:
+                    raise ValueError(f"No rule decides {self.moves[a]} against {self.moves[b]}")
+        self.table = tuple(tuple(row) for row in table)
+        self._array = np.array(table, dtype=np.int8) if np is not None else None
+
+    def parse(self, move: str) -> Optional[int]:
+        return self._indexes.get(move.strip().lower()) if isinstance(move, str) else None
+
+    def resolve(self, move1: int, move2: int) -> int:
+        """DRAW, FIRST_WINS or SECOND_WINS for one pair of moves"""
+        return self.table[move1][move2]
+
+    def resolve_batch(self, moves1, moves2):
+        """Resolve many pairs at once; returns an int8 array (a list without NumPy)"""
+        if self._array is None:
+            table = self.table
+            return [table[a][b] for a, b in zip(moves1, moves2)]
+        return self._array[np.asarray(moves1, dtype=np.intp), np.asarray(moves2, dtype=np.intp)]
+
+
+CLASSIC = RuleSet(
+    "classic",
+    ["rock", "paper", "scissors"],
+    {"rock": ["scissors"], "paper": ["rock"], "scissors": ["paper"]},
+)
+
+LIZARD_SPOCK = RuleSet(
+    "lizard-spock",
+    ["rock", "paper", "scissors", "lizard", "spock"],
+    {
+        "rock": ["scissors", "lizard"],
+        "paper": ["rock", "spock"],
+        "scissors": ["paper", "lizard"],
+        "lizard": ["paper", "spock"],
+        "spock": ["rock", "scissors"],
+    },
+)
+
+RULE_SETS = {rules.name: rules for rules in (CLASSIC, LIZARD_SPOCK)}
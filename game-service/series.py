@@ -0,0 +1,63 @@
+from typing import Optional
+
+SERIES_LENGTHS = (1, 3, 5, 7, 9)
+
+
+class Series:
+    """A best-of-N series between the two players of one room.
+
+    The first player to win `best_of // 2 + 1` rounds takes the series.
+    Drawn rounds are replayed and do not count towards the total. Players
+    are learned from the first result unless given up front (tournament
+    matches name them so that nobody else can take a seat).
+    """
+
+    __slots__ = ("best_of", "players", "names", "wins", "rounds", "draws", "winner")
+
+    def __init__(self, best_of: int, players: Optional[tuple[str, str]] = None):
+        if best_of not in SERIES_LENGTHS:
+            raise ValueError(f"bestOf must be one of {', '.join(map(str, SERIES_LENGTHS))}")
+        self.best_of = best_of
+        self.players: Optional[tuple[str, str]] = players
+        self.names: dict[str, str] = {}
+        self.wins = [0, 0]
+        self.rounds = 0
+        self.draws = 0
+        self.winner: Optional[str] = None
+
+    @property
+    def needed(self) -> int:
+        return self.best_of // 2 + 1
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None
+
+    def record(self, user1: str, name1: str, user2: str, name2: str, winner: Optional[str]) -> bool:
+        """Count one round (`winner` is a user ID, None for a draw); True once the series is decided"""
+        if self.players is None:
+            self.players = (user1, user2)
+        self.names[user1] = name1
+        self.names[user2] = name2
+        self.rounds += 1
+        if winner is None:
+            self.draws += 1
+        elif winner in self.players:
+            index = self.players.index(winner)
+            self.wins[index] += 1
+            if self.wins[index] >= self.needed:
+                self.winner = winner
+        return self.finished
+
+    def snapshot(self) -> dict:
+        return {
+            "bestOf": self.best_of,
+            "round": self.rounds,
+            "draws": self.draws,
+            "players": [
+                {"userId": user_id, "username": self.names.get(user_id), "wins": wins}
+                for user_id, wins in zip(self.players or (), self.wins)
+            ],
+            "winner": self.winner,
+            "winnerName": self.names.get(self.winner) if self.winner else None,
+        }
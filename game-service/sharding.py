@@ -0,0 +1,268 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Iterable, Optional
+
+import websockets
+from fastapi import WebSocket, WebSocketDisconnect
+
+from codec import receive_frame, send_frame
+from pubsub import PubSub
+
+logger = logging.getLogger(__name__)
+
+# Set on connections a shard relays to the owner, so the owner serves them
+# even if its view of the ring briefly disagrees with the relaying shard's
+SHARD_HOP_HEADER = "x-game-shard-hop"
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of room ids onto shards.
+
+    Each shard is placed on the ring at `vnodes` points, and a room belongs to
+    the first shard point at or after the room's hash. Adding or removing a
+    shard only moves the rooms on the arcs next to its points (about 1/N of
+    all rooms), and lookups are a binary search.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128):
+        self.vnodes = vnodes
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        self.nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class ShardDirectory:
+    """Which game-service shard owns each room, kept in sync over pub/sub.
+
+    Shards are identified by their base URL. Every shard publishes a
+    heartbeat on `channel`; a shard that misses heartbeats for
+    `heartbeat_ttl` seconds leaves the ring and its rooms move to the
+    survivors, and a shard that starts announcing itself joins it. The
+    configured `peers` are assumed alive at startup so that routing works
+    before the first heartbeats arrive.
+
+    With no `self_url` the service is a single shard and owns every room.
+    """
+
+    channel = "game-shards"
+
+    def __init__(
+        self,
+        self_url: Optional[str],
+        peers: Iterable[str],
+        pubsub: PubSub,
+        heartbeat_interval: float = 2.0,
+        heartbeat_ttl: float = 6.0,
+        vnodes: int = 128,
+    ):
+        self.self_url = self_url.rstrip("/") if self_url else None
+        self.enabled = self.self_url is not None
+        self.pubsub = pubsub
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_ttl = heartbeat_ttl
+        peers = {peer.rstrip("/") for peer in peers}
+        if self.enabled:
+            peers.add(self.self_url)
+        self.ring = HashRing(peers, vnodes)
+        self._last_seen = {peer: time.monotonic() for peer in peers}
+        self._task: Optional[asyncio.Task] = None
+        self.redirected_requests = 0
+        self.relayed_connections = 0
+
+    def owner_url(self, room_id: str) -> Optional[str]:
+        """Base URL of the shard that owns `room_id`, or None if it is this one"""
+        if not self.enabled:
+            return None
+        owner = self.ring.owner(room_id)
+        return None if owner == self.self_url else owner
+
+    def _on_message(self, message: dict):
+        url = message.get("url")
+        if not url or url == self.self_url:
+            return
+        if message.get("type") == "down":
+            self._last_seen.pop(url, None)
+            if url in self.ring.nodes:
+                self.ring.remove(url)
+                logger.info(f"Shard {url} left; {len(self.ring.nodes)} shards live")
+            return
+        self._last_seen[url] = time.monotonic()
+        if url not in self.ring.nodes:
+            self.ring.add(url)
+            logger.info(f"Shard {url} joined; {len(self.ring.nodes)} shards live")
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self.pubsub.subscribe(self.channel, self._on_message)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.pubsub.publish(self.channel, {"type": "up", "url": self.self_url})
+                self._drop_silent_peers(time.monotonic())
+            except Exception as e:
+                logger.error(f"Shard heartbeat error: {e!r}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _drop_silent_peers(self, now: float):
+        for url, seen in list(self._last_seen.items()):
+            if url != self.self_url and now - seen > self.heartbeat_ttl:
+                del self._last_seen[url]
+                self.ring.remove(url)
+                logger.warning(f"Shard {url} missed heartbeats; {len(self.ring.nodes)} shards live")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.pubsub.publish(self.channel, {"type": "down", "url": self.self_url})
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "self": self.self_url,
+            "live": sorted(self.ring.nodes),
+            "redirected_requests": self.redirected_requests,
+            "relayed_connections": self.relayed_connections,
+        }
+
+
+async def relay_websocket(websocket: WebSocket, url: str, hop_from: str):
+    """Accept `websocket` and pipe it to `url` on the owning shard until either side closes
+
+    The client's subprotocols are offered to the owner, and the socket is
+    accepted with the one it picks, so the client and the owner agree on the
+    codec and the relay passes text and binary frames through untouched.
+    """
+    try:
+        async with websockets.connect(
+            url, additional_headers={SHARD_HOP_HEADER: hop_from},
+            subprotocols=websocket.scope.get("subprotocols") or None,
+        ) as upstream:
+            await websocket.accept(subprotocol=upstream.subprotocol)
+
+            async def client_to_owner():
+                while True:
+                    await upstream.send(await receive_frame(websocket))
+
+            async def owner_to_client():
+                async for message in upstream:
+                    await send_frame(websocket, message)
+
+            tasks = [asyncio.create_task(client_to_owner()), asyncio.create_task(owner_to_client())]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                # A client disconnect ends the relay normally; anything else is logged
+                if not isinstance(task.exception(), (WebSocketDisconnect, type(None))):
+                    logger.warning(f"Relay to {url} ended: {task.exception()!r}")
+    except (OSError, websockets.WebSocketException) as e:
+        logger.warning(f"Cannot relay to owning shard {url}: {e!r}")
+    try:
+        await websocket.close()
+    except (RuntimeError, WebSocketDisconnect):
+        pass  # already closed by the client
+
+
+def spawn_shards(
+    workers: int,
+    port: int,
+    pubsub_port: int,
+    host: str = "127.0.0.1",
+    app: str = "main:app",
+    extra_env: Optional[dict] = None,
+) -> list[subprocess.Popen]:
+    """Start a pub/sub broker and `workers` shard processes on ports port..port+workers-1.
+
+    Every shard accepts any request: shard 0 on `port` can stay the public
+    entry point, and requests for rooms owned by another shard are
+    redirected (HTTP) or relayed (WebSocket) there.
+    """
+    service_dir = os.path.dirname(os.path.abspath(__file__))
+    urls = [f"http://{host}:{port + i}" for i in range(workers)]
+    processes = [
+        subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(service_dir), "shared", "pubsub.py"),
+             "--host", host, "--port", str(pubsub_port)],
+            cwd=service_dir,
+        )
+    ]
+    data_dir = os.environ.get("GAME_DATA_DIR")
+    for i, url in enumerate(urls):
+        env = dict(os.environ, **(extra_env or {}))
+        env["GAME_SHARD_URL"] = url
+        env["GAME_SHARDS"] = ",".join(urls)
+        env["GAME_PUBSUB_URL"] = f"tcp://{host}:{pubsub_port}"
+        if data_dir:
+            env["GAME_DATA_DIR"] = os.path.join(data_dir, f"shard-{i}")
+        if env.get("GAME_HISTORY_DB"):
+            # Every shard stores every result, so each needs its own file
+            root, ext = os.path.splitext(env["GAME_HISTORY_DB"])
+            env["GAME_HISTORY_DB"] = f"{root}-shard-{i}{ext}"
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", app, "--host", host, "--port", str(port + i), "--log-level", "warning"],
+                cwd=service_dir,
+                env=env,
+            )
+        )
+    logger.info(f"Started {workers} game-service shards on {urls[0]} .. {urls[-1]}")
+    return processes
+
+
+def stop_processes(processes: list[subprocess.Popen], timeout: float = 10.0):
+    # Shards first and the broker last, so shards can still announce they are leaving
+    shards, broker = processes[1:], processes[:1]
+    for group in (shards, broker):
+        for process in group:
+            process.terminate()
+        for process in group:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
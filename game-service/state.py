@@ -0,0 +1,77 @@
+from enum import IntEnum
+from typing import Optional
+
+
+class Move(IntEnum):
+    # Values are the move indexes of rules.CLASSIC
+    ROCK = 0
+    PAPER = 1
+    SCISSORS = 2
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def parse(cls, value) -> Optional["Move"]:
+        """Map a client-supplied move name to a Move, or None if invalid"""
+        if not isinstance(value, str):
+            return None
+        return cls.__members__.get(value.strip().upper())
+
+
+class GameState:
+    """State of the current round in one room.
+
+    A round has two seats filled in the order moves arrive. Seats, moves and
+    the players who have acknowledged the result are stored in slots rather
+    than in per-room dicts and sets, so an idle room is a single small
+    object, and `reset()` clears it in place for the next round.
+
+    `GameState.in_progress` counts the rounds, across all rooms, that have
+    at least one move. `submit()` and `reset()` keep it up to date, so
+    `/health` and `/metrics` read it without scanning the rooms; reset a
+    game before dropping it.
+    """
+
+    __slots__ = ("user1", "name1", "move1", "user2", "name2", "move2", "seen", "result")
+
+    in_progress = 0
+
+    def __init__(self):
+        self.user1: Optional[str] = None
+        self.reset()
+
+    def reset(self):
+        if self.user1 is not None:
+            GameState.in_progress -= 1
+        self.user1: Optional[str] = None
+        self.name1: Optional[str] = None
+        self.move1: Optional[Move] = None
+        self.user2: Optional[str] = None
+        self.name2: Optional[str] = None
+        self.move2: Optional[Move] = None
+        self.seen: tuple[str, ...] = ()
+        self.result: Optional[dict] = None
+
+    @property
+    def moves_count(self) -> int:
+        return (self.user1 is not None) + (self.user2 is not None)
+
+    def submit(self, user_id: str, username: str, move: Move) -> bool:
+        """Record a player's move; False if both seats belong to other players"""
+        if self.user1 is None or self.user1 == user_id:
+            if self.user1 is None:
+                GameState.in_progress += 1
+            self.user1, self.name1, self.move1 = user_id, username, move
+        elif self.user2 is None or self.user2 == user_id:
+            self.user2, self.name2, self.move2 = user_id, username, move
+        else:
+            return False
+        return True
+
+    def mark_seen(self, user_id: str) -> int:
+        """Record that a user has seen the result; returns how many have"""
+        if user_id not in self.seen:
+            self.seen += (user_id,)
+        return len(self.seen)
@@ -0,0 +1,148 @@
+from typing import Iterable, Optional, Sequence
+
+from sortedcontainers import SortedList
+
+from rules import DRAW, FIRST_WINS
+
+
+class PlayerStats:
+    __slots__ = ("name", "wins", "losses", "draws", "streak", "best_streak", "moves")
+
+    def __init__(self, name: str, move_count: int):
+        self.name = name
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.streak = 0  # +n: n wins in a row, -n: n losses in a row
+        self.best_streak = 0
+        self.moves = [0] * move_count
+
+
+class StatsEngine:
+    """Per-player records and a global leaderboard, updated one result at a time.
+
+    Players are ranked by wins, then by fewest losses. The ranking is an
+    order-statistics structure (a SortedList of `(-wins, losses, user_id)`
+    keys), so recording a result, finding a player's rank and reading a page
+    of the leaderboard are all O(log n) plus the page size, and nothing ever
+    scans the whole player table. Players with the same record share a rank.
+
+    `excluded_users` (the server's bot) get no record or rank of their own;
+    their rounds still count for their opponents.
+    """
+
+    def __init__(self, move_names: Sequence[str], excluded_users: Iterable[str] = ()):
+        self.move_names = tuple(move_names)
+        self.excluded_users = frozenset(excluded_users)
+        self._players: dict[str, PlayerStats] = {}
+        self._ranking = SortedList()
+        self.results = 0
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    @staticmethod
+    def _key(user_id: str, player: PlayerStats) -> tuple:
+        return (-player.wins, player.losses, user_id)
+
+    def record(self, user1: str, name1: str, move1: int, user2: str, name2: str, move2: int, outcome: int):
+        """Apply one round's result (DRAW, FIRST_WINS or SECOND_WINS) to both players; a move of -1 is a forfeit"""
+        self.results += 1
+        if outcome == DRAW:
+            self._update(user1, name1, move1, 0)
+            self._update(user2, name2, move2, 0)
+        else:
+            first_won = outcome == FIRST_WINS
+            self._update(user1, name1, move1, 1 if first_won else -1)
+            self._update(user2, name2, move2, -1 if first_won else 1)
+
+    def _update(self, user_id: str, name: str, move: int, result: int):
+        if user_id in self.excluded_users:
+            return
+        player = self._players.get(user_id)
+        if player is None:
+            player = self._players[user_id] = PlayerStats(name, len(self.move_names))
+        elif result:
+            self._ranking.remove(self._key(user_id, player))
+        player.name = name
+        if move >= 0:  # no move when the player forfeited by running out of time
+            player.moves[move] += 1
+        if result > 0:
+            player.wins += 1
+            player.streak = player.streak + 1 if player.streak > 0 else 1
+            player.best_streak = max(player.best_streak, player.streak)
+        elif result < 0:
+            player.losses += 1
+            player.streak = player.streak - 1 if player.streak < 0 else -1
+        else:
+            player.draws += 1
+            player.streak = 0
+        if result or player.wins + player.losses + player.draws == 1:
+            self._ranking.add(self._key(user_id, player))
+
+    def name(self, user_id: str) -> Optional[str]:
+        player = self._players.get(user_id)
+        return player.name if player is not None else None
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank; players with the same record share one"""
+        player = self._players.get(user_id)
+        if player is None:
+            return None
+        return self._ranking.bisect_left((-player.wins, player.losses)) + 1
+
+    def get(self, user_id: str) -> Optional[dict]:
+        player = self._players.get(user_id)
+        if player is None:
+            return None
+        return {
+            "userId": user_id,
+            "username": player.name,
+            "rank": self.rank(user_id),
+            "wins": player.wins,
+            "losses": player.losses,
+            "draws": player.draws,
+            "games": player.wins + player.losses + player.draws,
+            "streak": player.streak,
+            "bestStreak": player.best_streak,
+            "moves": dict(zip(self.move_names, player.moves)),
+        }
+
+    def top(self, limit: int = 10, offset: int = 0) -> list[dict]:
+        """A page of the leaderboard, best first"""
+        entries = []
+        rank = None
+        previous = None
+        for key in self._ranking.islice(offset, offset + limit):
+            record = key[:2]
+            if record != previous:
+                rank = self._ranking.bisect_left(record) + 1
+                previous = record
+            player = self._players[key[2]]
+            entries.append({
+                "rank": rank,
+                "userId": key[2],
+                "username": player.name,
+                "wins": player.wins,
+                "losses": player.losses,
+                "draws": player.draws,
+            })
+        return entries
+
+    def dump(self) -> list[list]:
+        return [
+            [user_id, p.name, p.wins, p.losses, p.draws, p.streak, p.best_streak, list(p.moves)]
+            for user_id, p in self._players.items()
+        ]
+
+    def restore(self, rows: list[list]):
+        players = {}
+        for user_id, name, wins, losses, draws, streak, best_streak, moves in rows:
+            if user_id in self.excluded_users:
+                continue  # recorded before it was excluded
+            player = players[user_id] = PlayerStats(name, len(self.move_names))
+            player.wins, player.losses, player.draws = wins, losses, draws
+            player.streak, player.best_streak, player.moves = streak, best_streak, list(moves)
+        self._players = players
+        # One sort instead of n inserts
+        self._ranking = SortedList(self._key(user_id, p) for user_id, p in players.items())
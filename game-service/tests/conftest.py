@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Service modules import each other by bare name, as when run from the service directory
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.append(os.path.join(os.path.dirname(SERVICE_DIR), "shared"))
@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import io
+import json
+import os
+
+from history import MatchHistory
+from rules import CLASSIC
+
+ROCK, PAPER, SCISSORS = range(3)
+BOT = "bot"
+
+
+def history_of(path, rounds: list[tuple]) -> MatchHistory:
+    """A history holding `rounds` of (played_at, room_id, user1, move1, user2, move2)"""
+    history = MatchHistory(str(path), CLASSIC.moves, excluded_users=(BOT,))
+    history.open()
+    for played_at, room_id, user1, move1, user2, move2 in rounds:
+        history.add(played_at, room_id, user1, user1.title(), move1, user2, user2.title(), move2,
+                    CLASSIC.resolve(move1, move2))
+    asyncio.run(history.flush())
+    return history
+
+
+def ids(page: dict) -> list[int]:
+    return [match["id"] for match in page["matches"]]
+
+
+def test_rows_are_written_in_one_flush_and_read_back(tmp_path):
+    history = history_of(tmp_path / "history.db", [
+        (10.0, "R1", "alice", ROCK, "bob", SCISSORS),
+        (11.0, "R1", "alice", PAPER, "bob", SCISSORS),
+        (12.0, "R1", "alice", ROCK, "bob", ROCK),
+    ])
+    assert history.stats()["rows_written"] == 3
+    assert history.stats()["flushes"] == 1
+    matches = history.for_room("R1")["matches"]
+    assert [match["winner"] for match in matches] == [None, "bob", "alice"]
+    assert matches[2] == {
+        "id": 1, "playedAt": 10.0, "roomId": "R1", "user1": "alice", "username1": "Alice", "move1": "rock",
+        "user2": "bob", "username2": "Bob", "move2": "scissors", "winner": "alice",
+    }
+    asyncio.run(history.close())
+
+
+def test_pages_walk_backwards_without_gaps_or_repeats(tmp_path):
+    history = history_of(tmp_path / "history.db", [
+        (float(i), f"R{i % 2}", "alice", ROCK, "bob" if i % 3 else "carol", PAPER) for i in range(25)
+    ])
+    for query, expected in [
+        (lambda before: history.for_user("alice", 10, before), list(range(25, 0, -1))),
+        (lambda before: history.for_user("carol", 4, before), [i + 1 for i in range(24, -1, -3)]),
+        (lambda before: history.for_room("R0", 5, before), [i + 1 for i in range(24, -1, -2)]),
+        (lambda before: history.between(5.0, 20.0, 6, before), list(range(20, 5, -1))),
+    ]:
+        seen, before = [], None
+        while True:
+            page = query(before)
+            seen += ids(page)
+            before = page["next"]
+            if before is None:
+                break
+        assert seen == expected
+    asyncio.run(history.close())
+
+
+def test_excluded_users_are_listed_for_their_opponents_only(tmp_path):
+    history = history_of(tmp_path / "history.db", [(1.0, "R1", "alice", ROCK, BOT, PAPER)])
+    assert ids(history.for_user("alice")) == [1]
+    assert ids(history.for_user(BOT)) == []
+    asyncio.run(history.close())
+
+
+def test_export_streams_ndjson_and_csv_oldest_first(tmp_path):
+    history = history_of(tmp_path / "history.db", [
+        (1.0, "R1", "alice", ROCK, "bob", PAPER),
+        (2.0, "R2", "carol", SCISSORS, "dave", PAPER),
+        (3.0, "R1", "alice", SCISSORS, "bob", PAPER),
+    ])
+    exported = [json.loads(line) for line in "".join(history.export("ndjson")).splitlines()]
+    assert [match["id"] for match in exported] == [1, 2, 3]
+    rows = list(csv.DictReader(io.StringIO("".join(history.export("csv", user_id="alice", since=2.0)))))
+    assert [(row["id"], row["winner"]) for row in rows] == [("3", "alice")]
+    asyncio.run(history.close())
+
+
+def test_a_temporary_history_is_removed_on_close():
+    history = MatchHistory(None, CLASSIC.moves)
+    history.open()
+    path = history.path
+    history.add(1.0, "R1", "alice", "Alice", ROCK, "bob", "Bob", PAPER, CLASSIC.resolve(ROCK, PAPER))
+    asyncio.run(history.close())
+    assert history.path is None
+    assert not os.path.exists(path)
@@ -0,0 +1,129 @@
+import asyncio
+import uuid
+
+from membership import ROOMS_CHANNEL, ROOMS_SYNC_CHANNEL, MembershipCache
+from pubsub import LocalPubSub
+
+
+class FakeRoomService:
+    """Publishes room events and answers sync requests like room-service/room_events.py"""
+
+    def __init__(self, pubsub: LocalPubSub):
+        self.pubsub = pubsub
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.rooms: dict[str, list[str]] = {}
+        pubsub.subscribe(ROOMS_SYNC_CHANNEL, self._on_sync_request)
+
+    async def emit(self, kind: str, room_id: str, players: list[str] = (), delivered: bool = True):
+        if kind == "closed":
+            self.rooms.pop(room_id, None)
+        else:
+            self.rooms[room_id] = list(players)
+        self.seq += 1
+        if delivered:
+            await self.pubsub.publish(ROOMS_CHANNEL, {
+                "type": "events", "epoch": self.epoch, "seq": self.seq, "events": [[kind, room_id, list(players)]],
+            })
+
+    async def heartbeat(self):
+        await self.pubsub.publish(ROOMS_CHANNEL, {"type": "heartbeat", "epoch": self.epoch, "seq": self.seq})
+
+    def restart(self):
+        """A fresh process: new epoch, no rooms"""
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.rooms = {}
+
+    def _on_sync_request(self, message: dict):
+        rooms = [[room_id, list(players)] for room_id, players in self.rooms.items()]
+        asyncio.get_running_loop().create_task(self.pubsub.publish(ROOMS_CHANNEL, {
+            "type": "snapshot", "epoch": self.epoch, "seq": self.seq, "syncId": message["syncId"],
+            "part": 0, "parts": 1, "rooms": rooms,
+        }))
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def synced_cache(**callbacks) -> tuple[MembershipCache, FakeRoomService]:
+    pubsub = LocalPubSub()
+    rooms = FakeRoomService(pubsub)
+    await rooms.emit("created", "R1", ["alice"])
+    cache = MembershipCache(pubsub, **callbacks)
+    assert cache.is_member("R1", "alice") is None
+    await cache.start()
+    await settle()
+    assert cache.synced
+    return cache, rooms
+
+
+def test_events_after_the_snapshot_are_applied_in_order():
+    async def scenario():
+        cache, rooms = await synced_cache()
+        await rooms.emit("joined", "R1", ["alice", "bob"])
+        await rooms.emit("created", "R2", ["carol"])
+        await settle()
+        await cache.stop()
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.is_member("R1", "bob")
+    assert cache.is_member("R2", "carol")
+    assert not cache.is_member("R2", "alice")
+    assert cache.seq == 3
+    assert cache.resyncs == 1
+
+
+def test_a_gap_in_the_sequence_triggers_a_resync():
+    async def scenario():
+        cache, rooms = await synced_cache()
+        await rooms.emit("joined", "R1", ["alice", "bob"], delivered=False)
+        await rooms.emit("created", "R2", ["carol"])
+        await settle()
+        await cache.stop()
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.is_member("R1", "bob")
+    assert cache.is_member("R2", "carol")
+    assert cache.seq == 3
+    assert cache.resyncs == 2
+
+
+def test_a_heartbeat_ahead_of_the_cache_triggers_a_resync():
+    async def scenario():
+        cache, rooms = await synced_cache()
+        await rooms.emit("joined", "R1", ["alice", "bob"], delivered=False)
+        await rooms.heartbeat()
+        await settle()
+        await cache.stop()
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.is_member("R1", "bob")
+    assert cache.resyncs == 2
+
+
+def test_a_room_service_restart_resets_membership_to_the_new_epoch():
+    async def scenario():
+        closed, left = [], []
+        cache, rooms = await synced_cache(
+            on_closed=closed.append, on_left=lambda room_id, user_id: left.append((room_id, user_id)),
+        )
+        rooms.restart()
+        await rooms.emit("created", "R9", ["dave"])
+        await settle()
+        await cache.stop()
+        return cache, rooms, closed, left
+
+    cache, rooms, closed, left = asyncio.run(scenario())
+    assert cache.epoch == rooms.epoch
+    assert cache.seq == 1
+    assert cache.room_exists("R1") is False
+    assert cache.is_member("R9", "dave")
+    assert closed == ["R1"]
+    assert left == []
+    assert cache.resyncs == 2
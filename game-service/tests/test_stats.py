@@ -0,0 +1,59 @@
+import asyncio
+
+from journal import Journal
+from rules import CLASSIC, FIRST_WINS
+from stats import StatsEngine
+
+ROCK, PAPER, SCISSORS = range(3)
+
+
+def result_event(move1: int, move2: int) -> list:
+    return ["result", "u1", "alice", move1, "u2", "bob", move2]
+
+
+def durable_stats(directory) -> tuple[StatsEngine, Journal]:
+    stats = StatsEngine(CLASSIC.moves)
+
+    def apply(event: list):
+        _, user1, name1, move1, user2, name2, move2 = event
+        stats.record(user1, name1, move1, user2, name2, move2, CLASSIC.resolve(move1, move2))
+
+    return stats, Journal(str(directory), apply, lambda: {"stats": stats.dump()}, lambda s: stats.restore(s["stats"]))
+
+
+def record(stats: StatsEngine, journal: Journal, move1: int, move2: int):
+    journal.append(result_event(move1, move2))
+    stats.record("u1", "alice", move1, "u2", "bob", move2, CLASSIC.resolve(move1, move2))
+
+
+def test_a_move_recorded_while_a_snapshot_is_written_is_replayed_once(tmp_path):
+    stats, journal = durable_stats(tmp_path)
+    journal.open()
+    record(stats, journal, ROCK, SCISSORS)
+
+    persist = journal._persist_snapshot
+
+    def persist_while_playing(seq, state, previous):
+        # The snapshot is written off the event loop, which keeps recording results
+        record(stats, journal, PAPER, ROCK)
+        persist(seq, state, previous)
+
+    journal._persist_snapshot = persist_while_playing
+    asyncio.run(journal.write_snapshot())
+    # Flush without closing, which would write a fresh snapshot over the one under test
+    asyncio.run(journal.sync())
+    expected = stats.get("u1")
+
+    restored, journal = durable_stats(tmp_path)
+    journal.open()
+    asyncio.run(journal.close())
+    assert restored.get("u1") == expected
+    assert expected["moves"] == {"rock": 1, "paper": 1, "scissors": 0}
+
+
+def test_dump_does_not_share_state_with_the_engine():
+    stats = StatsEngine(CLASSIC.moves)
+    stats.record("u1", "alice", ROCK, "u2", "bob", SCISSORS, FIRST_WINS)
+    rows = stats.dump()
+    stats.record("u1", "alice", ROCK, "u2", "bob", SCISSORS, FIRST_WINS)
+    assert rows[0][7] == [1, 0, 0]
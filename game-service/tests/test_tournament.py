@@ -0,0 +1,54 @@
+import itertools
+import random
+
+import pytest
+
+from tournament import Tournament
+
+
+def play(tournament: Tournament, rng: random.Random) -> list[list]:
+    """Run the tournament to the end with random winners; the matches of every round"""
+    room_ids = itertools.count()
+    rounds = []
+    while not tournament.finished:
+        matches = tournament.start_round(lambda: f"R{next(room_ids)}")
+        rounds.append(matches)
+        for match in matches:
+            if match.player2 is not None:
+                tournament.report(match.room_id, rng.choice([match.player1, match.player2]))
+    return rounds
+
+
+@pytest.mark.parametrize("players", range(2, 34))
+def test_swiss_never_repeats_an_opponent_and_gives_at_most_one_bye(players):
+    for seed in range(20):
+        tournament = Tournament("T", [f"p{i}" for i in range(players)], "swiss")
+        met = set()
+        for matches in play(tournament, random.Random(seed)):
+            seated = [user_id for match in matches for user_id in (match.player1, match.player2) if user_id]
+            assert sorted(seated) == sorted(tournament.players)
+            assert sum(match.player2 is None for match in matches) == players % 2
+            for match in matches:
+                if match.player2 is not None:
+                    pair = frozenset((match.player1, match.player2))
+                    assert pair not in met, f"rematch {sorted(pair)} with seed {seed}"
+                    met.add(pair)
+        assert max(tournament.byes.values()) <= 1
+
+
+def test_swiss_backtracks_when_the_nearest_pairing_would_force_a_rematch():
+    # Five players over three rounds: pairing greedily by score can leave the
+    # last two players with only each other, whom they have already met
+    for seed in range(200):
+        tournament = Tournament("T", ["a", "b", "c", "d", "e"], "swiss")
+        play(tournament, random.Random(seed))
+        games = [games for opponents in tournament.opponents.values() for games in opponents.values()]
+        assert max(games) == 1
+
+
+def test_bracket_gives_byes_to_the_top_seeds_and_crowns_one_champion():
+    tournament = Tournament("T", [f"p{i}" for i in range(6)], "bracket")
+    first_round = play(tournament, random.Random(1))[0]
+    assert {match.player1 for match in first_round if match.player2 is None} == {"p0", "p1"}
+    assert tournament.champion == tournament.standings()[0]["userId"]
+    assert sum(tournament.losses.values()) == 5
@@ -0,0 +1,113 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TimerQueue:
+    """One-shot timers for every room, kept in one heap and fired by one task.
+
+    Timers are keyed (usually by room ID): scheduling a key that already has
+    a timer replaces it, and `cancel()` drops it. Replaced and cancelled
+    timers are left in the heap and skipped when they come due, so both are
+    O(log n) and nothing ever scans the heap. A single background task wakes
+    every `resolution` seconds and fires whatever is due, so thousands of
+    pending timers cost one task rather than one sleeping task each.
+
+    Callbacks may be plain functions or coroutine functions; coroutines are
+    awaited in turn by the timer task.
+    """
+
+    def __init__(self, name: str, resolution: float = 0.05):
+        self.name = name
+        self.resolution = resolution
+        self._timers: dict[str, tuple[float, int, Callable, tuple]] = {}  # key -> live timer
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self.fired_total = 0
+        self.last_fire_count = 0
+        self.last_fire_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._timers
+
+    def schedule(self, key: str, delay: float, callback: Callable, *args: Any, now: Optional[float] = None):
+        """Call `callback(*args)` `delay` seconds from now, replacing any timer for `key`"""
+        deadline = (time.monotonic() if now is None else now) + delay
+        seq = next(self._seq)
+        self._timers[key] = (deadline, seq, callback, args)
+        heapq.heappush(self._heap, (deadline, seq, key))
+
+    def cancel(self, key: str) -> bool:
+        return self._timers.pop(key, None) is not None
+
+    def deadline(self, key: str) -> Optional[float]:
+        timer = self._timers.get(key)
+        return timer[0] if timer is not None else None
+
+    async def fire(self, now: Optional[float] = None) -> int:
+        """Run every timer that is due; returns how many ran"""
+        now = time.monotonic() if now is None else now
+        started = time.perf_counter()
+        fired = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            timer = self._timers.get(key)
+            if timer is None or timer[1] != seq:
+                continue  # cancelled or replaced
+            del self._timers[key]
+            fired += 1
+            try:
+                result = timer[2](*timer[3])
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in {self.name} timer for {key}: {e!r}")
+        # Stale entries would otherwise pile up when timers are mostly replaced
+        if len(heap) > 2 * len(self._timers) + 1024:
+            self._heap = [(deadline, seq, key) for key, (deadline, seq, _, _) in self._timers.items()]
+            heapq.heapify(self._heap)
+        self.fired_total += fired
+        self.last_fire_count = fired
+        self.last_fire_seconds = time.perf_counter() - started
+        return fired
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.resolution)
+            try:
+                await self.fire()
+            except Exception as e:
+                logger.error(f"Error while firing {self.name} timers: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._timers),
+            "heap_entries": len(self._heap),
+            "fired_total": self.fired_total,
+            "last_fire_count": self.last_fire_count,
+            "last_fire_ms": round(self.last_fire_seconds * 1000, 3),
+        }
@@ -0,0 +1,246 @@
+import math
+from collections import Counter
+from typing import Callable, Optional, Sequence
+
+from series import SERIES_LENGTHS
+
+FORMATS = ("bracket", "swiss")
+
+
+class Match:
+    __slots__ = ("room_id", "player1", "player2", "winner")
+
+    def __init__(self, room_id: Optional[str], player1: str, player2: Optional[str]):
+        self.room_id = room_id
+        self.player1 = player1
+        self.player2 = player2  # None: player1 has a bye
+        self.winner: Optional[str] = player1 if player2 is None else None
+
+    def snapshot(self) -> dict:
+        return {"roomId": self.room_id, "players": [self.player1, self.player2], "winner": self.winner}
+
+
+def bracket_order(size: int) -> list[int]:
+    """Seed numbers in bracket position order, so that seeds 1 and 2 can only meet in the final"""
+    order = [1]
+    while len(order) < size:
+        total = 2 * len(order) + 1
+        order = [seed for s in order for seed in (s, total - s)]
+    return order
+
+
+class Tournament:
+    """Pairs players into best-of-N series, one round at a time.
+
+    `bracket` is single elimination: players are seeded in the order given,
+    the bracket is padded to a power of two with byes for the top seeds, and
+    winners meet their neighbours in the next round. `swiss` plays a fixed
+    number of rounds (default log2 of the field); each round pairs players
+    with similar scores who have not met yet, and an odd player out gets a
+    bye worth one win. Swiss ties are broken by the total score of the
+    player's opponents.
+
+    The tournament only keeps scores and pairings: the caller gives every
+    match a room via `start_round()`, runs the series there, and reports
+    the winner with `report()`, which is O(1). `start_round()` sorts a Swiss
+    field once, then looks for each player's partner among the next few
+    players, skipping at most the opponents they already met, so a round
+    with thousands of matches costs O(n log n) rather than O(n^2). Only
+    when that greedy pass would force a rematch does a bounded backtracking
+    search look for a pairing without one.
+    """
+
+    def __init__(self, tournament_id: str, players: Sequence[str], fmt: str = "bracket", best_of: int = 3,
+                 rounds: Optional[int] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if best_of not in SERIES_LENGTHS:
+            raise ValueError(f"bestOf must be one of {', '.join(map(str, SERIES_LENGTHS))}")
+        if len(players) < 2 or len(set(players)) != len(players):
+            raise ValueError("A tournament needs at least two distinct players")
+        self.id = tournament_id
+        self.format = fmt
+        self.best_of = best_of
+        self.players = list(players)
+        self.seeds = {user_id: index for index, user_id in enumerate(self.players)}
+        self.total_rounds = math.ceil(math.log2(len(self.players)))
+        if fmt == "swiss" and rounds is not None:
+            self.total_rounds = max(1, min(rounds, len(self.players) - 1))
+        self.round = 0
+        self.wins = dict.fromkeys(self.players, 0)
+        self.losses = dict.fromkeys(self.players, 0)
+        self.byes = dict.fromkeys(self.players, 0)
+        # Games played against each opponent; a rematch counts twice in the tie-break
+        self.opponents: dict[str, Counter] = {user_id: Counter() for user_id in self.players}
+        self.matches: list[Match] = []
+        self.pending = 0  # matches of the current round still being played
+        self._by_room: dict[str, Match] = {}
+        # Bracket slots for the next round, in bracket position order (None: bye).
+        # Swiss rounds are not tied to the field size, so it has none
+        self._slots: list[Optional[str]] = []
+        if fmt == "bracket":
+            size = 1 << self.total_rounds
+            self._slots = [
+                self.players[seed - 1] if seed <= len(self.players) else None for seed in bracket_order(size)
+            ]
+
+    @property
+    def finished(self) -> bool:
+        return self.round >= self.total_rounds and self.pending == 0
+
+    @property
+    def round_finished(self) -> bool:
+        return self.pending == 0
+
+    @property
+    def champion(self) -> Optional[str]:
+        return self.standings()[0]["userId"] if self.finished else None
+
+    def match_for(self, room_id: str) -> Optional[Match]:
+        return self._by_room.get(room_id)
+
+    def start_round(self, new_room_id: Callable[[], str]) -> list[Match]:
+        """Pair the next round; every match that is not a bye gets a room from `new_room_id`"""
+        if self.finished or not self.round_finished:
+            raise ValueError("The current round is not finished")
+        self.round += 1
+        pairs = self._bracket_pairs() if self.format == "bracket" else self._swiss_pairs()
+        self._by_room.clear()
+        self.matches = []
+        for player1, player2 in pairs:
+            if player1 is None:
+                player1, player2 = player2, None
+            match = Match(new_room_id() if player2 is not None else None, player1, player2)
+            self.matches.append(match)
+            if player2 is None:
+                self.wins[player1] += 1
+                self.byes[player1] += 1
+            else:
+                self._by_room[match.room_id] = match
+                self.opponents[player1][player2] += 1
+                self.opponents[player2][player1] += 1
+        self.pending = len(self._by_room)
+        return self.matches
+
+    def _bracket_pairs(self) -> list[tuple]:
+        slots = self._slots
+        # The bracket is less than twice the field, so no pair is two byes
+        return [(slots[i], slots[i + 1]) for i in range(0, len(slots), 2)]
+
+    def _swiss_pairs(self) -> list[tuple]:
+        order = sorted(self.players, key=lambda user_id: (-self.wins[user_id], self.seeds[user_id]))
+        pairs = []
+        if len(order) % 2:
+            # The lowest-placed player who has not had a bye sits this round out
+            bye = next(
+                (user_id for user_id in reversed(order) if not self.byes[user_id]),
+                order[-1],
+            )
+            order.remove(bye)
+            pairs.append((bye, None))
+        greedy = self._greedy_pairs(order)
+        if any(player2 in self.opponents[player1] for player1, player2 in greedy):
+            pairs += self._pairs_without_rematches(order, budget=1000 + 20 * len(order)) or greedy
+        else:
+            pairs += greedy
+        return pairs
+
+    def _greedy_pairs(self, order: list[str]) -> list[tuple]:
+        pairs = []
+        paired = [False] * len(order)
+        for index, player in enumerate(order):
+            if paired[index]:
+                continue
+            played = self.opponents[player]
+            # Nearest score first; a rematch only when nobody else is left
+            first = partner = None
+            for other in range(index + 1, len(order)):
+                if paired[other]:
+                    continue
+                if first is None:
+                    first = other
+                if order[other] not in played:
+                    partner = other
+                    break
+            partner = first if partner is None else partner
+            paired[partner] = True
+            pairs.append((player, order[partner]))
+        return pairs
+
+    def _pairs_without_rematches(self, order: list[str], budget: int) -> Optional[list[tuple]]:
+        """Depth-first search for a pairing with no rematch, nearest score first; None
+        if there is none, or none was found within `budget` steps"""
+        paired = [False] * len(order)
+        chosen: list[tuple[int, int]] = []
+        index, start = 0, None
+        for _ in range(budget):
+            while index < len(order) and paired[index]:
+                index += 1
+            if index == len(order):
+                return [(order[a], order[b]) for a, b in chosen]
+            if start is None:
+                start = index + 1
+            played = self.opponents[order[index]]
+            partner = next(
+                (other for other in range(start, len(order)) if not paired[other] and order[other] not in played),
+                None,
+            )
+            if partner is not None:
+                paired[index] = paired[partner] = True
+                chosen.append((index, partner))
+                index, start = index + 1, None
+            elif chosen:
+                # Dead end: give the previous player their next candidate
+                index, partner = chosen.pop()
+                paired[index] = paired[partner] = False
+                start = partner + 1
+            else:
+                return None
+        return None
+
+    def report(self, room_id: str, winner: str) -> bool:
+        """Record the winner of a match's series; True once the round is complete"""
+        match = self._by_room.get(room_id)
+        if match is None or match.winner is not None or winner not in (match.player1, match.player2):
+            return False
+        match.winner = winner
+        loser = match.player2 if winner == match.player1 else match.player1
+        self.wins[winner] += 1
+        self.losses[loser] += 1
+        self.pending -= 1
+        if self.pending == 0 and self.format == "bracket":
+            # Matches were created in slot order, so their winners already are
+            self._slots = [m.winner for m in self.matches]
+        return self.pending == 0
+
+    def standings(self) -> list[dict]:
+        def buchholz(user_id: str) -> int:
+            return sum(self.wins[opponent] * games for opponent, games in self.opponents[user_id].items())
+
+        if self.format == "bracket":
+            key = lambda user_id: (-self.wins[user_id], self.losses[user_id], self.seeds[user_id])
+        else:
+            key = lambda user_id: (-self.wins[user_id], -buchholz(user_id), self.seeds[user_id])
+        return [
+            {
+                "rank": rank,
+                "userId": user_id,
+                "wins": self.wins[user_id],
+                "losses": self.losses[user_id],
+                "byes": self.byes[user_id],
+            }
+            for rank, user_id in enumerate(sorted(self.players, key=key), start=1)
+        ]
+
+    def snapshot(self) -> dict:
+        return {
+            "tournamentId": self.id,
+            "format": self.format,
+            "bestOf": self.best_of,
+            "round": self.round,
+            "rounds": self.total_rounds,
+            "finished": self.finished,
+            "champion": self.champion,
+            "matches": [match.snapshot() for match in self.matches],
+            "standings": self.standings(),
+        }
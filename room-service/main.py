@@ -1,13 +1,31 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware  # ADD THIS at top
+from fastapi.responses import Response
 from pydantic import BaseModel
-import random
-import string 
+from typing import Optional
+import asyncio
+import time
 import uuid
-import requests
-import json
+import os
+import sys
 import logging
 
+# Modules shared between the services live in the repository's shared/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+
+from codec import JSON, Codec, DecodeError, Frame, accept, receive_frame, send
+from expiry import IdleReaper
+from journal import Journal
+from matchmaking import Matchmaker, Ticket
+from metrics import CONTENT_TYPE, LoopLagMonitor, MetricsRegistry, RequestMetrics
+from outbound import OutboundQueue, OutboundStats, Spectator, SpectatorFeed
+from pubsub import create_pubsub
+from room_events import RoomEventPublisher
+from room_ids import RoomIdAllocator, is_valid_room_id, normalize_room_id
+from state import Room
+from tracing import TRACEPARENT, TraceRequests, Tracer
+from user_client import UsernameResolver
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,7 +41,54 @@ app.add_middleware(
 )
 
 USER_SERVICE_URL = "http://localhost:8000"
-rooms = {}  
+# Seconds without activity before a room is dropped, and the shorter
+# grace period once its last player has disconnected
+ROOM_IDLE_TTL = float(os.environ.get("ROOM_IDLE_TTL", 3600))
+ROOM_ABANDONED_TTL = float(os.environ.get("ROOM_ABANDONED_TTL", 300))
+# Directory for the event log and snapshots; durable mode is off when unset
+ROOM_DATA_DIR = os.environ.get("ROOM_DATA_DIR")
+# Pub/sub backend that room lifecycle events are published on; point it at
+# the same broker as GAME_PUBSUB_URL so Game Service can check membership
+ROOM_PUBSUB_URL = os.environ.get("ROOM_PUBSUB_URL", "memory://")
+# Matchmaking: skill gap accepted at once and how fast it widens per second
+# of waiting, and how long a match is kept for a player who has not read it
+MATCH_SKILL_WINDOW = float(os.environ.get("MATCH_SKILL_WINDOW", 100))
+MATCH_WIDEN_PER_SECOND = float(os.environ.get("MATCH_WIDEN_PER_SECOND", 25))
+MATCH_RESULT_TTL = 60.0
+LONG_POLL_MAX_WAIT = 30.0  # seconds a /matchmaking/status request may be held open
+# Tracing: the share of traces recorded, and the span collector they are
+# sent to (start one with `python shared/tracing.py collect`). Without a
+# collector nothing is recorded, but trace IDs are still passed on for
+# correlation.
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL")
+# Client message types timed by name in /metrics; anything else counts as "other"
+ROOM_MESSAGE_TYPES = frozenset({"chat", "room_status"})
+rooms: dict[str, Room] = {}
+
+# Served on /metrics. Gauges read counts that are kept up to date as state
+# changes, so a scrape never scans the rooms.
+metrics = MetricsRegistry()
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP requests served, by route", ("method", "route", "status"),
+)
+websocket_message_seconds = metrics.histogram(
+    "websocket_message_duration_seconds", "Time to handle one message from a player's socket, by type", ("type",),
+)
+broadcast_seconds = metrics.histogram(
+    "broadcast_duration_seconds", "Time to fan one event out to a room's sockets and spectators, by type", ("type",),
+)
+user_service_seconds = metrics.histogram(
+    "user_service_request_duration_seconds", "Calls to User Service, by endpoint and outcome", ("endpoint", "outcome"),
+)
+metrics.gauge("rooms", "Open rooms", read=lambda: len(rooms))
+metrics.gauge("room_players", "Players seated in open rooms", read=lambda: Room.seated)
+metrics.gauge("spectated_rooms", "Rooms with spectators", read=lambda: len(manager.spectator_feeds))
+metrics.gauge("matchmaking_queued", "Players waiting for a match", read=lambda: len(matchmaker))
+loop_lag = LoopLagMonitor(metrics)
+app.add_middleware(RequestMetrics, histogram=http_request_seconds)
+tracer = Tracer("room-service", TRACE_SAMPLE_RATE, TRACE_COLLECTOR_URL)
+app.add_middleware(TraceRequests, tracer=tracer)
 class CreateRoomRequest(BaseModel):
     userId: str
     roomName: str
@@ -32,177 +97,479 @@ class JoinRoomRequest(BaseModel):
     roomId: str
     userId: str
 
+class LeaveRoomRequest(BaseModel):
+    roomId: str
+    userId: str
+
+class MatchmakingRequest(BaseModel):
+    userId: str
+    skill: Optional[float] = None
+    region: Optional[str] = None
+
 class ConnectionManager:
     def __init__(self):
-        self.room_connections: dict[str, dict[str, WebSocket]] = {}
+        self.room_connections: dict[str, dict[str, OutboundQueue]] = {}
+        self.spectator_feeds: dict[str, SpectatorFeed] = {}
+        self.outbound_stats = OutboundStats()
 
-    async def connect(self, websocket: WebSocket, room_id: str, user_id: str):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, room_id: str, user_id: str) -> Codec:
+        codec = await accept(websocket)
         if room_id not in self.room_connections:
             self.room_connections[room_id] = {}
-        self.room_connections[room_id][user_id] = websocket
-        logger.info(f"User {user_id} connected to room {room_id} via WebSocket")
+        previous = self.room_connections[room_id].get(user_id)
+        self.room_connections[room_id][user_id] = OutboundQueue(
+            websocket,
+            self.outbound_stats,
+            on_close=lambda: self.disconnect(room_id, user_id, websocket),
+            codec=codec,
+        )
+        if previous is not None:
+            previous.close()
+        logger.info(f"User {user_id} connected to room {room_id} via WebSocket ({codec.name})")
+        return codec
 
-    def disconnect(self, room_id: str, user_id: str):
+    def disconnect(self, room_id: str, user_id: str, websocket: WebSocket = None):
         if room_id in self.room_connections and user_id in self.room_connections[room_id]:
+            connection = self.room_connections[room_id][user_id]
+            # A stale socket may close after its user reconnected; keep the newer one
+            if websocket is not None and connection.websocket is not websocket:
+                return
             del self.room_connections[room_id][user_id]
             if not self.room_connections[room_id]:  # Remove empty room
                 del self.room_connections[room_id]
+            connection.close()
             logger.info(f"User {user_id} disconnected from room {room_id}")
 
+    def close_user(self, room_id: str, user_id: str, code: int, reason: str):
+        """Close the user's socket in the room, e.g. once they have left it"""
+        connection = self.room_connections.get(room_id, {}).get(user_id)
+        if connection is not None:
+            connection.close(code, reason)
+
+    def close_room(self, room_id: str):
+        """The room is gone; disconnect its players and spectators"""
+        for connection in list(self.room_connections.get(room_id, {}).values()):
+            connection.close(4004, "Room closed")
+        self.close_spectators(room_id)
+
+    def spectate(self, websocket: WebSocket, room_id: str, codec: Codec = JSON) -> Spectator:
+        """Follow the room's spectator feed on an accepted socket"""
+        feed = self.spectator_feeds.get(room_id)
+        if feed is None:
+            feed = self.spectator_feeds[room_id] = SpectatorFeed(self.outbound_stats)
+        return Spectator(websocket, feed, on_close=lambda: self.stop_spectating(room_id), codec=codec)
+
+    def stop_spectating(self, room_id: str):
+        feed = self.spectator_feeds.get(room_id)
+        if feed is not None and not feed.spectators:
+            del self.spectator_feeds[room_id]
+            feed.close()
+
+    def close_spectators(self, room_id: str):
+        """The room is gone; disconnect whoever was watching it"""
+        feed = self.spectator_feeds.get(room_id)
+        if feed is not None:
+            feed.close(4004, "Room closed")
+
     async def broadcast_to_room(self, message: dict, room_id: str, exclude_user: str = None):
-        if room_id in self.room_connections:
-            for user_id, websocket in self.room_connections[room_id].items():
-                if exclude_user and user_id == exclude_user:
-                    continue
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error sending message to user {user_id} in room {room_id}: {e}")
-                    self.disconnect(room_id, user_id)
+        connections = self.room_connections.get(room_id)
+        feed = self.spectator_feeds.get(room_id)
+        if connections is None and feed is None:
+            return
+        started = time.perf_counter()
+        kind = message.get("type")
+        with tracer.span(f"broadcast {kind}"):
+            trace_id = tracer.trace_id()
+            if trace_id is not None:
+                message = {**message, "traceId": trace_id}
+            # Encode once per codec in use; each connection's writer task does
+            # the actual send, and spectators share the same frame
+            frame = Frame(message)
+            for user_id, connection in list((connections or {}).items()):
+                if user_id != exclude_user:
+                    connection.put(frame.encode(connection.codec), kind)
+            if feed is not None:
+                feed.publish(frame)
+        broadcast_seconds.observe(time.perf_counter() - started, kind)
 
     async def send_to_user_in_room(self, message: dict, room_id: str, user_id: str):
         if room_id in self.room_connections and user_id in self.room_connections[room_id]:
-            try:
-                await self.room_connections[room_id][user_id].send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending message to user {user_id} in room {room_id}: {e}")
-                self.disconnect(room_id, user_id)
+            trace_id = tracer.trace_id()
+            if trace_id is not None:
+                message = {**message, "traceId": trace_id}
+            connection = self.room_connections[room_id][user_id]
+            connection.put(connection.codec.encode(message), message.get("type"))
 
 manager = ConnectionManager()
+manager.outbound_stats.export(metrics)
+
+room_ids = RoomIdAllocator()
 
 def generate_room_id():
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+    room_id = room_ids.allocate()
+    # Codes never repeat within a process and restored rooms are skipped;
+    # this only guards against codes from an older allocation scheme
+    while room_id in rooms:
+        room_id = room_ids.allocate()
+    return room_id
+
+username_resolver = UsernameResolver(USER_SERVICE_URL, request_seconds=user_service_seconds, tracer=tracer)
 
-def get_username(user_id: str) -> str:
+async def get_username(user_id: str) -> str:
     """Get username from User Service"""
-    try:
-        response = requests.get(f"{USER_SERVICE_URL}/users/{user_id}")
-        if response.status_code == 200:
-            return response.json()["username"]
-    except Exception as e:
-        logger.error(f"Error fetching username for {user_id}: {e}")
-    return f"User-{user_id[:8]}"
+    return await username_resolver.get_username(user_id)
+
+def expire_room(room_id: str) -> bool:
+    """Drop an idle room unless players are still connected to it"""
+    if room_id in manager.room_connections:
+        return False
+    room = rooms.pop(room_id, None)
+    if room is not None:
+        room.close()
+        room_events.emit("closed", room_id)
+    manager.close_spectators(room_id)
+    journal.append(["expire", room_id])
+    return True
+
+room_reaper = IdleReaper("rooms", ROOM_IDLE_TTL, expire_room)
+
+def apply_room_event(event: list):
+    """Replay one journal event: create, join or expire"""
+    kind, room_id = event[0], event[1]
+    if kind == "create":
+        rooms[room_id] = Room(event[2], event[3])
+        room_ids.skip_past([room_id])
+        room_reaper.touch(room_id)
+    elif kind == "join" and room_id in rooms:
+        rooms[room_id].add_player(event[2])
+    elif kind == "leave" and room_id in rooms:
+        rooms[room_id].remove_player(event[2])
+    elif kind == "expire":
+        room = rooms.pop(room_id, None)
+        if room is not None:
+            room.close()
+        room_reaper.forget(room_id)
+
+def snapshot_rooms() -> list:
+    return [[room_id, room.name, room.created_by, list(room.players)] for room_id, room in rooms.items()]
+
+def restore_rooms(snapshot: list):
+    for room_id, name, created_by, players in snapshot:
+        room = rooms[room_id] = Room(name, created_by)
+        room.set_players(players)
+        room_reaper.touch(room_id)
+    room_ids.skip_past(rooms)
+
+journal = Journal(ROOM_DATA_DIR, apply_room_event, snapshot_rooms, restore_rooms)
+
+pubsub = create_pubsub(ROOM_PUBSUB_URL)
+room_events = RoomEventPublisher(pubsub, lambda: ((room_id, room.players) for room_id, room in rooms.items()))
+
+matches: dict[str, dict] = {}  # userId -> match not yet delivered to that player
+match_waiters: dict[str, asyncio.Event] = {}  # userId -> set when their match is ready
+
+def create_match(first: Ticket, second: Ticket):
+    """Put two paired players into a fresh room and tell both of them"""
+    room_id = generate_room_id()
+    room = rooms[room_id] = Room("Match", first.user_id)
+    room.add_player(second.user_id)
+    room_reaper.touch(room_id)
+    journal.append(["create", room_id, room.name, first.user_id])
+    journal.append(["join", room_id, second.user_id])
+    room_events.emit("created", room_id, room.players)
+    logger.info(f"Matched {first.user_id} with {second.user_id} in room {room_id}")
+
+    for player, opponent in ((first, second), (second, first)):
+        matches[player.user_id] = {
+            "status": "matched",
+            "roomId": room_id,
+            "roomName": room.name,
+            "players": room.players,
+            "opponent": opponent.user_id,
+        }
+        match_reaper.touch(player.user_id)
+        waiter = match_waiters.pop(player.user_id, None)
+        if waiter is not None:
+            waiter.set()
+
+def expire_match(user_id: str) -> bool:
+    matches.pop(user_id, None)
+    return True
+
+matchmaker = Matchmaker(create_match, MATCH_SKILL_WINDOW, MATCH_WIDEN_PER_SECOND)
+match_reaper = IdleReaper("matches", MATCH_RESULT_TTL, expire_match)
+
+def start_matchmaking(user_id: str, skill: Optional[float], region: Optional[str]) -> Optional[dict]:
+    """Queue a player; returns their match if they were paired at once"""
+    matches.pop(user_id, None)
+    if matchmaker.enqueue(user_id, skill, region):
+        match_reaper.forget(user_id)
+        return matches.pop(user_id)
+    return None
+
+@app.on_event("startup")
+async def startup():
+    journal.open()
+    journal.start()
+    room_reaper.start()
+    loop_lag.start()
+    matchmaker.start()
+    match_reaper.start()
+    await pubsub.start()
+    await room_events.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await match_reaper.stop()
+    await matchmaker.stop()
+    await room_events.stop()
+    await pubsub.close()
+    await room_reaper.stop()
+    await loop_lag.stop()
+    await journal.close()
+    await username_resolver.close()
+    tracer.close()
 
 @app.post("/create-room")
-def create_room(req: dict):
+async def create_room(req: dict):
     """Create a new game room"""
     user_id = req["userId"]
     room_name = req.get("roomName", "Room")
     room_id = generate_room_id()
     
-    rooms[room_id] = {
-        "roomName": room_name, 
-        "players": [user_id],
-        "created_by": user_id
-    }
+    rooms[room_id] = Room(room_name, user_id)
+    room_reaper.touch(room_id)
+    journal.append(["create", room_id, room_name, user_id])
+    room_events.emit("created", room_id, rooms[room_id].players)
     
     logger.info(f"Room {room_id} created by user {user_id}")
     return {
         "roomId": room_id, 
         "roomName": room_name, 
-        "players": rooms[room_id]["players"]
+        "players": rooms[room_id].players
     }
 
 @app.post("/join-room")
-def join_room(req: dict):
+async def join_room(req: dict):
     """Join an existing game room"""
-    room_id = req["roomId"]
+    room_id = normalize_room_id(req["roomId"])
     user_id = req["userId"]
     
-    if room_id not in rooms:
+    if not is_valid_room_id(room_id) or room_id not in rooms:
         raise HTTPException(status_code=404, detail="Room not found")
     
     # Only 2 players allowed
-    if len(rooms[room_id]["players"]) >= 2:
+    if len(rooms[room_id].players) >= 2:
         raise HTTPException(status_code=400, detail="Room is full")
     
     # Add player if not already in room
-    if user_id not in rooms[room_id]["players"]:
-        rooms[room_id]["players"].append(user_id)
+    if user_id not in rooms[room_id].players:
+        rooms[room_id].add_player(user_id)
+        journal.append(["join", room_id, user_id])
+        room_events.emit("joined", room_id, rooms[room_id].players)
         logger.info(f"User {user_id} joined room {room_id}")
+    room_reaper.touch(room_id)
     
     return {
         "roomId": room_id,
-        "roomName": rooms[room_id]["roomName"],
-        "players": rooms[room_id]["players"]
+        "roomName": rooms[room_id].name,
+        "players": rooms[room_id].players
     }
 
+@app.post("/leave-room")
+async def leave_room(req: LeaveRoomRequest):
+    """Leave a room; the room is closed when its last player leaves"""
+    room_id = normalize_room_id(req.roomId)
+    room = rooms.get(room_id)
+    if room is None or req.userId not in room.players:
+        raise HTTPException(status_code=404, detail="User not in room")
+
+    room.remove_player(req.userId)
+    journal.append(["leave", room_id, req.userId])
+    logger.info(f"User {req.userId} left room {room_id}")
+    if not room.players:
+        del rooms[room_id]
+        room_reaper.forget(room_id)
+        journal.append(["expire", room_id])
+        room_events.emit("closed", room_id)
+        manager.close_room(room_id)
+        return {"roomId": room_id, "players": [], "closed": True}
+
+    manager.close_user(room_id, req.userId, 4003, "User left the room")
+    room_events.emit("left", room_id, room.players)
+    room_reaper.touch(room_id)
+    await manager.broadcast_to_room({
+        "type": "user_left",
+        "message": f"{await get_username(req.userId)} left the room",
+        "userId": req.userId,
+        "roomId": room_id,
+        "players": room.players
+    }, room_id)
+    return {"roomId": room_id, "players": room.players, "closed": False}
+
+@app.post("/matchmaking/enqueue")
+async def enqueue_for_match(req: MatchmakingRequest):
+    """Queue for an automatic opponent; answers with the match if one is waiting"""
+    match = start_matchmaking(req.userId, req.skill, req.region)
+    if match is not None:
+        return match
+    return {"status": "queued", "queued": len(matchmaker)}
+
+@app.get("/matchmaking/status/{user_id}")
+async def matchmaking_status(user_id: str, wait: float = Query(0, ge=0, le=LONG_POLL_MAX_WAIT)):
+    """The player's match once paired; with `wait`, held open until then"""
+    if user_id not in matches and user_id in matchmaker and wait:
+        waiter = match_waiters.setdefault(user_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+    if user_id in matches:
+        match_reaper.forget(user_id)
+        return matches.pop(user_id)
+    if user_id in matchmaker:
+        return {"status": "queued", "queued": len(matchmaker)}
+    raise HTTPException(status_code=404, detail="Not in the matchmaking queue")
+
+@app.delete("/matchmaking/{user_id}")
+async def cancel_matchmaking(user_id: str):
+    """Leave the matchmaking queue"""
+    if not matchmaker.cancel(user_id):
+        raise HTTPException(status_code=404, detail="Not in the matchmaking queue")
+    waiter = match_waiters.pop(user_id, None)
+    if waiter is not None:
+        waiter.set()
+    return {"status": "cancelled"}
+
+@app.websocket("/matchmaking/ws/{user_id}")
+async def matchmaking_websocket(
+    websocket: WebSocket, user_id: str, skill: Optional[float] = None, region: Optional[str] = None
+):
+    """Queue while the socket is open; sends `match_found` and closes once paired"""
+    codec = await accept(websocket)
+    match = start_matchmaking(user_id, skill, region)
+    if match is None:
+        await send(websocket, codec, {"type": "queued", "queued": len(matchmaker)})
+        waiter = match_waiters.setdefault(user_id, asyncio.Event())
+        matched = asyncio.create_task(waiter.wait())
+        # Any message from the client, or a disconnect, leaves the queue
+        received = asyncio.create_task(receive_frame(websocket))
+        done, _ = await asyncio.wait([matched, received], return_when=asyncio.FIRST_COMPLETED)
+        disconnected = received in done and isinstance(received.exception(), WebSocketDisconnect)
+        matched.cancel()
+        received.cancel()
+        match_reaper.forget(user_id)
+        match = matches.pop(user_id, None)
+        if match is None:
+            matchmaker.cancel(user_id)
+            match_waiters.pop(user_id, None)
+            if disconnected:
+                return
+            await send(websocket, codec, {"type": "cancelled"})
+            await websocket.close()
+            return
+    await send(websocket, codec, {"type": "match_found", **match})
+    await websocket.close()
+
 @app.get("/rooms/{roomId}/players")
 def get_room_status(roomId: str):
     """Get room status and player list"""
+    roomId = normalize_room_id(roomId)
     if roomId not in rooms:
         raise HTTPException(status_code=404, detail="Room not found")
-    return rooms[roomId]
+    return rooms[roomId].to_dict()
 
 @app.get("/rooms")
 def get_all_rooms():
     """Get all available rooms"""
-    return {"rooms": rooms}
+    return {"rooms": {room_id: room.to_dict() for room_id, room in rooms.items()}}
 
 @app.websocket("/ws/{room_id}/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str, user_id: str):
     """WebSocket endpoint for room communication"""
+    room_id = normalize_room_id(room_id)
     # Verify room exists
     if room_id not in rooms:
         await websocket.close(code=4004, reason="Room not found")
         return
     
     # Verify user is in room
-    if user_id not in rooms[room_id]["players"]:
+    if user_id not in rooms[room_id].players:
         await websocket.close(code=4003, reason="User not in room")
         return
     
-    await manager.connect(websocket, room_id, user_id)
-    username = get_username(user_id)
-    
-    # Notify room that user connected
-    await manager.broadcast_to_room({
-        "type": "user_connected",
-        "message": f"{username} connected to room",
-        "userId": user_id,
-        "username": username,
-        "roomId": room_id,
-        "players": rooms[room_id]["players"]
-    }, room_id)
+    with tracer.start_trace("ws connect", websocket.headers.get(TRACEPARENT), room=room_id, user=user_id):
+        codec = await manager.connect(websocket, room_id, user_id)
+        username = await get_username(user_id)
+
+        # Notify room that user connected
+        await manager.broadcast_to_room({
+            "type": "user_connected",
+            "message": f"{username} connected to room",
+            "userId": user_id,
+            "username": username,
+            "roomId": room_id,
+            "players": rooms[room_id].players
+        }, room_id)
     
     try:
         while True:
             # Listen for messages from client
-            data = await websocket.receive_text()
+            data = await receive_frame(websocket)
+            started = time.perf_counter()
+            kind = "invalid"
+            room_reaper.touch(room_id)
             try:
-                message = json.loads(data)
+                message = codec.decode(data)
+                kind = message.get("type") if message.get("type") in ROOM_MESSAGE_TYPES else "other"
                 logger.info(f"Received message in room {room_id} from user {user_id}: {message}")
                 
-                # Handle different message types
-                if message.get("type") == "chat":
-                    # Broadcast chat message to room
-                    await manager.broadcast_to_room({
-                        "type": "chat_message",
-                        "message": message.get("content", ""),
-                        "userId": user_id,
-                        "username": username,
-                        "roomId": room_id
-                    }, room_id)
-                
-                elif message.get("type") == "room_status":
-                    # Send room status to requesting user
-                    await manager.send_to_user_in_room({
-                        "type": "room_status",
-                        "roomId": room_id,
-                        "roomName": rooms[room_id]["roomName"],
-                        "players": rooms[room_id]["players"],
-                        "player_count": len(rooms[room_id]["players"])
-                    }, room_id, user_id)
+                with tracer.start_trace(f"ws {kind}", message.get(TRACEPARENT), room=room_id, user=user_id):
+                    # Handle different message types
+                    if message.get("type") == "chat":
+                        # Broadcast chat message to room
+                        await manager.broadcast_to_room({
+                            "type": "chat_message",
+                            "message": message.get("content", ""),
+                            "userId": user_id,
+                            "username": username,
+                            "roomId": room_id
+                        }, room_id)
+
+                    elif message.get("type") == "room_status":
+                        # Send room status to requesting user
+                        room = rooms.get(room_id)
+                        if room is None:
+                            await manager.send_to_user_in_room({
+                                "type": "error",
+                                "message": "Room closed"
+                            }, room_id, user_id)
+                        else:
+                            players = room.players
+                            await manager.send_to_user_in_room({
+                                "type": "room_status",
+                                "roomId": room_id,
+                                "roomName": room.name,
+                                "players": players,
+                                "usernames": await username_resolver.get_usernames(players),
+                                "player_count": len(players)
+                            }, room_id, user_id)
                 
-            except json.JSONDecodeError:
+            except DecodeError:
                 await manager.send_to_user_in_room({
                     "type": "error",
-                    "message": "Invalid JSON format"
+                    "message": codec.invalid_message
                 }, room_id, user_id)
+            websocket_message_seconds.observe(time.perf_counter() - started, kind)
                 
     except WebSocketDisconnect:
-        manager.disconnect(room_id, user_id)
+        manager.disconnect(room_id, user_id, websocket)
+        room = rooms.get(room_id)
+        if room is None or user_id not in room.players:
+            # Closed because the user left or the room is gone; already announced
+            return
+        if room_id not in manager.room_connections:
+            room_reaper.touch(room_id, ROOM_ABANDONED_TTL)
         # Notify room that user disconnected
         await manager.broadcast_to_room({
             "type": "user_disconnected",
@@ -212,6 +579,31 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, user_id: str):
             "roomId": room_id
         }, room_id, exclude_user=user_id)
 
+@app.websocket("/spectate/{room_id}")
+async def spectate_websocket(websocket: WebSocket, room_id: str):
+    """Read-only view of a room's events; anything the spectator sends is ignored"""
+    room_id = normalize_room_id(room_id)
+    if room_id not in rooms:
+        await websocket.close(code=4004, reason="Room not found")
+        return
+    codec = await accept(websocket)
+    players = rooms[room_id].players
+    await send(websocket, codec, {
+        "type": "room_status",
+        "roomId": room_id,
+        "roomName": rooms[room_id].name,
+        "players": players,
+        "usernames": await username_resolver.get_usernames(players),
+        "player_count": len(players),
+        "spectators": len(manager.spectator_feeds.get(room_id, ())) + 1
+    })
+    spectator = manager.spectate(websocket, room_id, codec)
+    try:
+        while True:
+            await receive_frame(websocket)
+    except WebSocketDisconnect:
+        spectator.close()
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -219,9 +611,22 @@ def health_check():
         "status": "healthy",
         "service": "room-service",
         "active_rooms": len(rooms),
-        "total_players": sum(len(room["players"]) for room in rooms.values())
+        "total_players": Room.seated,
+        "spectated_rooms": len(manager.spectator_feeds),
+        "outbound": manager.outbound_stats.snapshot(),
+        "reaper": room_reaper.stats(),
+        "journal": journal.stats(),
+        "events": room_events.stats(),
+        "matchmaking": matchmaker.stats(),
+        "pubsub": pubsub.stats(),
+        "tracing": tracer.stats()
     }
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Counters, gauges and latency histograms in the Prometheus text format"""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Room Service on port 8001")
@@ -0,0 +1,188 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from sortedcontainers import SortedList
+
+logger = logging.getLogger(__name__)
+
+
+class Ticket:
+    __slots__ = ("user_id", "skill", "region", "enqueued_at", "seq")
+
+    def __init__(self, user_id: str, skill: Optional[float], region: Optional[str], enqueued_at: float, seq: int):
+        self.user_id = user_id
+        self.skill = skill
+        self.region = region
+        self.enqueued_at = enqueued_at
+        self.seq = seq
+
+    @property
+    def key(self) -> tuple:
+        return (self.skill, self.seq, self.user_id)
+
+
+class Matchmaker:
+    """Pairs queued players into matches.
+
+    Players only meet players of the same `region` (any string the client
+    sends, e.g. a region or a latency band; None is its own bucket). Players
+    without a skill rating are paired first come, first served. Players with
+    one wait in a per-region sorted list and are paired with the nearest
+    rating on either side, provided the gap is within the skill window of
+    either player. The window starts at `skill_window` and widens by
+    `widen_per_second` while a player waits, so nobody waits forever.
+
+    Enqueue and cancel are O(log n). A background sweep every `interval`
+    seconds walks each list once, O(n) in the queued players, to pair
+    neighbours whose windows have widened enough since they were queued.
+    That one pass per interval is cheaper than keeping every pair of
+    neighbours in a heap by due time, which would add heap pushes to each
+    enqueue and cancel.
+    """
+
+    def __init__(
+        self,
+        on_match: Callable[[Ticket, Ticket], None],
+        skill_window: float = 100.0,
+        widen_per_second: float = 25.0,
+        interval: float = 1.0,
+    ):
+        self.on_match = on_match
+        self.skill_window = skill_window
+        self.widen_per_second = widen_per_second
+        self.interval = interval
+        self._tickets: dict[str, Ticket] = {}
+        self._fifo: dict[Optional[str], OrderedDict[str, Ticket]] = {}
+        self._ranked: dict[Optional[str], SortedList] = {}
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self.pairs_total = 0
+        self.wait_seconds_total = 0.0
+        self.last_sweep_pairs = 0
+        self.last_sweep_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._tickets
+
+    def window(self, ticket: Ticket, now: float) -> float:
+        return self.skill_window + self.widen_per_second * (now - ticket.enqueued_at)
+
+    def enqueue(
+        self, user_id: str, skill: Optional[float] = None, region: Optional[str] = None, now: Optional[float] = None
+    ) -> bool:
+        """Queue a player (replacing any earlier ticket); True if they were matched at once"""
+        now = time.monotonic() if now is None else now
+        self.cancel(user_id)
+        ticket = Ticket(user_id, skill, region, now, next(self._seq))
+        if skill is None:
+            waiting = self._fifo.setdefault(region, OrderedDict())
+            if waiting:
+                _, opponent = waiting.popitem(last=False)
+                del self._tickets[opponent.user_id]
+                self._pair(opponent, ticket, now)
+                return True
+            waiting[user_id] = ticket
+        else:
+            ranked = self._ranked.setdefault(region, SortedList())
+            opponent = self._nearest(ranked, ticket, now)
+            if opponent is not None:
+                ranked.remove(opponent.key)
+                del self._tickets[opponent.user_id]
+                self._pair(opponent, ticket, now)
+                return True
+            ranked.add(ticket.key)
+        self._tickets[user_id] = ticket
+        return False
+
+    def _nearest(self, ranked: SortedList, ticket: Ticket, now: float) -> Optional[Ticket]:
+        index = ranked.bisect_left(ticket.key)
+        best = None
+        for neighbour in (index - 1, index):
+            if 0 <= neighbour < len(ranked):
+                candidate = self._tickets[ranked[neighbour][2]]
+                gap = abs(candidate.skill - ticket.skill)
+                # The new ticket's window is the base one, never wider than the candidate's
+                if gap <= self.window(candidate, now) and (
+                    best is None or gap < abs(best.skill - ticket.skill)
+                ):
+                    best = candidate
+        return best
+
+    def cancel(self, user_id: str) -> bool:
+        ticket = self._tickets.pop(user_id, None)
+        if ticket is None:
+            return False
+        if ticket.skill is None:
+            del self._fifo[ticket.region][user_id]
+        else:
+            self._ranked[ticket.region].remove(ticket.key)
+        return True
+
+    def _pair(self, first: Ticket, second: Ticket, now: float):
+        self.pairs_total += 1
+        self.wait_seconds_total += (now - first.enqueued_at) + (now - second.enqueued_at)
+        try:
+            self.on_match(first, second)
+        except Exception as e:
+            logger.error(f"Failed to set up match for {first.user_id} and {second.user_id}: {e!r}")
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Pair adjacent waiting players whose widened windows now overlap"""
+        now = time.monotonic() if now is None else now
+        started = time.perf_counter()
+        pairs = []
+        for ranked in self._ranked.values():
+            previous = None
+            for key in ranked:
+                ticket = self._tickets[key[2]]
+                if previous is not None and ticket.skill - previous.skill <= max(
+                    self.window(previous, now), self.window(ticket, now)
+                ):
+                    pairs.append((previous, ticket))
+                    previous = None
+                else:
+                    previous = ticket
+        for first, second in pairs:
+            self.cancel(first.user_id)
+            self.cancel(second.user_id)
+            self._pair(first, second, now)
+        self.last_sweep_pairs = len(pairs)
+        self.last_sweep_seconds = time.perf_counter() - started
+        return len(pairs)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error while sweeping the matchmaking queue: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._tickets),
+            "pairs_total": self.pairs_total,
+            "mean_wait_ms": round(self.wait_seconds_total / (2 * self.pairs_total) * 1000, 1) if self.pairs_total else 0.0,
+            "last_sweep_pairs": self.last_sweep_pairs,
+            "last_sweep_ms": round(self.last_sweep_seconds * 1000, 3),
+        }
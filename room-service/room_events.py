@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import uuid
+from typing import Callable, Iterable, Optional
+
+from pubsub import PubSub
+
+logger = logging.getLogger(__name__)
+
+ROOMS_CHANNEL = "rooms"
+ROOMS_SYNC_CHANNEL = "rooms-sync"
+
+
+class RoomEventPublisher:
+    """Publishes room lifecycle events for other services to mirror.
+
+    Each event is `[kind, room_id, players]` with kind one of `created`,
+    `joined`, `left` or `closed`, and carries the room's full player list so
+    applying it twice is harmless. Events get consecutive sequence numbers
+    within an `epoch` that is new every time the service starts. Events
+    emitted in the same event-loop tick go out as one message:
+
+        {"type": "events", "epoch": e, "seq": last_seq, "events": [...]}
+
+    A heartbeat with the current epoch and seq goes out every
+    `heartbeat_interval` seconds so subscribers notice lost messages. A
+    subscriber that is behind, or sees a new epoch, asks for a snapshot on
+    `ROOMS_SYNC_CHANNEL` and gets every room back in `snapshot` messages of
+    at most `chunk_size` rooms, tagged with the seq the snapshot was taken
+    at.
+    """
+
+    def __init__(
+        self,
+        pubsub: PubSub,
+        snapshot: Callable[[], Iterable[tuple[str, Iterable[str]]]],
+        heartbeat_interval: float = 5.0,
+        chunk_size: int = 5000,
+    ):
+        self.pubsub = pubsub
+        self.snapshot = snapshot
+        self.heartbeat_interval = heartbeat_interval
+        self.chunk_size = chunk_size
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self._pending: list[list] = []
+        self._task: Optional[asyncio.Task] = None
+        self.published_events = 0
+        self.snapshots_sent = 0
+
+    def emit(self, kind: str, room_id: str, players: Iterable[str] = ()):
+        """Queue an event; safe to call from sync code on the event loop"""
+        if not self._pending:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._pending.append([kind, room_id, list(players)])
+        self.seq += 1
+
+    def _flush(self):
+        events, self._pending = self._pending, []
+        self.published_events += len(events)
+        message = {"type": "events", "epoch": self.epoch, "seq": self.seq, "events": events}
+        asyncio.create_task(self.pubsub.publish(ROOMS_CHANNEL, message))
+
+    async def start(self):
+        if self._task is None:
+            self.pubsub.subscribe(ROOMS_SYNC_CHANNEL, self._on_sync_request)
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.pubsub.publish(
+                    ROOMS_CHANNEL, {"type": "heartbeat", "epoch": self.epoch, "seq": self.seq}
+                )
+            except Exception as e:
+                logger.error(f"Room event heartbeat error: {e!r}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _on_sync_request(self, message: dict):
+        # Capture in this tick, so the snapshot is exactly the state at self.seq
+        rooms = [[room_id, list(players)] for room_id, players in self.snapshot()]
+        asyncio.create_task(self._send_snapshot(message.get("syncId"), self.seq, rooms))
+
+    async def _send_snapshot(self, sync_id: Optional[str], seq: int, rooms: list):
+        parts = max(1, -(-len(rooms) // self.chunk_size))
+        for part in range(parts):
+            await self.pubsub.publish(ROOMS_CHANNEL, {
+                "type": "snapshot",
+                "epoch": self.epoch,
+                "seq": seq,
+                "syncId": sync_id,
+                "part": part,
+                "parts": parts,
+                "rooms": rooms[part * self.chunk_size:(part + 1) * self.chunk_size],
+            })
+        self.snapshots_sent += 1
+        logger.info(f"Sent membership snapshot of {len(rooms)} rooms at seq {seq}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "published_events": self.published_events,
+            "snapshots_sent": self.snapshots_sent,
+        }
@@ -0,0 +1,126 @@
+import itertools
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+BASE = len(ALPHABET)
+_VALUES = {char: value for value, char in enumerate(ALPHABET)}
+
+# Odd and not a multiple of 3, so multiplying by it permutes every 36**k range
+_SCRAMBLE = 1_000_003
+
+
+def check_character(body: str) -> str:
+    """Luhn mod 36 check character; catches any single typo and most swaps"""
+    total = 0
+    factor = 2
+    for char in reversed(body):
+        addend = factor * _VALUES[char]
+        total += addend // BASE + addend % BASE
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(BASE - total % BASE) % BASE]
+
+
+def normalize_room_id(room_id: str) -> str:
+    """Room codes are typed by people, so surrounding spaces and case are ignored"""
+    return room_id.strip().upper()
+
+
+def is_valid_room_id(room_id: str) -> bool:
+    if len(room_id) < 2 or any(char not in _VALUES for char in room_id):
+        return False
+    return check_character(room_id[:-1]) == room_id[-1]
+
+
+def _in_process_blocks(block_size: int) -> Iterator[int]:
+    return itertools.count(0, block_size)
+
+
+class RoomIdAllocator:
+    """Hands out unique, short, human-typable room codes in O(1).
+
+    Codes come from a counter rather than from random draws, so two live
+    rooms can never share one. The counter is scrambled with a bijection on
+    [0, 36**width) so consecutive rooms do not get consecutive codes, written
+    in base 36 and followed by a check character. Codes start at 4 + 1
+    characters (1.6M rooms) and grow by one character whenever a width is
+    exhausted.
+
+    Counter values are taken in blocks from `reserve_block`, which defaults to
+    an in-process sequence; several room-service workers can share one code
+    space by passing a function that reserves blocks from shared storage.
+    """
+
+    def __init__(
+        self,
+        min_width: int = 4,
+        block_size: int = 1024,
+        reserve_block: Optional[Callable[[], int]] = None,
+    ):
+        self.min_width = min_width
+        self.block_size = block_size
+        self._reserve_block = reserve_block or _in_process_blocks(block_size).__next__
+        self._lock = threading.Lock()
+        self._next = 0
+        self._block_end = 0
+        self._floor = 0  # counters below this are known to be taken
+        self._inverses: dict[int, int] = {}  # width -> inverse of _SCRAMBLE mod 36**width
+
+    def _next_counter(self) -> int:
+        with self._lock:
+            if self._next >= self._block_end:
+                start = self._reserve_block()
+                while start + self.block_size <= self._floor:
+                    start = self._reserve_block()
+                self._next = max(start, self._floor)
+                self._block_end = start + self.block_size
+            counter = self._next
+            self._next += 1
+        return counter
+
+    def encode(self, counter: int) -> str:
+        # Counters below 36**min_width use min_width digits, the next
+        # 36**(min_width + 1) use one more, and so on
+        width = self.min_width
+        while counter >= BASE ** width:
+            counter -= BASE ** width
+            width += 1
+        space = BASE ** width
+        value = (counter * _SCRAMBLE + space // 3) % space
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(ALPHABET[digit])
+        body = "".join(reversed(digits))
+        return body + check_character(body)
+
+    def decode(self, room_id: str) -> int:
+        """Counter value that `encode` turned into `room_id`"""
+        width = len(room_id) - 1
+        space = BASE ** width
+        inverse = self._inverses.get(width)
+        if inverse is None:
+            inverse = self._inverses[width] = pow(_SCRAMBLE, -1, space)
+        counter = (int(room_id[:-1], BASE) - space // 3) * inverse % space
+        return counter + sum(BASE ** w for w in range(self.min_width, width))
+
+    def skip_past(self, room_ids: Iterable[str]):
+        """Never hand out codes at or below any of `room_ids`, which are already in use.
+
+        The ids are trusted to be well-formed codes (they come from this
+        allocator or from the journal), so they are decoded without checking.
+        """
+        highest = -1
+        min_length = self.min_width + 1
+        for room_id in room_ids:
+            if len(room_id) >= min_length:
+                highest = max(highest, self.decode(room_id))
+        if highest < 0:
+            return
+        with self._lock:
+            self._floor = max(self._floor, highest + 1)
+            if self._next < self._floor:
+                self._next = self._block_end  # take a fresh block on next allocate
+
+    def allocate(self) -> str:
+        return self.encode(self._next_counter())
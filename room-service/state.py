@@ -0,0 +1,38 @@
+class Room:
+    """A room and the (at most two) players who joined it.
+
+    Players are kept in a tuple and the fields in slots, so a room costs one
+    small object instead of a dict holding a list.
+
+    `Room.seated` counts the players in all rooms. Players are only changed
+    through the methods below, which keep it up to date, so `/health` and
+    `/metrics` read it without scanning the rooms; `close()` a room before
+    dropping it.
+    """
+
+    __slots__ = ("name", "players", "created_by")
+
+    seated = 0
+
+    def __init__(self, name: str, created_by: str):
+        self.name = name
+        self.players: tuple[str, ...] = ()
+        self.created_by = created_by
+        self.set_players((created_by,))
+
+    def set_players(self, players):
+        Room.seated += len(players) - len(self.players)
+        self.players = tuple(players)
+
+    def add_player(self, user_id: str):
+        if user_id not in self.players:
+            self.set_players(self.players + (user_id,))
+
+    def remove_player(self, user_id: str):
+        self.set_players(tuple(player for player in self.players if player != user_id))
+
+    def close(self):
+        self.set_players(())
+
+    def to_dict(self) -> dict:
+        return {"roomName": self.name, "players": list(self.players), "created_by": self.created_by}
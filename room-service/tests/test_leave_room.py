@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_leaving_closes_the_players_sockets(client):
+    room_id = client.post("/create-room", json={"userId": "u1", "roomName": "r"}).json()["roomId"]
+    client.post("/join-room", json={"userId": "u2", "roomId": room_id})
+    with client.websocket_connect(f"/ws/{room_id}/u1") as first:
+        first.receive_json()
+        with client.websocket_connect(f"/ws/{room_id}/u2") as second:
+            first.receive_json()
+            second.receive_json()
+            client.post("/leave-room", json={"userId": "u2", "roomId": room_id})
+            with pytest.raises(WebSocketDisconnect) as closed:
+                second.receive_json()
+            assert closed.value.code == 4003
+            assert first.receive_json()["type"] == "user_left"
+
+        client.post("/leave-room", json={"userId": "u1", "roomId": room_id})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            first.receive_json()
+        assert closed.value.code == 4004
+    assert client.get("/health").json()["outbound"]["connections"] == 0
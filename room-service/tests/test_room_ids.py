@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from room_ids import ALPHABET, BASE, RoomIdAllocator, is_valid_room_id, normalize_room_id
+
+# The default allocator's 5-character codes run out after this many rooms
+FIVE_CHARACTER_CODES = BASE ** 4
+
+
+def test_allocated_codes_are_valid_and_decode_to_their_counter():
+    allocator = RoomIdAllocator()
+    for counter in range(5_000):
+        room_id = allocator.allocate()
+        assert len(room_id) == 5
+        assert is_valid_room_id(room_id)
+        assert allocator.decode(room_id) == counter
+
+
+@pytest.mark.parametrize("typed", [" {} ", "{}", "\t{}\n"])
+def test_codes_are_accepted_in_any_case(typed):
+    room_id = RoomIdAllocator().allocate()
+    for variant in (room_id.lower(), room_id.upper(), room_id.swapcase()):
+        assert normalize_room_id(typed.format(variant)) == room_id
+        assert is_valid_room_id(normalize_room_id(typed.format(variant)))
+
+
+def test_every_single_character_typo_is_rejected():
+    allocator = RoomIdAllocator()
+    codes = [allocator.encode(counter) for counter in random.Random(7).sample(range(FIVE_CHARACTER_CODES * 2), 200)]
+    for room_id in codes:
+        for position in range(len(room_id)):
+            for char in ALPHABET:
+                if char != room_id[position]:
+                    typo = room_id[:position] + char + room_id[position + 1:]
+                    assert not is_valid_room_id(typo), f"{typo} accepted as a typo of {room_id}"
+
+
+def test_malformed_codes_are_rejected():
+    assert not is_valid_room_id("")
+    assert not is_valid_room_id("A")
+    assert not is_valid_room_id("AB-2C")
+    assert not is_valid_room_id(RoomIdAllocator().allocate().lower())
+
+
+def test_no_collisions_across_a_whole_width_and_into_the_next():
+    allocator = RoomIdAllocator(min_width=2)
+    codes = [allocator.allocate() for _ in range(BASE ** 2 + BASE ** 3)]
+    assert len(set(codes)) == len(codes)
+    assert {len(code) for code in codes[:BASE ** 2]} == {3}
+    assert {len(code) for code in codes[BASE ** 2:]} == {4}
+
+
+def test_no_collisions_at_the_five_to_six_character_boundary():
+    allocator = RoomIdAllocator()
+    counters = range(FIVE_CHARACTER_CODES - 20_000, FIVE_CHARACTER_CODES + 20_000)
+    codes = [allocator.encode(counter) for counter in counters]
+    assert len(set(codes)) == len(codes)
+    assert [len(code) for code in codes] == [5] * 20_000 + [6] * 20_000
+    assert all(is_valid_room_id(code) for code in codes)
+    assert [allocator.decode(code) for code in codes] == list(counters)
+
+
+def test_skip_past_never_hands_out_a_code_in_use():
+    allocator = RoomIdAllocator()
+    taken = allocator.encode(FIVE_CHARACTER_CODES - 1)
+    allocator.skip_past([taken])
+    room_id = allocator.allocate()
+    assert len(room_id) == 6
+    assert allocator.decode(room_id) == FIVE_CHARACTER_CODES
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def fallback_username(user_id: str) -> str:
+    """Display name used when the User Service cannot resolve an id"""
+    return f"User-{user_id[:8]}"
+
+
+class UsernameResolver:
+    """Non-blocking username lookups against the User Service.
+
+    Lookups share one pooled httpx client, results are kept in a bounded
+    TTL/LRU cache (unknown ids are cached for a shorter time), and concurrent
+    lookups for the same id wait on a single in-flight request. Misses made
+    in the same event-loop tick are sent as one `POST /users/batch` call.
+    Each call is timed into `request_seconds`, a `metrics.Histogram`
+    labelled by endpoint and outcome, when one is given. With a `tracer`,
+    each call is a span and carries the caller's `traceparent` header.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_entries: int = 10_000,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        timeout: float = 2.0,
+        max_connections: int = 100,
+        max_batch_size: int = 500,
+        request_seconds=None,
+        tracer=None,
+    ):
+        self.base_url = base_url
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_batch_size = max_batch_size
+        self.request_seconds = request_seconds
+        self.tracer = tracer
+        self._cache: OrderedDict[str, tuple[float, Optional[str]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._pending: list[str] = []
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _cache_get(self, user_id: str) -> tuple[bool, Optional[str]]:
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return False, None
+        expires_at, username = entry
+        if expires_at < time.monotonic():
+            del self._cache[user_id]
+            return False, None
+        self._cache.move_to_end(user_id)
+        return True, username
+
+    def _cache_put(self, user_id: str, username: Optional[str], ttl: float):
+        self._cache[user_id] = (time.monotonic() + ttl, username)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        self._cache.pop(user_id, None)
+
+    async def get_username(self, user_id: str) -> str:
+        hit, username = self._cache_get(user_id)
+        if not hit:
+            future = self._inflight.get(user_id)
+            if future is None:
+                future = self._enqueue(user_id)
+            # Shield so one cancelled waiter does not cancel the shared lookup
+            username = await asyncio.shield(future)
+        return username or fallback_username(user_id)
+
+    async def get_usernames(self, user_ids: list[str]) -> dict[str, str]:
+        """Resolve several ids; cache misses go out in a single batch request"""
+        usernames = await asyncio.gather(*(self.get_username(uid) for uid in user_ids))
+        return dict(zip(user_ids, usernames))
+
+    def _enqueue(self, user_id: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[user_id] = future
+        # Lookups made in the same event-loop tick are flushed together
+        if not self._pending:
+            loop.call_soon(self._flush)
+        self._pending.append(user_id)
+        return future
+
+    def _flush(self):
+        user_ids, self._pending = self._pending, []
+        for start in range(0, len(user_ids), self.max_batch_size):
+            asyncio.ensure_future(self._fetch_batch(user_ids[start:start + self.max_batch_size]))
+
+    async def _fetch_batch(self, user_ids: list[str]):
+        usernames: dict[str, str] = {}
+        outcome = "error"
+        started = time.perf_counter()
+        tracer = self.tracer
+        try:
+            # The batch joins the trace of the lookup that started it
+            with tracer.span("user-service /users/batch", users=len(user_ids)) if tracer else nullcontext():
+                headers = tracer.inject({}) if tracer else None
+                response = await self.client.post("/users/batch", json={"userIds": user_ids}, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            for user in data["users"]:
+                usernames[user["userId"]] = user["username"]
+                self._cache_put(user["userId"], user["username"], self.ttl)
+            for user_id in data["missing"]:
+                self._cache_put(user_id, None, self.negative_ttl)
+            outcome = "ok"
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            # Failures are not cached so the next lookup retries
+            logger.error(f"Error fetching usernames for {len(user_ids)} users: {e}")
+        finally:
+            if self.request_seconds is not None:
+                self.request_seconds.observe(time.perf_counter() - started, "/users/batch", outcome)
+            for user_id in user_ids:
+                future = self._inflight.pop(user_id, None)
+                if future is not None and not future.done():
+                    future.set_result(usernames.get(user_id))
@@ -0,0 +1,191 @@
+import json
+from typing import Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import orjson
+except ImportError:  # JSON falls back to the standard library
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # The binary protocol is not offered
+    msgpack = None
+
+# WebSocket subprotocol a client offers to speak the binary protocol
+BINARY_SUBPROTOCOL = "rps.msgpack"
+
+# In the binary protocol the top-level keys of every frame are shortened and
+# known frame types are sent as small integers. Keys inside nested objects
+# are left alone, since some of them (the moves of a result) are usernames.
+KEYS = {
+    "type": "t",
+    "message": "m",
+    "roomId": "r",
+    "userId": "u",
+    "username": "n",
+    "moves_count": "c",
+    "move": "v",
+    "result": "R",
+    "game_status": "g",
+    "series": "s",
+    "players": "p",
+    "spectators": "S",
+    "traceId": "x",
+    "traceparent": "X",
+    "bestOf": "B",
+    "bot": "b",
+}
+LONG_KEYS = {short: key for key, short in KEYS.items()}
+# Most frequent first; codes are positions from 1 and must never be reordered
+TYPES = (
+    "move_received", "game_result", "game_reset", "submit_move", "ready_for_next_round", "game_status",
+    "get_game_status", "room_status", "chat", "chat_message", "echo", "error", "game_connected",
+    "player_disconnected", "user_connected", "user_disconnected", "user_left", "connection_established",
+    "spectating", "series_started", "series_result", "start_series", "add_bot", "bot_joined", "queued",
+    "match_found", "cancelled", "tournament_status", "match_assigned", "tournament_round",
+    "tournament_round_finished", "tournament_finished",
+)
+TYPE_CODES = {kind: code for code, kind in enumerate(TYPES, 1)}
+# Text the compact form leaves out when it is exactly the usual one; decoding puts it back
+TEXTS = {
+    "move_received": "{username} has made their move",
+    "game_reset": "Game reset - ready for next round!",
+}
+
+
+def dumps(message) -> str:
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(message)
+
+
+def loads(data: Union[str, bytes]):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def compact(message: dict) -> dict:
+    """`message` with short keys, a numeric type and the usual text left out"""
+    compacted = {KEYS.get(key, key): value for key, value in message.items()}
+    kind = message.get("type")
+    if kind in TYPE_CODES:
+        compacted["t"] = TYPE_CODES[kind]
+        template = TEXTS.get(kind)
+        if template is not None and "m" in compacted:
+            try:
+                if compacted["m"] == template.format_map(message):
+                    del compacted["m"]
+            except (KeyError, ValueError):
+                pass
+    return compacted
+
+
+def expand(compacted: dict) -> dict:
+    """The inverse of `compact()`"""
+    message = {LONG_KEYS.get(key, key): value for key, value in compacted.items()}
+    code = message.get("type")
+    if isinstance(code, int) and 0 < code <= len(TYPES):
+        kind = message["type"] = TYPES[code - 1]
+        template = TEXTS.get(kind)
+        if template is not None and "message" not in message:
+            try:
+                message["message"] = template.format_map(message)
+            except (KeyError, ValueError):
+                pass
+    return message
+
+
+class DecodeError(ValueError):
+    """A frame the connection's codec cannot read"""
+
+
+class JsonCodec:
+    """Text frames of JSON, the default"""
+
+    name = "json"
+    subprotocol = None
+    invalid_message = "Invalid JSON format"
+
+    def encode(self, message: dict) -> str:
+        return dumps(message)
+
+    def decode(self, data: Union[str, bytes]):
+        try:
+            return loads(data)
+        except ValueError as e:
+            raise DecodeError(f"Invalid JSON: {e}") from e
+
+
+class MsgpackCodec:
+    """Binary frames of MessagePack in the compact form; text frames are still read as JSON"""
+
+    name = "msgpack"
+    subprotocol = BINARY_SUBPROTOCOL
+    invalid_message = "Invalid MessagePack format"
+
+    def encode(self, message: dict) -> bytes:
+        return msgpack.packb(compact(message))
+
+    def decode(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            return JSON.decode(data)
+        try:
+            message = msgpack.unpackb(data)
+        except Exception as e:
+            raise DecodeError(f"Invalid MessagePack: {e}") from e
+        return expand(message) if isinstance(message, dict) else message
+
+
+JSON = JsonCodec()
+MSGPACK = MsgpackCodec() if msgpack is not None else None
+Codec = Union[JsonCodec, MsgpackCodec]
+
+
+def negotiate(subprotocols) -> Codec:
+    """The binary codec when the client offered it and msgpack is installed, JSON otherwise"""
+    if MSGPACK is not None and BINARY_SUBPROTOCOL in (subprotocols or ()):
+        return MSGPACK
+    return JSON
+
+
+async def accept(websocket: WebSocket) -> Codec:
+    """Accept the socket, agreeing on the binary protocol if the client offered it"""
+    codec = negotiate(websocket.scope.get("subprotocols"))
+    await websocket.accept(subprotocol=codec.subprotocol)
+    return codec
+
+
+class Frame:
+    """A message encoded at most once per codec, for fan-out to clients that speak different ones"""
+
+    __slots__ = ("message", "_encoded")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._encoded: dict = {}
+
+    def encode(self, codec: Codec) -> Union[str, bytes]:
+        encoded = self._encoded.get(codec)
+        if encoded is None:
+            encoded = self._encoded[codec] = codec.encode(self.message)
+        return encoded
+
+
+async def send_frame(websocket: WebSocket, frame: Union[str, bytes]):
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """The next text or binary frame; raises WebSocketDisconnect like `receive_text()`"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    return message["text"] if message.get("text") is not None else message["bytes"]
+
+
+async def send(websocket: WebSocket, codec: Codec, message: dict):
+    await send_frame(websocket, codec.encode(message))
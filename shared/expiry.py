@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IdleReaper:
+    """Expires keys that have not been touched within their idle TTL.
+
+    Each key has one entry in a min-heap ordered by deadline. Touching a key
+    only records its new deadline; when the heap entry comes due the key is
+    either rescheduled (it was touched since) or offered to `on_expire`. A
+    sweep therefore costs O(k log n) for the k entries that came due, never a
+    scan of every key. `on_expire` returns False to keep a key that is still
+    in use, which reschedules it for another full TTL.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        idle_ttl: float,
+        on_expire: Callable[[str], bool],
+        interval: float = 5.0,
+    ):
+        self.name = name
+        self.idle_ttl = idle_ttl
+        self.on_expire = on_expire
+        self.interval = interval
+        self._deadlines: dict[str, float] = {}  # key -> current deadline
+        self._scheduled: dict[str, float] = {}  # key -> deadline of its live heap entry
+        self._heap: list[tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.sweeps = 0
+        self.reclaimed_total = 0
+        self.last_sweep_reclaimed = 0
+        self.last_sweep_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def touch(self, key: str, ttl: Optional[float] = None, now: Optional[float] = None):
+        """Push the key's deadline to `ttl` seconds from now (default: idle_ttl)"""
+        deadline = (time.monotonic() if now is None else now) + (self.idle_ttl if ttl is None else ttl)
+        self._deadlines[key] = deadline
+        scheduled = self._scheduled.get(key)
+        if scheduled is None or deadline < scheduled:
+            self._scheduled[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+
+    def forget(self, key: str):
+        self._deadlines.pop(key, None)
+        self._scheduled.pop(key, None)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        started = time.perf_counter()
+        reclaimed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            scheduled, key = heapq.heappop(heap)
+            if self._scheduled.get(key) != scheduled:
+                continue  # superseded by an earlier entry, or forgotten
+            deadline = self._deadlines[key]
+            if deadline <= now:
+                if self.on_expire(key):
+                    self.forget(key)
+                    reclaimed += 1
+                    continue
+                # Still in use: look at it again after another full TTL
+                deadline = self._deadlines[key] = now + self.idle_ttl
+            self._scheduled[key] = deadline
+            heapq.heappush(heap, (deadline, key))
+
+        self.sweeps += 1
+        self.reclaimed_total += reclaimed
+        self.last_sweep_reclaimed = reclaimed
+        self.last_sweep_seconds = time.perf_counter() - started
+        if reclaimed:
+            logger.info(
+                f"Reaped {reclaimed} idle {self.name} in {self.last_sweep_seconds * 1000:.2f} ms "
+                f"({len(self._deadlines)} still tracked)"
+            )
+        return reclaimed
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error while reaping idle {self.name}: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._deadlines),
+            "sweeps": self.sweeps,
+            "reclaimed_total": self.reclaimed_total,
+            "last_sweep_reclaimed": self.last_sweep_reclaimed,
+            "last_sweep_ms": round(self.last_sweep_seconds * 1000, 3),
+        }
@@ -0,0 +1,198 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """Append-only event log with periodic snapshots, for durable mode.
+
+    Every state change is appended as one compact JSON array per line.
+    Lines go to a buffered file and are flushed and fsynced together every
+    `fsync_interval` seconds, so a crash loses at most that window of
+    events. After `snapshot_every` events the full state is written to a
+    snapshot and a new log segment is started; older segments are then
+    deleted. On startup the newest snapshot is loaded and only the segments
+    written after it are replayed, so restart time is bounded by the
+    snapshot size plus one interval of events, not by total history.
+
+    Call `append()` from the event loop thread only. With `directory=None`
+    the journal is disabled and every method is a no-op.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        apply: Callable[[list], None],
+        snapshot: Callable[[], Any],
+        restore: Callable[[Any], None],
+        fsync_interval: float = 0.05,
+        snapshot_every: int = 100_000,
+    ):
+        self.directory = directory
+        self.enabled = directory is not None
+        self.apply = apply
+        self.snapshot = snapshot
+        self.restore = restore
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.seq = 0  # sequence number of the last event written
+        self.snapshot_seq = 0  # last event covered by the newest snapshot
+        self.restored_events = 0
+        self.restore_seconds = 0.0
+        self._file = None
+        self._dirty = False
+        self._snapshot_running = False
+        self._task: Optional[asyncio.Task] = None
+
+    def _segment_path(self, start: int) -> str:
+        return os.path.join(self.directory, f"events-{start:012d}.log")
+
+    def _snapshot_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{seq:012d}.json")
+
+    @staticmethod
+    def _file_seq(path: str) -> int:
+        return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+    def open(self):
+        """Load the newest snapshot, replay the log tail and open the log for appends"""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.perf_counter()
+
+        snapshots = sorted(glob.glob(os.path.join(self.directory, "snapshot-*.json")), key=self._file_seq)
+        if snapshots:
+            with open(snapshots[-1], encoding="utf-8") as f:
+                self.restore(json.load(f))
+            self.snapshot_seq = self.seq = self._file_seq(snapshots[-1])
+
+        segments = sorted(glob.glob(os.path.join(self.directory, "events-*.log")), key=self._file_seq)
+        for index, path in enumerate(segments):
+            self._replay_segment(path, is_last=index == len(segments) - 1)
+
+        self.restore_seconds = time.perf_counter() - started
+        if segments and self._file_seq(segments[-1]) > self.snapshot_seq:
+            path = segments[-1]
+        else:
+            path = self._segment_path(self.seq + 1)
+        self._file = open(path, "a", encoding="utf-8")
+        logger.info(
+            f"Restored state from {self.directory}: snapshot at event {self.snapshot_seq}, "
+            f"{self.restored_events} events replayed in {self.restore_seconds * 1000:.1f} ms"
+        )
+
+    def _replay_segment(self, path: str, is_last: bool):
+        seq = self._file_seq(path) - 1
+        good_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    if not is_last:
+                        raise
+                    # A torn write from a crash; drop it and everything after
+                    logger.warning(f"Truncating {path} after event {seq}")
+                    break
+                seq += 1
+                good_bytes += len(line)
+                if seq > self.snapshot_seq:
+                    self.apply(event)
+                    self.restored_events += 1
+        if is_last and good_bytes != os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(good_bytes)
+        self.seq = max(self.seq, seq)
+
+    def append(self, event: list):
+        if not self.enabled:
+            return
+        self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.seq += 1
+        self._dirty = True
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            try:
+                await self.sync()
+                if self.seq - self.snapshot_seq >= self.snapshot_every and not self._snapshot_running:
+                    await self.write_snapshot()
+            except Exception as e:
+                logger.error(f"Journal error: {e!r}")
+
+    async def sync(self):
+        """Flush buffered events and fsync them off the event loop"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._file.flush()
+        await asyncio.to_thread(os.fsync, self._file.fileno())
+
+    async def write_snapshot(self):
+        """Snapshot the current state and start a new log segment"""
+        self._snapshot_running = True
+        try:
+            # Capture state and rotate on the loop so no event falls between them
+            state = self.snapshot()
+            seq = self.seq
+            previous = self._file
+            previous.flush()
+            self._file = open(self._segment_path(seq + 1), "a", encoding="utf-8")
+            await asyncio.to_thread(self._persist_snapshot, seq, state, previous)
+            self.snapshot_seq = seq
+        finally:
+            self._snapshot_running = False
+
+    def _persist_snapshot(self, seq: int, state: Any, previous):
+        os.fsync(previous.fileno())
+        previous.close()
+        path = self._snapshot_path(seq)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        # Everything up to `seq` is now in the snapshot
+        for old in glob.glob(os.path.join(self.directory, "events-*.log")):
+            if self._file_seq(old) <= seq:
+                os.remove(old)
+        for old in glob.glob(os.path.join(self.directory, "snapshot-*.json")):
+            if self._file_seq(old) < seq:
+                os.remove(old)
+
+    async def close(self):
+        if not self.enabled or self._file is None:
+            return
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sync()
+        if self.seq > self.snapshot_seq and not self._snapshot_running:
+            await self.write_snapshot()
+        self._file.close()
+        self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "seq": self.seq,
+            "snapshot_seq": self.snapshot_seq,
+            "restored_events": self.restored_events,
+            "restore_ms": round(self.restore_seconds * 1000, 1),
+        }
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds; from 100 µs for in-process handlers up to 10 s for stalled calls
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing total, one per combination of label values.
+
+    With `read`, the value is taken from the callback at scrape time instead,
+    for totals a component already keeps (such as `OutboundStats`).
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), read: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.read = read
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self.read() if self.read is not None else self._values.get(label_values, 0)
+
+    def render(self, lines: list[str]):
+        if self.read is not None:
+            lines.append(f"{self.name} {_format_value(self.read())}")
+            return
+        for label_values, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_format_value(value)}")
+
+
+class Gauge(Counter):
+    """A value that goes up and down; `read` makes it a view of existing state"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *label_values: str):
+        self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """Counts of observations in fixed buckets, one series per label values.
+
+    `observe()` is a dict lookup, a bisect over the bucket bounds and two
+    additions, so it is cheap enough for every message and broadcast.
+    Buckets are counted individually and made cumulative only when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series is not None else 0
+
+    def render(self, lines: list[str]):
+        for label_values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            labels = _labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class MetricsRegistry:
+    """A service's metrics, rendered in the Prometheus text format by `/metrics`"""
+
+    def __init__(self, namespace: str = "rps"):
+        self.namespace = namespace
+        self._metrics: dict[str, object] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def counter(self, name: str, help: str, labels: tuple = (), read: Optional[Callable[[], float]] = None) -> Counter:
+        return self._add(Counter(self._name(name), help, labels, read))
+
+    def gauge(self, name: str, help: str, labels: tuple = (), read: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._add(Gauge(self._name(name), help, labels, read))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(self._name(name), help, labels, buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                metric.render(lines)
+            except Exception as e:
+                logger.error(f"Error rendering metric {metric.name}: {e!r}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+class RequestMetrics:
+    """ASGI middleware that times every HTTP request by method, route and status.
+
+    The route is the path template the request matched (`/stats/{user_id}`),
+    so IDs in paths do not create new series. WebSocket and lifespan scopes
+    pass straight through.
+    """
+
+    def __init__(self, app, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_and_record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                scope["method"], getattr(route, "path", "unmatched"), str(status),
+            )
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how much later than asked a short sleep wakes up.
+
+    A loop that is blocked by a slow handler or a long synchronous scan wakes
+    the sampler late, so the lag is also the delay every other task saw.
+    """
+
+    def __init__(self, metrics: MetricsRegistry, interval: float = 0.25):
+        self.interval = interval
+        self.histogram = metrics.histogram(
+            "event_loop_lag_seconds", "How late the event loop ran a task that was due",
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+        )
+        self.last = metrics.gauge("event_loop_lag_last_seconds", "Event-loop lag at the latest sample")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - due)
+            self.histogram.observe(lag)
+            self.last.set(lag)
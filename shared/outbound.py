@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Optional, Union
+
+from fastapi import WebSocket
+
+from codec import JSON, Codec, Frame, send_frame
+
+logger = logging.getLogger(__name__)
+
+# Frames that only describe current state. A newer frame of the same type
+# replaces a queued one, and they are the first to go when a queue is full.
+COALESCED_TYPES = frozenset({"move_received", "game_status", "room_status"})
+
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+class OutboundStats:
+    """Running totals over every outbound queue of a service"""
+
+    def __init__(self):
+        self.connections = 0
+        self.queued_frames = 0
+        self.queued_bytes = 0
+        self.sent_frames = 0
+        self.coalesced_frames = 0
+        self.dropped_frames = 0
+        self.evicted_connections = 0
+        self.spectators = 0
+        self.spectator_frames = 0  # published to a spectator feed, once per frame
+        self.spectator_sent_frames = 0
+        self.spectator_skipped_frames = 0  # missed by spectators that fell behind
+
+    def snapshot(self) -> dict:
+        return dict(vars(self))
+
+    def export(self, metrics):
+        """Expose these totals on a `metrics.MetricsRegistry`, read at scrape time"""
+        for attribute, kind, name, help in (
+            ("connections", "gauge", "websocket_connections", "Open WebSocket connections"),
+            ("queued_frames", "gauge", "outbound_queued_frames", "Frames waiting in outbound queues"),
+            ("queued_bytes", "gauge", "outbound_queued_bytes", "Bytes waiting in outbound queues"),
+            ("sent_frames", "counter", "outbound_sent_frames_total", "Frames sent to clients"),
+            ("coalesced_frames", "counter", "outbound_coalesced_frames_total", "Status frames replaced by a newer one"),
+            ("dropped_frames", "counter", "outbound_dropped_frames_total", "Frames dropped from full queues"),
+            ("evicted_connections", "counter", "outbound_evicted_connections_total", "Slow clients disconnected"),
+            ("spectators", "gauge", "spectators", "Open spectator sockets"),
+            ("spectator_frames", "counter", "spectator_frames_total", "Frames published to spectator feeds"),
+            ("spectator_skipped_frames", "counter", "spectator_skipped_frames_total",
+             "Frames missed by spectators that fell behind"),
+        ):
+            getattr(metrics, kind)(name, help, read=lambda attribute=attribute: getattr(self, attribute))
+
+
+class OutboundQueue:
+    """Bounded send queue for one WebSocket, drained by its own writer task.
+
+    Producers call `put()` with a frame already encoded by `codec`, the one
+    agreed with the client when it connected; `put()` never blocks. When the
+    queue is full the oldest coalescable frame is dropped; if there is none,
+    or a single send takes longer than `send_timeout`, the connection is
+    treated as a slow consumer and closed. Sends are timed by one watchdog
+    timer per connection that is re-armed at most once per `send_timeout`,
+    rather than a timeout around every send.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        stats: OutboundStats,
+        on_close: Callable[[], None],
+        max_frames: int = 64,
+        max_bytes: int = 256 * 1024,
+        send_timeout: float = 5.0,
+        codec: Codec = JSON,
+    ):
+        self.websocket = websocket
+        self.codec = codec
+        self.stats = stats
+        self.on_close = on_close
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.send_timeout = send_timeout
+        self.queued_bytes = 0
+        self._frames: deque[tuple[Optional[str], Union[str, bytes]]] = deque()
+        self._ready = asyncio.Event()
+        self._send_started: Optional[float] = None
+        self._watchdog: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+        stats.connections += 1
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def depth(self) -> int:
+        return len(self._frames)
+
+    def put(self, text: Union[str, bytes], kind: Optional[str] = None):
+        if self._closed:
+            return
+        if kind in COALESCED_TYPES and self._remove_first(lambda k: k == kind):
+            self.stats.coalesced_frames += 1
+        while self._frames and (
+            len(self._frames) >= self.max_frames or self.queued_bytes + len(text) > self.max_bytes
+        ):
+            if not self._remove_first(lambda k: k in COALESCED_TYPES):
+                self._evict("queue full")
+                return
+            self.stats.dropped_frames += 1
+        self._frames.append((kind, text))
+        self.queued_bytes += len(text)
+        self.stats.queued_frames += 1
+        self.stats.queued_bytes += len(text)
+        self._ready.set()
+
+    def close(self, code: Optional[int] = None, reason: str = ""):
+        if self._closed:
+            return
+        self._closed = True
+        self.stats.connections -= 1
+        self.stats.queued_frames -= len(self._frames)
+        self.stats.queued_bytes -= self.queued_bytes
+        self._frames.clear()
+        self.queued_bytes = 0
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if code is not None:
+            asyncio.ensure_future(self._close_websocket(code, reason))
+        self.on_close()
+
+    def _watch(self):
+        """Close the connection if the send in progress has run past `send_timeout`"""
+        self._watchdog = None
+        if self._send_started is None:
+            return
+        remaining = self._send_started + self.send_timeout - time.monotonic()
+        if remaining <= 0:
+            self._evict("send stalled")
+        else:
+            self._watchdog = asyncio.get_running_loop().call_later(remaining, self._watch)
+
+    def _remove_first(self, matches: Callable[[Optional[str]], bool]) -> bool:
+        for index, (kind, text) in enumerate(self._frames):
+            if matches(kind):
+                del self._frames[index]
+                self.queued_bytes -= len(text)
+                self.stats.queued_frames -= 1
+                self.stats.queued_bytes -= len(text)
+                return True
+        return False
+
+    def _evict(self, reason: str):
+        logger.warning(f"Closing slow consumer ({reason}, {len(self._frames)} frames queued)")
+        self.stats.evicted_connections += 1
+        self.close(SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+
+    async def _close_websocket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    async def _write_loop(self):
+        try:
+            while True:
+                while not self._frames:
+                    self._ready.clear()
+                    await self._ready.wait()
+                _, text = self._frames.popleft()
+                self.queued_bytes -= len(text)
+                self.stats.queued_frames -= 1
+                self.stats.queued_bytes -= len(text)
+                self._send_started = time.monotonic()
+                if self._watchdog is None:
+                    self._watchdog = asyncio.get_running_loop().call_later(self.send_timeout, self._watch)
+                await send_frame(self.websocket, text)
+                self._send_started = None
+                self.stats.sent_frames += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending message: {e!r}")
+            self.close()
+
+
+class SpectatorFeed:
+    """Read-only fan-out of one room's frames to any number of spectators.
+
+    Frames are kept in a short ring shared by every spectator and encoded
+    at most once per codec; a spectator is only a cursor into it plus its
+    own writer task, so `publish()` is O(1) whatever the audience.
+    Spectators that are waiting for a frame are woken by one background
+    task in batches of `wake_batch`, yielding to the event loop in between, so a crowd of
+    spectators cannot delay the players' own sends. A spectator that falls
+    more than `history` frames behind skips ahead to the oldest frame still
+    kept; the frames it missed are counted, and nobody waits for it.
+    """
+
+    def __init__(self, stats: OutboundStats, history: int = 16, wake_batch: int = 32):
+        self.stats = stats
+        self.wake_batch = wake_batch
+        self.spectators: set["Spectator"] = set()
+        self.seq = 0  # sequence number of the next frame
+        self._frames: deque[Frame] = deque(maxlen=history)
+        self._idle: list[asyncio.Future] = []
+        self._waker: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.spectators)
+
+    def publish(self, frame: Frame):
+        self._frames.append(frame)
+        self.seq += 1
+        self.stats.spectator_frames += 1
+        if self._idle and self._waker is None:
+            self._waker = asyncio.create_task(self._wake_idle())
+
+    def next_frame(self, cursor: int) -> tuple[int, Optional[Frame]]:
+        """The frame at `cursor` and the cursor after it; None when caught up"""
+        first = self.seq - len(self._frames)
+        if cursor < first:
+            self.stats.spectator_skipped_frames += first - cursor
+            cursor = first
+        if cursor >= self.seq:
+            return cursor, None
+        return cursor + 1, self._frames[cursor - first]
+
+    async def wait(self, cursor: int):
+        """Return once there may be a frame at `cursor`"""
+        if cursor < self.seq:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._idle.append(future)
+        await future
+
+    async def _wake_idle(self):
+        try:
+            woken = -1
+            # Frames published while a batch was being woken need another pass
+            while self._idle and woken != self.seq:
+                woken = self.seq
+                idle, self._idle = self._idle, []
+                for start in range(0, len(idle), self.wake_batch):
+                    for future in idle[start:start + self.wake_batch]:
+                        if not future.done():
+                            future.set_result(None)
+                    await asyncio.sleep(0)
+        finally:
+            self._waker = None
+
+    def close(self, code: Optional[int] = None, reason: str = ""):
+        for spectator in list(self.spectators):
+            spectator.close(code, reason)
+        if self._waker is not None:
+            self._waker.cancel()
+
+
+class Spectator:
+    """One spectator's connection, following a SpectatorFeed from its newest frame"""
+
+    def __init__(
+        self, websocket: WebSocket, feed: SpectatorFeed, on_close: Callable[[], None], codec: Codec = JSON,
+    ):
+        self.websocket = websocket
+        self.codec = codec
+        self.feed = feed
+        self.on_close = on_close
+        self.cursor = feed.seq
+        self._closed = False
+        feed.spectators.add(self)
+        feed.stats.spectators += 1
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def close(self, code: Optional[int] = None, reason: str = ""):
+        if self._closed:
+            return
+        self._closed = True
+        self.feed.spectators.discard(self)
+        self.feed.stats.spectators -= 1
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if code is not None:
+            asyncio.ensure_future(self._close_websocket(code, reason))
+        self.on_close()
+
+    async def _close_websocket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    async def _write_loop(self):
+        feed = self.feed
+        try:
+            while True:
+                await feed.wait(self.cursor)
+                self.cursor, frame = feed.next_frame(self.cursor)
+                if frame is not None:
+                    await send_frame(self.websocket, frame.encode(self.codec))
+                    feed.stats.spectator_sent_frames += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to spectator: {e!r}")
+            self.close()
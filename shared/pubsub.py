@@ -0,0 +1,237 @@
+import abc
+import argparse
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], None]
+
+
+class PubSub(abc.ABC):
+    """Fire-and-forget publish/subscribe between service processes.
+
+    Messages are JSON-serialisable dicts published on named channels. Every
+    subscriber of a channel receives each message published on it, including
+    the publisher itself if it subscribed. Handlers are plain functions run on
+    the event loop and must not block. Delivery is at-most-once: messages
+    published while a backend is disconnected are dropped, so users should
+    send state (heartbeats, full membership) rather than deltas they cannot
+    afford to lose.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].append(handler)
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: dict):
+        """Send `message` to every subscriber of `channel`"""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def _dispatch(self, channel: str, message: dict):
+        for handler in self._handlers.get(channel, ()):
+            self.delivered += 1
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"Pub/sub handler for {channel} failed: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "channels": len(self._handlers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class LocalPubSub(PubSub):
+    """In-process backend; share one instance between components under test"""
+
+    async def publish(self, channel: str, message: dict):
+        self.published += 1
+        # Round-trip through JSON so handlers never share mutable state with
+        # the publisher, as with a real transport
+        message = json.loads(json.dumps(message))
+        asyncio.get_running_loop().call_soon(self._dispatch, channel, message)
+
+
+class SocketPubSub(PubSub):
+    """Client for `PubSubBroker` over TCP or a Unix socket.
+
+    Reconnects with a fixed delay and re-subscribes after a broker restart.
+    Each message is one line of JSON: `{"op": "sub", "channel": ...}` and
+    `{"op": "pub", "channel": ..., "data": ...}` upstream, and
+    `{"channel": ..., "data": ...}` downstream.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        path: Optional[str] = None,
+        reconnect_delay: float = 1.0,
+    ):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    def subscribe(self, channel: str, handler: Handler):
+        if channel not in self._handlers and self._writer is not None:
+            self._send({"op": "sub", "channel": channel})
+        super().subscribe(channel, handler)
+
+    async def publish(self, channel: str, message: dict):
+        if self._writer is None:
+            self.dropped += 1
+            return
+        self.published += 1
+        self._send({"op": "pub", "channel": channel, "data": message})
+        await self._writer.drain()
+
+    def _send(self, frame: dict):
+        self._writer.write(json.dumps(frame, separators=(",", ":")).encode() + b"\n")
+
+    async def start(self, timeout: float = 5.0):
+        """Connect in the background; waits up to `timeout` for the first connection"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Pub/sub broker {self._address()} not reachable yet; retrying in background")
+
+    def _address(self) -> str:
+        return self.path or f"{self.host}:{self.port}"
+
+    async def _run(self):
+        while True:
+            try:
+                if self.path:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                else:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._writer = writer
+            for channel in self._handlers:
+                self._send({"op": "sub", "channel": channel})
+            self._connected.set()
+            logger.info(f"Connected to pub/sub broker {self._address()}")
+            try:
+                while line := await reader.readline():
+                    frame = json.loads(line)
+                    self._dispatch(frame["channel"], frame["data"])
+            except (OSError, ValueError) as e:
+                logger.warning(f"Pub/sub connection error: {e!r}")
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+            logger.warning(f"Lost pub/sub broker {self._address()}; reconnecting")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class PubSubBroker:
+    """Minimal fan-out broker for `SocketPubSub` clients.
+
+    Enough to coordinate a handful of processes on one box or a small
+    cluster without an external message broker. A subscriber whose socket
+    buffer passes `max_buffer` bytes is skipped for that message rather than
+    slowing every other subscriber.
+    """
+
+    def __init__(self, max_buffer: int = 4 * 1024 * 1024):
+        self.max_buffer = max_buffer
+        self._subscribers: dict[str, set[asyncio.StreamWriter]] = defaultdict(set)
+        self.dropped = 0
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8090, path: Optional[str] = None):
+        if path:
+            return await asyncio.start_unix_server(self._handle, path)
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        channels = set()
+        try:
+            while line := await reader.readline():
+                frame = json.loads(line)
+                channel = frame["channel"]
+                if frame["op"] == "sub":
+                    channels.add(channel)
+                    self._subscribers[channel].add(writer)
+                elif frame["op"] == "pub":
+                    out = json.dumps({"channel": channel, "data": frame["data"]}, separators=(",", ":")).encode() + b"\n"
+                    for subscriber in self._subscribers.get(channel, ()):
+                        if subscriber.transport.get_write_buffer_size() > self.max_buffer:
+                            self.dropped += 1
+                            continue
+                        subscriber.write(out)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Dropping pub/sub client: {e!r}")
+        finally:
+            for channel in channels:
+                self._subscribers[channel].discard(writer)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+            writer.close()
+
+
+def create_pubsub(url: str) -> PubSub:
+    """Backend for `memory://`, `tcp://host:port` or `unix:///path/to/socket`"""
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return LocalPubSub()
+    if parsed.scheme == "tcp":
+        return SocketPubSub(host=parsed.hostname, port=parsed.port)
+    if parsed.scheme == "unix":
+        return SocketPubSub(path=parsed.path)
+    raise ValueError(f"Unsupported pub/sub URL: {url}")
+
+
+async def _serve_forever(host: str, port: int, path: Optional[str]):
+    server = await PubSubBroker().serve(host, port, path)
+    logger.info(f"Pub/sub broker listening on {path or f'{host}:{port}'}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Pub/sub broker for game-service shards")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--path", help="listen on a Unix socket instead of TCP")
+    args = parser.parse_args()
+    asyncio.run(_serve_forever(args.host, args.port, args.path))
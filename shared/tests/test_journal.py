@@ -0,0 +1,120 @@
+import asyncio
+import os
+
+from journal import Journal
+
+
+class Counters:
+    """Named counters, the smallest state a journal can persist"""
+
+    def __init__(self):
+        self.values: dict[str, int] = {}
+
+    def apply(self, event: list):
+        kind, name = event
+        if kind == "add":
+            self.values[name] = self.values.get(name, 0) + 1
+        elif kind == "drop":
+            self.values.pop(name, None)
+
+    def snapshot(self) -> dict:
+        return dict(self.values)
+
+    def restore(self, snapshot: dict):
+        self.values = dict(snapshot)
+
+
+def durable_counters(directory, snapshot_every: int = 100_000) -> tuple[Counters, Journal]:
+    counters = Counters()
+    journal = Journal(
+        str(directory), counters.apply, counters.snapshot, counters.restore, snapshot_every=snapshot_every,
+    )
+    return counters, journal
+
+
+def record(counters: Counters, journal: Journal, event: list):
+    journal.append(event)
+    counters.apply(event)
+
+
+def crash(journal: Journal):
+    """Stop like a killed process: buffered events are flushed, nothing is snapshotted"""
+    asyncio.run(journal.sync())
+    journal._file.close()
+
+
+def test_events_are_replayed_after_a_restart(tmp_path):
+    counters, journal = durable_counters(tmp_path)
+    journal.open()
+    for event in (["add", "a"], ["add", "b"], ["add", "a"], ["drop", "b"]):
+        record(counters, journal, event)
+    crash(journal)
+
+    restored, journal = durable_counters(tmp_path)
+    journal.open()
+    assert restored.values == {"a": 2}
+    assert journal.seq == 4
+    assert journal.restored_events == 4
+
+
+def test_only_events_after_the_snapshot_are_replayed(tmp_path):
+    counters, journal = durable_counters(tmp_path)
+    journal.open()
+    record(counters, journal, ["add", "a"])
+    record(counters, journal, ["add", "b"])
+    asyncio.run(journal.write_snapshot())
+    record(counters, journal, ["add", "a"])
+    crash(journal)
+
+    restored, journal = durable_counters(tmp_path)
+    journal.open()
+    assert restored.values == {"a": 2, "b": 1}
+    assert journal.snapshot_seq == 2
+    assert journal.restored_events == 1
+    # Segments covered by the snapshot are gone
+    assert sorted(os.listdir(tmp_path)) == ["events-000000000003.log", "snapshot-000000000002.json"]
+
+
+def test_a_torn_last_line_is_dropped_and_appends_continue(tmp_path):
+    counters, journal = durable_counters(tmp_path)
+    journal.open()
+    record(counters, journal, ["add", "a"])
+    record(counters, journal, ["add", "b"])
+    crash(journal)
+    with open(tmp_path / "events-000000000001.log", "a", encoding="utf-8") as f:
+        f.write('["add","c')
+
+    restored, journal = durable_counters(tmp_path)
+    journal.open()
+    assert restored.values == {"a": 1, "b": 1}
+    assert journal.seq == 2
+    record(restored, journal, ["add", "d"])
+    crash(journal)
+
+    restored, journal = durable_counters(tmp_path)
+    journal.open()
+    assert restored.values == {"a": 1, "b": 1, "d": 1}
+    assert journal.seq == 3
+
+
+def test_a_clean_close_restarts_from_the_snapshot_alone(tmp_path):
+    counters, journal = durable_counters(tmp_path)
+    journal.open()
+    record(counters, journal, ["add", "a"])
+    asyncio.run(journal.close())
+
+    restored, journal = durable_counters(tmp_path)
+    journal.open()
+    assert restored.values == {"a": 1}
+    assert journal.snapshot_seq == 1
+    assert journal.restored_events == 0
+
+
+def test_a_disabled_journal_writes_nothing(tmp_path):
+    counters = Counters()
+    journal = Journal(None, counters.apply, counters.snapshot, counters.restore)
+    journal.open()
+    journal.append(["add", "a"])
+    asyncio.run(journal.close())
+    assert journal.seq == 0
+    assert os.listdir(tmp_path) == []
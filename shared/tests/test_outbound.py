@@ -0,0 +1,58 @@
+import asyncio
+
+from outbound import SLOW_CONSUMER_CLOSE_CODE, OutboundQueue, OutboundStats
+
+
+class StalledSocket:
+    """A client that stops reading: every send after the first `accepted` never completes"""
+
+    def __init__(self, accepted: int = 0):
+        self.accepted = accepted
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text: str):
+        if len(self.sent) >= self.accepted:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed_with = code
+
+
+def test_a_stalled_receiver_is_disconnected_without_further_frames():
+    async def scenario():
+        stats = OutboundStats()
+        closed = []
+        websocket = StalledSocket(accepted=1)
+        queue = OutboundQueue(websocket, stats, on_close=lambda: closed.append(True), send_timeout=0.05)
+        queue.put("first")
+        queue.put("second")
+        # Nothing else is queued, so only the writer can notice the stuck send
+        await asyncio.sleep(0.2)
+        return websocket, stats, closed
+
+    websocket, stats, closed = asyncio.run(scenario())
+    assert websocket.sent == ["first"]
+    assert websocket.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    assert closed == [True]
+    assert stats.evicted_connections == 1
+    assert stats.connections == 0
+
+
+def test_a_receiver_that_keeps_up_stays_connected():
+    async def scenario():
+        stats = OutboundStats()
+        websocket = StalledSocket(accepted=100)
+        queue = OutboundQueue(websocket, stats, on_close=lambda: None, send_timeout=0.05)
+        for i in range(10):
+            queue.put(f"frame {i}")
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.1)
+        queue.close()
+        return websocket, stats
+
+    websocket, stats = asyncio.run(scenario())
+    assert len(websocket.sent) == 10
+    assert websocket.closed_with is None
+    assert stats.evicted_connections == 0
@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import re
+
+import codec
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_cli_protocol():
+    spec = importlib.util.spec_from_file_location("cli_protocol", os.path.join(ROOT, "cli-client", "protocol.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_web_tables() -> tuple[str, dict, tuple, dict]:
+    with open(os.path.join(ROOT, "web-client", "codec.js"), encoding="utf-8") as f:
+        source = f.read()
+    subprotocol = re.search(r'const BINARY_SUBPROTOCOL = "(.*?)";', source).group(1)
+    keys = re.search(r"const KEYS = \{(.*?)\};", source, re.S).group(1)
+    types = re.search(r"const TYPES = \[(.*?)\];", source, re.S).group(1)
+    texts = re.search(r"const TEXTS = \{(.*?)\};", source, re.S).group(1)
+    return (
+        subprotocol,
+        dict(re.findall(r'(\w+): "(\w+)"', keys)),
+        tuple(re.findall(r'"(\w+)"', types)),
+        {
+            # `${message.username} ...` is the JavaScript spelling of "{username} ..."
+            kind: re.sub(r"\$\{message\.(\w+)\}", r"{\1}", template[1:-1])
+            for kind, template in re.findall(r'(\w+): \([^)]*\) => (`[^`]*`|"[^"]*")', texts)
+        },
+    )
+
+
+def test_cli_client_tables_match_the_services():
+    protocol = load_cli_protocol()
+    assert protocol.BINARY_SUBPROTOCOL == codec.BINARY_SUBPROTOCOL
+    assert protocol.KEYS == codec.KEYS
+    assert protocol.TYPES == codec.TYPES
+    assert protocol.TEXTS == codec.TEXTS
+
+
+def test_web_client_tables_match_the_services():
+    subprotocol, keys, types, texts = read_web_tables()
+    assert subprotocol == codec.BINARY_SUBPROTOCOL
+    assert keys == codec.KEYS
+    assert types == codec.TYPES
+    assert texts == codec.TEXTS
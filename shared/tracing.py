@@ -0,0 +1,414 @@
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import random
+import socket
+import statistics
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"  # W3C Trace Context header, also accepted in WebSocket messages
+FLUSH_INTERVAL = 0.2  # seconds spans are buffered before being sent to the collector
+MAX_PENDING = 10_000  # spans buffered at most; more are dropped until the next flush
+MAX_DATAGRAM = 60_000  # bytes per UDP datagram
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value) -> Optional[tuple[str, str, bool]]:
+    """(trace ID, parent span ID, sampled) from a `traceparent` value; None if it is malformed"""
+    if not isinstance(value, str):
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        if not int(parts[1], 16) or not int(parts[2], 16):
+            return None
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class Span:
+    """One timed stage of a trace, current for the code inside its `with` block.
+
+    Only sampled spans are recorded. An unsampled root span still carries its
+    trace ID, so `inject()` passes the trace and its sampling decision on.
+    """
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "sampled", "attributes", "started_at",
+                 "_started", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._started
+        _current.reset(self._token)
+        if self.sampled:
+            if exc_type is not None:
+                self.attributes["error"] = exc_type.__name__
+            self.tracer.export(self, duration)
+        return False
+
+
+class _UnsampledSpan:
+    """Stands in for every child span of an unsampled trace; records nothing"""
+
+    sampled = False
+
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+UNSAMPLED = _UnsampledSpan()
+
+
+class Tracer:
+    """Records a service's spans and sends them to the span collector.
+
+    Sampling is decided once per trace, at its root: `start_trace()` either
+    continues a trace from a `traceparent` (keeping the caller's decision) or
+    starts one and samples it with probability `sample_rate`. `span()` opens
+    a child of the current span, and returns a shared no-op for unsampled
+    traces, so tracing costs a context-variable lookup on paths that are not
+    sampled. Finished spans are buffered and sent as JSON lines in UDP
+    datagrams every FLUSH_INTERVAL, so a slow or missing collector never
+    holds up the event loop.
+    """
+
+    def __init__(self, service: str, sample_rate: float = 0.0, collector_url: Optional[str] = None):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.collector = None
+        if collector_url:
+            parsed = urlparse(collector_url)
+            if parsed.scheme != "udp":
+                raise ValueError(f"Unsupported span collector URL: {collector_url}")
+            self.collector = (parsed.hostname or "127.0.0.1", parsed.port or 4399)
+        self._socket: Optional[socket.socket] = None
+        self._pending: list[dict] = []
+        self._flush_scheduled = False
+        self.traces_started = 0
+        self.traces_sampled = 0
+        self.spans_exported = 0
+        self.spans_dropped = 0
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, **attributes) -> Span:
+        """The root span of a request or message, continuing the caller's trace when it sent one"""
+        remote = parse_traceparent(traceparent)
+        if remote is None and _current.get() is not None:
+            return self.span(name, **attributes)
+        self.traces_started += 1
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        sampled = sampled and self.collector is not None
+        self.traces_sampled += sampled
+        return Span(self, name, trace_id, parent_id, sampled, attributes)
+
+    def span(self, name: str, **attributes):
+        """A child of the current span; a no-op when the trace is not sampled"""
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return UNSAMPLED
+        return Span(self, name, parent.trace_id, parent.span_id, True, attributes)
+
+    def traced(self, name: str, root: bool = False):
+        """Decorator that runs each call of a function or coroutine function in a child span
+
+        With `root`, a call made outside any trace (from a timer, say)
+        starts a trace of its own.
+        """
+        open_span = self.start_trace if root else self.span
+
+        def decorate(function):
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def traced_call(*args, **kwargs):
+                    with open_span(name):
+                        return await function(*args, **kwargs)
+            else:
+                @functools.wraps(function)
+                def traced_call(*args, **kwargs):
+                    with open_span(name):
+                        return function(*args, **kwargs)
+            return traced_call
+
+        return decorate
+
+    def trace_id(self) -> Optional[str]:
+        """The current trace's ID when it is sampled, sent with messages as a correlation ID.
+
+        Unsampled traces have nothing in the collector to correlate with, so
+        their IDs are not worth the bytes on every frame.
+        """
+        current = _current.get()
+        return current.trace_id if current is not None and current.sampled else None
+
+    def inject(self, headers: dict) -> dict:
+        """Add the current span's `traceparent` to outgoing HTTP headers"""
+        current = _current.get()
+        if current is not None:
+            headers[TRACEPARENT] = current.traceparent
+        return headers
+
+    def export(self, span: Span, duration: float):
+        if len(self._pending) >= MAX_PENDING:
+            self.spans_dropped += 1
+            return
+        self._pending.append({
+            "service": self.service,
+            "name": span.name,
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentId": span.parent_id,
+            "start": span.started_at,
+            "duration": duration,
+            "attributes": span.attributes,
+        })
+        if not self._flush_scheduled:
+            try:
+                asyncio.get_running_loop().call_later(FLUSH_INTERVAL, self.flush)
+                self._flush_scheduled = True
+            except RuntimeError:
+                self.flush()
+
+    def flush(self):
+        self._flush_scheduled = False
+        spans, self._pending = self._pending, []
+        if not spans:
+            return
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.setblocking(False)
+        datagram = b""
+        for span in spans:
+            line = json.dumps(span, default=str).encode() + b"\n"
+            if datagram and len(datagram) + len(line) > MAX_DATAGRAM:
+                self._send(datagram)
+                datagram = b""
+            datagram += line
+        self._send(datagram)
+
+    def _send(self, datagram: bytes):
+        count = datagram.count(b"\n")
+        try:
+            self._socket.sendto(datagram, self.collector)
+            self.spans_exported += count
+        except OSError:
+            # No collector listening, or the socket buffer is full
+            self.spans_dropped += count
+
+    def close(self):
+        self.flush()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "collector": f"{self.collector[0]}:{self.collector[1]}" if self.collector else None,
+            "traces_started": self.traces_started,
+            "traces_sampled": self.traces_sampled,
+            "spans_exported": self.spans_exported,
+            "spans_dropped": self.spans_dropped,
+            "spans_pending": len(self._pending),
+        }
+
+
+class TraceRequests:
+    """ASGI middleware that runs every HTTP request inside a root span.
+
+    A `traceparent` header continues the caller's trace. The span is named
+    after the route template the request matched, once routing has run.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"traceparent"), None)
+        with self.tracer.start_trace(f"{scope['method']} {scope['path']}", traceparent) as span:
+            await self.app(scope, receive, send)
+            route = scope.get("route")
+            if route is not None and span.sampled:
+                span.name = f"{scope['method']} {route.path}"
+
+
+def _percentile(values: list[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class StageReport:
+    """Per-stage latency breakdown of the traces seen so far, grouped by root span.
+
+    Spans are kept by trace (the most recent `max_traces`) because a trace's
+    spans arrive from several services and in no particular order.
+    """
+
+    def __init__(self, max_traces: int = 50_000):
+        self.max_traces = max_traces
+        self.traces: OrderedDict[str, list[dict]] = OrderedDict()
+
+    def add(self, span: dict):
+        spans = self.traces.get(span["traceId"])
+        if spans is None:
+            spans = self.traces[span["traceId"]] = []
+            if len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        spans.append(span)
+
+    def render(self) -> str:
+        roots: dict[str, list[float]] = defaultdict(list)
+        stages: dict[str, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+        for spans in self.traces.values():
+            ids = {span["spanId"] for span in spans}
+            root = min((span for span in spans if span["parentId"] not in ids), key=lambda span: span["start"])
+            root_name = f"{root['service']} {root['name']}"
+            roots[root_name].append(root["duration"])
+            for span in spans:
+                if span is not root:
+                    stages[root_name][f"{span['service']} {span['name']}"].append(span["duration"])
+
+        lines = []
+        for root_name, durations in sorted(roots.items(), key=lambda item: -len(item[1])):
+            durations.sort()
+            total = sum(durations)
+            lines.append(
+                f"{root_name}: {len(durations):,} traces, p50 {_percentile(durations, 0.5) * 1e3:.3f} ms, "
+                f"p99 {_percentile(durations, 0.99) * 1e3:.3f} ms"
+            )
+            rows = []
+            for stage, values in stages[root_name].items():
+                values.sort()
+                rows.append([
+                    stage, f"{len(values) / len(durations):.2f}", f"{statistics.mean(values) * 1e3:.3f}",
+                    f"{_percentile(values, 0.5) * 1e3:.3f}", f"{_percentile(values, 0.99) * 1e3:.3f}",
+                    f"{sum(values) / total:.0%}" if total else "-",
+                ])
+            rows.sort(key=lambda row: -float(row[2]) * float(row[1]))
+            headers = ["stage", "per trace", "mean ms", "p50 ms", "p99 ms", "of root"]
+            widths = [max(len(h), *(len(r[i]) for r in rows)) if rows else len(h) for i, h in enumerate(headers)]
+            lines.append("  " + "  ".join(h.ljust(w) if i == 0 else h.rjust(w) for i, (h, w) in enumerate(zip(headers, widths))))
+            for row in rows:
+                lines.append("  " + "  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(row, widths))))
+            lines.append("")
+        return "\n".join(lines) if lines else "No traces yet"
+
+
+class SpanCollector(asyncio.DatagramProtocol):
+    """Receives spans from the services, appends them to a JSON-lines file and keeps a `StageReport`"""
+
+    def __init__(self, path: Optional[str]):
+        self.file = open(path, "a", encoding="utf-8") if path else None
+        self.report = StageReport()
+        self.received = 0
+
+    def datagram_received(self, data: bytes, addr):
+        for line in data.decode("utf-8", "replace").splitlines():
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            self.received += 1
+            self.report.add(span)
+            if self.file is not None:
+                self.file.write(line + "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+async def _collect_forever(host: str, port: int, path: Optional[str], interval: float):
+    collector = SpanCollector(path)
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: collector, local_addr=(host, port),
+    )
+    logger.info(f"Collecting spans on udp://{host}:{port}" + (f" into {path}" if path else ""))
+    reported = 0
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            if collector.file is not None:
+                collector.file.flush()
+            if collector.received != reported:
+                reported = collector.received
+                print(collector.report.render(), flush=True)
+    finally:
+        transport.close()
+        print(collector.report.render(), flush=True)
+        collector.close()
+
+
+def report_file(path: str) -> str:
+    report = StageReport(max_traces=10_000_000)
+    with open(path, encoding="utf-8") as spans:
+        for line in spans:
+            if line.strip():
+                report.add(json.loads(line))
+    return report.render()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Span collector for the RPS services")
+    commands = parser.add_subparsers(dest="command", required=True)
+    collect = commands.add_parser("collect", help="receive spans, write them to a file and print breakdowns")
+    collect.add_argument("--host", default="127.0.0.1")
+    collect.add_argument("--port", type=int, default=4399)
+    collect.add_argument("--out", default="spans.jsonl", help="JSON-lines file spans are appended to")
+    collect.add_argument("--interval", type=float, default=10.0, help="seconds between breakdowns")
+    report = commands.add_parser("report", help="print the per-stage breakdown of a spans file")
+    report.add_argument("path")
+    args = parser.parse_args()
+    if args.command == "report":
+        print(report_file(args.path))
+    else:
+        try:
+            asyncio.run(_collect_forever(args.host, args.port, args.out, args.interval))
+        except KeyboardInterrupt:
+            pass
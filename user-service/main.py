@@ -1,9 +1,22 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
 import uuid
-import json
 import logging
+import os
+import sys
+import time
+
+# Modules shared between the services live in the repository's shared/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+
+from codec import Codec, DecodeError, accept, receive_frame
+from journal import Journal
+from metrics import CONTENT_TYPE, LoopLagMonitor, MetricsRegistry, RequestMetrics
+from outbound import OutboundQueue, OutboundStats
+from registry import UserRegistry
+from tracing import TraceRequests, Tracer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,49 +33,114 @@ app.add_middleware(
 )
 
 
+# Directory for the event log and snapshots; durable mode is off when unset
+USER_DATA_DIR = os.environ.get("USER_DATA_DIR")
+# Tracing: the share of traces recorded, and the span collector they are
+# sent to (start one with `python shared/tracing.py collect`). Requests from
+# the other services continue their traces, whatever this rate is.
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL")
+
 # In-memory storage
-users = {}  # userId -> username
+users = UserRegistry()  # userId -> username, indexed by username
 websocket_connections = {}  # userId -> WebSocket connection
 
+# Served on /metrics; gauges read live counts, so a scrape scans nothing
+metrics = MetricsRegistry()
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP requests served, by route", ("method", "route", "status"),
+)
+websocket_message_seconds = metrics.histogram(
+    "websocket_message_duration_seconds", "Time to handle one message from a user's socket, by type", ("type",),
+)
+batch_lookup_size = metrics.histogram(
+    "batch_lookup_size", "User IDs per /users/batch request", buckets=(1, 2, 5, 10, 50, 100, 500, 1000),
+)
+metrics.gauge("users", "Registered users", read=lambda: len(users))
+loop_lag = LoopLagMonitor(metrics)
+app.add_middleware(RequestMetrics, histogram=http_request_seconds)
+tracer = Tracer("user-service", TRACE_SAMPLE_RATE, TRACE_COLLECTOR_URL)
+app.add_middleware(TraceRequests, tracer=tracer)
+
+def apply_user_event(event: list):
+    """Replay one journal event: ["register", userId, username]"""
+    if event[0] == "register":
+        users.add(event[1], event[2])
+
+def restore_users(snapshot: list):
+    for user_id, username in snapshot:
+        users.add(user_id, username)
+
+journal = Journal(USER_DATA_DIR, apply_user_event, users.dump, restore_users)
+
 class LoginRequest(BaseModel):
     username: str
 
+class BatchUsersRequest(BaseModel):
+    userIds: list[str] = Field(max_length=1000)
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: dict[str, WebSocket] = {}
-
-    async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
-        logger.info(f"User {user_id} connected via WebSocket")
-
-    def disconnect(self, user_id: str):
+        self.active_connections: dict[str, OutboundQueue] = {}
+        self.outbound_stats = OutboundStats()
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> Codec:
+        codec = await accept(websocket)
+        previous = self.active_connections.get(user_id)
+        self.active_connections[user_id] = OutboundQueue(
+            websocket,
+            self.outbound_stats,
+            on_close=lambda: self.disconnect(user_id, websocket),
+            codec=codec,
+        )
+        if previous is not None:
+            previous.close()
+        logger.info(f"User {user_id} connected via WebSocket ({codec.name})")
+        return codec
+
+    def disconnect(self, user_id: str, websocket: WebSocket = None):
         if user_id in self.active_connections:
+            connection = self.active_connections[user_id]
+            # A stale socket may close after its user reconnected; keep the newer one
+            if websocket is not None and connection.websocket is not websocket:
+                return
             del self.active_connections[user_id]
+            connection.close()
             logger.info(f"User {user_id} disconnected from WebSocket")
 
     async def send_personal_message(self, message: dict, user_id: str):
         if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending message to user {user_id}: {e}")
-                self.disconnect(user_id)
+            connection = self.active_connections[user_id]
+            connection.put(connection.codec.encode(message), message.get("type"))
 
 manager = ConnectionManager()
+manager.outbound_stats.export(metrics)
+
+@app.on_event("startup")
+async def startup():
+    journal.open()
+    journal.start()
+    loop_lag.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await loop_lag.stop()
+    await journal.close()
+    tracer.close()
 
 @app.post("/login")
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     """Login or register a user with username"""
     # Check if user already exists
-    for uid, name in users.items():
-        if name == req.username:
-            logger.info(f"Existing user {req.username} logged in with ID {uid}")
-            return {"userId": uid, "username": name}
+    uid = users.find_by_username(req.username)
+    if uid is not None:
+        logger.info(f"Existing user {req.username} logged in with ID {uid}")
+        return {"userId": uid, "username": req.username}
     
     # Create new user
     user_id = str(uuid.uuid4())
-    users[user_id] = req.username
+    users.add(user_id, req.username)
+    journal.append(["register", user_id, req.username])
     logger.info(f"New user {req.username} registered with ID {user_id}")
     return {"userId": user_id, "username": req.username}
 
@@ -73,10 +151,24 @@ def get_user(userId: str):
         return {"userId": userId, "username": users[userId]}
     raise HTTPException(status_code=404, detail="User not found")
 
+@app.post("/users/batch")
+def get_users_batch(req: BatchUsersRequest):
+    """Get user information for many IDs in one request"""
+    batch_lookup_size.observe(len(req.userIds))
+    found, missing = [], []
+    for user_id in req.userIds:
+        username = users.get(user_id)
+        if username is None:
+            missing.append(user_id)
+        else:
+            found.append({"userId": user_id, "username": username})
+    return {"users": found, "missing": missing}
+
 @app.get("/users")
-def get_all_users():
-    """Get all registered users"""
-    return {"users": [{"userId": uid, "username": name} for uid, name in users.items()]}
+def get_all_users(cursor: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Get registered users, one page at a time"""
+    page, next_cursor = users.page(cursor, limit)
+    return {"users": page, "nextCursor": next_cursor}
 
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
@@ -85,7 +177,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         await websocket.close(code=4004, reason="User not found")
         return
     
-    await manager.connect(websocket, user_id)
+    codec = await manager.connect(websocket, user_id)
     
     # Send welcome message
     await manager.send_personal_message({
@@ -98,9 +190,12 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     try:
         while True:
             # Listen for messages from client
-            data = await websocket.receive_text()
+            data = await receive_frame(websocket)
+            started = time.perf_counter()
+            kind = "invalid"
             try:
-                message = json.loads(data)
+                message = codec.decode(data)
+                kind = "echo"
                 logger.info(f"Received message from user {user_id}: {message}")
                 
              
@@ -110,14 +205,15 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                     "timestamp": str(uuid.uuid4())
                 }, user_id)
                 
-            except json.JSONDecodeError:
+            except DecodeError:
                 await manager.send_personal_message({
                     "type": "error",
-                    "message": "Invalid JSON format"
+                    "message": codec.invalid_message
                 }, user_id)
-                
+            websocket_message_seconds.observe(time.perf_counter() - started, kind)
+
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
         logger.info(f"User {user_id} disconnected")
 
 @app.get("/health")
@@ -127,9 +223,17 @@ def health_check():
         "status": "healthy",
         "service": "user-service",
         "active_users": len(users),
-        "active_connections": len(manager.active_connections)
+        "active_connections": len(manager.active_connections),
+        "outbound": manager.outbound_stats.snapshot(),
+        "journal": journal.stats(),
+        "tracing": tracer.stats()
     }
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Counters, gauges and latency histograms in the Prometheus text format"""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting User Service on port 8000")
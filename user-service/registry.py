@@ -0,0 +1,53 @@
+from typing import Optional
+
+
+class UserRegistry:
+    """In-memory user store indexed both by user id and by username.
+
+    Logins resolve through the username index in O(1) regardless of how many
+    users are registered. Registration order is kept in a list so the user
+    listing can be paged with an integer cursor without copying the store.
+    """
+
+    def __init__(self):
+        self._usernames: dict[str, str] = {}  # userId -> username
+        self._user_ids: dict[str, str] = {}  # username -> userId
+        self._order: list[str] = []  # userIds in registration order
+
+    def __len__(self) -> int:
+        return len(self._usernames)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._usernames
+
+    def __getitem__(self, user_id: str) -> str:
+        return self._usernames[user_id]
+
+    def get(self, user_id: str) -> Optional[str]:
+        return self._usernames.get(user_id)
+
+    def find_by_username(self, username: str) -> Optional[str]:
+        return self._user_ids.get(username)
+
+    def add(self, user_id: str, username: str):
+        if user_id in self._usernames or username in self._user_ids:
+            raise ValueError(f"User {username} ({user_id}) is already registered")
+        self._usernames[user_id] = username
+        self._user_ids[username] = user_id
+        self._order.append(user_id)
+
+    def page(self, cursor: int = 0, limit: int = 100) -> tuple[list[dict], Optional[int]]:
+        """Return up to `limit` users starting at `cursor` and the next cursor"""
+        cursor = max(cursor, 0)
+        end = cursor + limit
+        users = [
+            {"userId": uid, "username": self._usernames[uid]}
+            for uid in self._order[cursor:end]
+        ]
+        next_cursor = end if end < len(self._order) else None
+        return users, next_cursor
+
+    def dump(self) -> list[list[str]]:
+        """All users as [userId, username] pairs in registration order"""
+        usernames = self._usernames
+        return [[uid, usernames[uid]] for uid in self._order]
@@ -0,0 +1,215 @@
+// Binary game protocol: MessagePack frames with shortened top-level keys and
+// numeric frame types. The tables mirror the services' shared/codec.py and
+// must change with it. Open the page with ?protocol=msgpack to use it.
+
+const BINARY_SUBPROTOCOL = "rps.msgpack";
+
+const KEYS = {
+    type: "t",
+    message: "m",
+    roomId: "r",
+    userId: "u",
+    username: "n",
+    moves_count: "c",
+    move: "v",
+    result: "R",
+    game_status: "g",
+    series: "s",
+    players: "p",
+    spectators: "S",
+    traceId: "x",
+    traceparent: "X",
+    bestOf: "B",
+    bot: "b",
+};
+const LONG_KEYS = Object.fromEntries(Object.entries(KEYS).map(([key, short]) => [short, key]));
+const TYPES = [
+    "move_received", "game_result", "game_reset", "submit_move", "ready_for_next_round", "game_status",
+    "get_game_status", "room_status", "chat", "chat_message", "echo", "error", "game_connected",
+    "player_disconnected", "user_connected", "user_disconnected", "user_left", "connection_established",
+    "spectating", "series_started", "series_result", "start_series", "add_bot", "bot_joined", "queued",
+    "match_found", "cancelled", "tournament_status", "match_assigned", "tournament_round",
+    "tournament_round_finished", "tournament_finished",
+];
+const TYPE_CODES = Object.fromEntries(TYPES.map((type, i) => [type, i + 1]));
+const TEXTS = {
+    move_received: (message) => `${message.username} has made their move`,
+    game_reset: () => "Game reset - ready for next round!",
+};
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+// MessagePack, limited to what JSON can hold (plus binary on decode)
+function packInto(bytes, value) {
+    if (value === null || value === undefined) {
+        bytes.push(0xc0);
+    } else if (value === false || value === true) {
+        bytes.push(value ? 0xc3 : 0xc2);
+    } else if (typeof value === "number") {
+        if (Number.isInteger(value) && value >= 0 && value < 0x80) {
+            bytes.push(value);
+        } else if (Number.isInteger(value) && value < 0 && value >= -32) {
+            bytes.push(value & 0xff);
+        } else if (Number.isInteger(value) && value >= -0x80000000 && value <= 0xffffffff) {
+            const view = new DataView(new ArrayBuffer(5));
+            view.setUint8(0, value < 0 ? 0xd2 : 0xce);
+            value < 0 ? view.setInt32(1, value) : view.setUint32(1, value);
+            bytes.push(...new Uint8Array(view.buffer));
+        } else {
+            const view = new DataView(new ArrayBuffer(9));
+            view.setUint8(0, 0xcb);
+            view.setFloat64(1, value);
+            bytes.push(...new Uint8Array(view.buffer));
+        }
+    } else if (typeof value === "string") {
+        const encoded = textEncoder.encode(value);
+        const length = encoded.length;
+        if (length < 32) {
+            bytes.push(0xa0 | length);
+        } else if (length < 0x100) {
+            bytes.push(0xd9, length);
+        } else if (length < 0x10000) {
+            bytes.push(0xda, length >> 8, length & 0xff);
+        } else {
+            bytes.push(0xdb, length >>> 24, (length >> 16) & 0xff, (length >> 8) & 0xff, length & 0xff);
+        }
+        for (const byte of encoded) bytes.push(byte);
+    } else if (Array.isArray(value)) {
+        packLength(bytes, value.length, 0x90, 0xdc);
+        value.forEach(item => packInto(bytes, item));
+    } else {
+        const entries = Object.entries(value).filter(([, item]) => item !== undefined);
+        packLength(bytes, entries.length, 0x80, 0xde);
+        entries.forEach(([key, item]) => {
+            packInto(bytes, key);
+            packInto(bytes, item);
+        });
+    }
+}
+
+function packLength(bytes, length, fixPrefix, prefix16) {
+    if (length < 16) {
+        bytes.push(fixPrefix | length);
+    } else if (length < 0x10000) {
+        bytes.push(prefix16, length >> 8, length & 0xff);
+    } else {
+        bytes.push(prefix16 + 1, length >>> 24, (length >> 16) & 0xff, (length >> 8) & 0xff, length & 0xff);
+    }
+}
+
+function pack(value) {
+    const bytes = [];
+    packInto(bytes, value);
+    return new Uint8Array(bytes);
+}
+
+function unpack(buffer) {
+    const view = new DataView(buffer);
+    let offset = 0;
+
+    function take(length) {
+        const start = offset;
+        offset += length;
+        if (offset > view.byteLength) throw new Error("Truncated MessagePack frame");
+        return start;
+    }
+    function text(length) {
+        const start = take(length);
+        return textDecoder.decode(new Uint8Array(buffer, start, length));
+    }
+    function list(length) {
+        const items = [];
+        for (let i = 0; i < length; i++) items.push(read());
+        return items;
+    }
+    function map(length) {
+        const object = {};
+        for (let i = 0; i < length; i++) {
+            const key = read();
+            object[key] = read();
+        }
+        return object;
+    }
+    function read() {
+        const byte = view.getUint8(take(1));
+        if (byte < 0x80) return byte;
+        if (byte >= 0xe0) return byte - 0x100;
+        if ((byte & 0xf0) === 0x80) return map(byte & 0x0f);
+        if ((byte & 0xf0) === 0x90) return list(byte & 0x0f);
+        if ((byte & 0xe0) === 0xa0) return text(byte & 0x1f);
+        switch (byte) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return new Uint8Array(buffer.slice(...span(view.getUint8(take(1)))));
+            case 0xc5: return new Uint8Array(buffer.slice(...span(view.getUint16(take(2)))));
+            case 0xc6: return new Uint8Array(buffer.slice(...span(view.getUint32(take(4)))));
+            case 0xca: return view.getFloat32(take(4));
+            case 0xcb: return view.getFloat64(take(8));
+            case 0xcc: return view.getUint8(take(1));
+            case 0xcd: return view.getUint16(take(2));
+            case 0xce: return view.getUint32(take(4));
+            case 0xcf: return Number(view.getBigUint64(take(8)));
+            case 0xd0: return view.getInt8(take(1));
+            case 0xd1: return view.getInt16(take(2));
+            case 0xd2: return view.getInt32(take(4));
+            case 0xd3: return Number(view.getBigInt64(take(8)));
+            case 0xd9: return text(view.getUint8(take(1)));
+            case 0xda: return text(view.getUint16(take(2)));
+            case 0xdb: return text(view.getUint32(take(4)));
+            case 0xdc: return list(view.getUint16(take(2)));
+            case 0xdd: return list(view.getUint32(take(4)));
+            case 0xde: return map(view.getUint16(take(2)));
+            case 0xdf: return map(view.getUint32(take(4)));
+        }
+        throw new Error(`Unsupported MessagePack type 0x${byte.toString(16)}`);
+    }
+    function span(length) {
+        const start = take(length);
+        return [start, start + length];
+    }
+
+    return read();
+}
+
+function compact(message) {
+    const compacted = {};
+    for (const [key, value] of Object.entries(message)) {
+        compacted[KEYS[key] || key] = key === "type" ? (TYPE_CODES[value] || value) : value;
+    }
+    return compacted;
+}
+
+function expand(compacted) {
+    const message = {};
+    for (const [short, value] of Object.entries(compacted)) {
+        const key = LONG_KEYS[short] || short;
+        message[key] = key === "type" && Number.isInteger(value) && value > 0 && value <= TYPES.length
+            ? TYPES[value - 1]
+            : value;
+    }
+    const text = TEXTS[message.type];
+    if (text && !("message" in message)) {
+        message.message = text(message);
+    }
+    return message;
+}
+
+// The protocol to offer, from the page's ?protocol= parameter
+function gameSubprotocols() {
+    const protocol = new URLSearchParams(window.location.search).get("protocol");
+    return protocol === "msgpack" ? [BINARY_SUBPROTOCOL] : [];
+}
+
+// A message in the protocol the server agreed to on `ws`
+function encodeFrame(ws, message) {
+    return ws.protocol === BINARY_SUBPROTOCOL ? pack(compact(message)) : JSON.stringify(message);
+}
+
+// A received frame as a message
+function decodeFrame(data) {
+    if (typeof data === "string") return JSON.parse(data);
+    const message = unpack(data);
+    return message && typeof message === "object" && !Array.isArray(message) ? expand(message) : message;
+}
@@ -17,6 +17,8 @@ const roomStatus = document.getElementById('room-status');
 const gameMessage = document.getElementById('game-message');
 const resultDisplay = document.getElementById('result-display');
 const playAgainButton = document.getElementById('play-again-button');
+const seriesScore = document.getElementById('series-score');
+const seriesControls = document.getElementById('series-controls');
 
 // Utility
 function showSection(section) {
@@ -135,7 +137,8 @@ async function connectToGame() {
     const wsUrl = `ws://localhost:8002/ws/${roomId}/${userId}`;
     
     try {
-        gameWs = new WebSocket(wsUrl);
+        gameWs = new WebSocket(wsUrl, gameSubprotocols());
+        gameWs.binaryType = 'arraybuffer';
 
         gameWs.onopen = () => {
             gameMessage.textContent = "⏳ Waiting for opponent to join...";
@@ -143,12 +146,16 @@ async function connectToGame() {
         };
 
         gameWs.onmessage = (event) => {
-            const data = JSON.parse(event.data);
+            const data = decodeFrame(event.data);
             handleGameMessage(data);
         };
 
-        gameWs.onclose = () => {
-            gameMessage.textContent = "❌ Connection lost. Please refresh the page.";
+        gameWs.onclose = (event) => {
+            if (event.code === 4003) {
+                gameMessage.textContent = "❌ You are not a player in this room.";
+            } else {
+                gameMessage.textContent = "❌ Connection lost. Please refresh the page.";
+            }
         };
 
     } catch (error) {
@@ -156,6 +163,11 @@ async function connectToGame() {
     }
 }
 
+// Send a message in the protocol agreed with the game service
+function sendGame(message) {
+    gameWs.send(encodeFrame(gameWs, message));
+}
+
 // Handle Game Messages
 function handleGameMessage(data) {
     const type = data.type;
@@ -163,6 +175,24 @@ function handleGameMessage(data) {
     switch (type) {
         case 'game_connected':
             gameMessage.textContent = "✅ Connected! Make your move.";
+            showSeries(data.series);
+            document.getElementById('add-bot-button').style.display = data.bot ? 'none' : 'inline-block';
+            break;
+
+        case 'bot_joined':
+            gameMessage.textContent = `🤖 ${data.message} - make your move!`;
+            document.getElementById('add-bot-button').style.display = 'none';
+            break;
+
+        case 'series_started':
+            gameMessage.textContent = `🏁 ${data.message}`;
+            showSeries(data.series);
+            break;
+
+        case 'series_result':
+            gameMessage.textContent = `🏆 ${data.message}`;
+            showSeries(data.series);
+            playAgainButton.style.display = 'block';
             break;
             
         case 'move_received':
@@ -178,7 +208,8 @@ function handleGameMessage(data) {
             break;
             
         case 'game_reset':
-            gameMessage.textContent = "🎮 New round! Make your move.";
+            gameMessage.textContent = data.series ? `🎮 ${data.message}` : "🎮 New round! Make your move.";
+            showSeries(data.series);
             resultDisplay.style.display = 'none';
             playAgainButton.style.display = 'none';
             moveSubmitted = false;
@@ -187,6 +218,10 @@ function handleGameMessage(data) {
         case 'player_disconnected':
             gameMessage.textContent = "⚠️ Opponent disconnected.";
             break;
+
+        case 'error':
+            gameMessage.textContent = `❌ ${data.message}`;
+            break;
     }
 }
 
@@ -221,10 +256,55 @@ function displayGameResult(result) {
         </p>`;
         gameMessage.textContent = isWinner ? '🎉 You won this round!' : '😔 Better luck next time!';
     }
+    if (result.forfeit) {
+        resultHtml += `<p style="color: #666;">⏰ ${result.forfeit} ran out of time</p>`;
+        gameMessage.textContent += ` (${result.forfeit} ran out of time)`;
+    }
     
     resultDisplay.innerHTML = resultHtml;
     resultDisplay.style.display = 'block';
-    playAgainButton.style.display = 'block';
+    showSeries(result.series);
+    if (result.series && !result.series.winner) {
+        // The server starts the next round of the series by itself
+        playAgainButton.style.display = 'none';
+        gameMessage.textContent += " Next round starts shortly...";
+    } else if (!result.series) {
+        playAgainButton.style.display = 'block';
+    }
+}
+
+// Show the score of a best-of-N series, if one is being played
+function showSeries(series) {
+    if (!series) {
+        seriesScore.style.display = 'none';
+        seriesControls.style.display = 'block';
+        return;
+    }
+    const score = series.players.map(p => `${p.username || 'Player'} ${p.wins}`).join(' - ');
+    seriesScore.textContent = `📈 Best of ${series.bestOf}: ${score || 'no rounds yet'}`;
+    seriesScore.style.display = 'block';
+    seriesControls.style.display = series.winner ? 'block' : 'none';
+}
+
+// Start a best-of-N series in this room
+function startSeries() {
+    if (gameWs && gameWs.readyState === WebSocket.OPEN) {
+        sendGame({
+            type: "start_series",
+            bestOf: parseInt(document.getElementById('series-length').value, 10)
+        });
+    } else {
+        gameMessage.textContent = "❌ Not connected to game.";
+    }
+}
+
+// Fill the second seat with the server's bot
+function addBot() {
+    if (gameWs && gameWs.readyState === WebSocket.OPEN) {
+        sendGame({ type: "add_bot" });
+    } else {
+        gameMessage.textContent = "❌ Not connected to game.";
+    }
 }
 
 // Submit Move
@@ -235,10 +315,10 @@ function submitMove(move) {
     }
     
     if (gameWs && gameWs.readyState === WebSocket.OPEN) {
-        gameWs.send(JSON.stringify({
+        sendGame({
             type: "submit_move",
             move: move
-        }));
+        });
         moveSubmitted = true;
         const emoji = move === 'rock' ? '🪨' : move === 'paper' ? '📄' : '✂️';
         gameMessage.textContent = `✅ You chose ${emoji} ${move}! Waiting for opponent...`;
@@ -250,9 +330,9 @@ function submitMove(move) {
 // Ready for Next Round
 function readyForNextRound() {
     if (gameWs && gameWs.readyState === WebSocket.OPEN) {
-        gameWs.send(JSON.stringify({
+        sendGame({
             type: "ready_for_next_round"
-        }));
+        });
         gameMessage.textContent = "⏳ Waiting for opponent to be ready...";
         playAgainButton.style.display = 'none';
     }